@@ -1,7 +1,17 @@
-import time
 import random
-import hotcoldgame
-from controls import print_level_title
+from controls import MOVES
+from tiles import *
+from flow_field import field_distance
+
+try:
+    import numpy
+except ImportError:     # batched minions movement is available only with numpy installed
+    numpy = None
+
+# collected item: (inventory key, amount added) or ('health', health change)
+ITEM_EFFECTS = {
+    NUT: ('●', 1), COOKIE: ('☯', 1), UMBRELLA: ('☂', 1), MAGIC_NOTE: ('♫', 1), NUTS_BAG: ('●', 20),
+    FIRST_AID: ('health', 5), ROTTEN_FOOD: ('health', -5), KEY_SHARD: ('℥', 1)}
 
 
 def feeding_friends(board, x_player, y_player, inventory, hamster_energy):
@@ -9,7 +19,7 @@ def feeding_friends(board, x_player, y_player, inventory, hamster_energy):
         if the user has enough items in inventory and if he is on one of his friend's position.
 
     Args:
-        board (list): list of board rows (list)
+        board (dict): tile board
         x_player (int): horizontal position of player on the board
         y_player (int): vertical position of player on the board
         inventory (dict): collected items(keys) and their amounts (values)
@@ -20,58 +30,39 @@ def feeding_friends(board, x_player, y_player, inventory, hamster_energy):
         hamster_energy (int): enemy's health points
     """
 
-    if inventory['●'] >= 20 and board[y_player][x_player] in ['☹', '☃', '♞', '☻', '☬']:
+    if inventory['●'] >= 20 and tile_flags[get_tile(board, x_player, y_player)] & FRIEND:
         inventory['●'] -= 20
         hamster_energy -= 100
     return inventory, hamster_energy
 
 
-def evil_hamster_defeat(board, x_player, y_player, level, hamster_energy, start_time):
+def evil_hamster_defeat(board, x_player, y_player, level, hamster_energy):
     """Function removes the enemy's protection and
-        defeats the enemy if the user is on enemy's position.
+        checks if the user reached enemy's position.
 
     Args:
-        board (list): list of board rows (list)
+        board (dict): tile board
         x_player (int): horizontal position of player on the board
         y_player (int): vertical position of player on the board
         level (int): actual game level
         hamster_energy (int): enemy's health points
-        start_time (float): game start time in seconds
 
     Return:
-        board (list): list of board rows (list)
-        hamster_energy (int): enemy's health points
-        your_time (int): whole game time in seconds
+        board (dict): tile board
+        hamster_reached (bool): True if player has to fight the enemy (play hot cold game), False otherwise
     """
 
-    red = '\033[31m'
-    reset_color = '\033[0m'
     if hamster_energy == 100:
-        for lines in range(40):
-            for columnes in range(120):
-                if board[lines][columnes] == red + '#' + reset_color:
-                    board[lines][columnes] = ' '
-    win = False
-    if level == 4:
-        if y_player in range(20, 29) and x_player in range(100, 118):
-            print_level_title(5)
-            win = hotcoldgame.main()
-            x_player = 1
-            y_player = 1
-        if win:
-            hamster_energy = 0
-
-    end_time = time.time()
-    your_time = int(end_time - start_time)
-
-    return board, hamster_energy, your_time
+        remove_barrier_group(board, 'shield')
+    hamster_reached = level == 4 and y_player in range(20, 29) and x_player in range(100, 118)
+    return board, hamster_reached
 
 
 def collecting_food(board, x_player, y_player, inventory, health):
     """Function adds collected items into inventory.
 
     Args:
-        board (list): list of board rows (list)
+        board (dict): tile board
         x_player (int): horizontal position of player on the board
         y_player (int): vertical position of player on the board
         inventory (dict): collected items(keys) and their amounts (values)
@@ -82,36 +73,23 @@ def collecting_food(board, x_player, y_player, inventory, health):
         health (int): player's health points
     """
 
-    item_colors = {
-        '●': '\033[33m', '⚛': '\033[34m', '✿': '\033[31m', '✡': '\033[94m', '℥': '\033[32m', '☯': '\033[32m',
-        '☂': '\033[32m', '♫': '\033[32m'}
-    reset_color = '\033[0m'
-    if board[y_player][x_player] == item_colors['●'] + '●' + reset_color:
-        inventory['●'] += 1
-    elif board[y_player][x_player] == item_colors['☯'] + '☯' + reset_color:
-        inventory['☯'] += 1
-    elif board[y_player][x_player] == item_colors['☂'] + '☂' + reset_color:
-        inventory['☂'] += 1
-    elif board[y_player][x_player] == item_colors['♫'] + '♫' + reset_color:
-        inventory['♫'] += 1
-    elif board[y_player][x_player] == item_colors['⚛'] + '⚛' + reset_color:
-        inventory['●'] += 20
-    elif board[y_player][x_player] == item_colors['✡'] + '✡' + reset_color:
-        health += 5
-    elif board[y_player][x_player] == item_colors['✿'] + '✿' + reset_color:
-        health -= 5
-    elif board[y_player][x_player] == item_colors['℥'] + '℥' + reset_color:
-        inventory['℥'] += 1
+    tile = get_tile(board, x_player, y_player)
+    if tile in ITEM_EFFECTS:
+        item, amount = ITEM_EFFECTS[tile]
+        if item == 'health':
+            health += amount
+        else:
+            inventory[item] += amount
     return inventory, health
 
 
-def minion_encounter(x_player, y_player, minions_location, health):
+def minion_encounter(x_player, y_player, minions, health):
     """Function checks if player encounters an enemy and changes his position on board and health if it has happened.
 
     Args:
         x_player (int): horizontal position of player on the board
         y_player (int): vertical position of player on the board
-        minions_location (list): list containing positions of enemies on the board
+        minions (dict): positions of enemies on the board (see create_minions)
         health (int): player's health points
 
     Return:
@@ -120,83 +98,176 @@ def minion_encounter(x_player, y_player, minions_location, health):
         health (int): player's health points
     """
 
-    for enemy_location in minions_location:
-        if x_player == enemy_location[0] and y_player == enemy_location[1]:
-            health -= 10
-            x_player = 1
-            y_player = 1
+    if (x_player, y_player) in minions['cells']:
+        health -= 10
+        x_player = 1
+        y_player = 1
     return x_player, y_player, health
 
 
-def move_minions(board, minions_location, character_color):
+def move_minions(board, minions, rng=random):
     """Function randomly moves evil minions on the board.
 
     Args:
-        board (list): list of board rows (list)
-        minions_location (list): list containing positions of enemies on the board
-        character_color (str): escape code for chosen character color
+        board (dict): tile board
+        minions (dict): positions of enemies on the board (see create_minions)
+        rng (random.Random): random numbers generator
 
     Return:
-        board (list): list of board rows (list)
-        minions_location (list): list containing positions of enemies on the board
+        board (dict): tile board
+        minions (dict): positions of enemies on the board (see create_minions)
     """
 
-    acceptable_place = [' ', character_color + '🐿️' + '\033[0m']  # content of place where minion can move
-    for enemy_location_nr in range(len(minions_location)):     # loop through all minions location
-        x_minion = minions_location[enemy_location_nr][0]
-        y_minion = minions_location[enemy_location_nr][1]
+    tiles = board['tiles']
+    width = board['width']
+    location = minions['location']
+    cells = minions['cells']
+    for enemy_location_nr in range(len(location)):     # loop through all minions location
+        x_minion, y_minion = location[enemy_location_nr]
+        position = y_minion * width + x_minion
         possible_moves = []     # list of adjacent places on board where minion can move
-        if board[y_minion][x_minion - 1] in acceptable_place:
-            possible_moves.append([x_minion - 1, y_minion])
-        if board[y_minion][x_minion + 1] in acceptable_place:
-            possible_moves.append([x_minion + 1, y_minion])
-        if board[y_minion - 1][x_minion] in acceptable_place:
-            possible_moves.append([x_minion, y_minion - 1])
-        if board[y_minion + 1][x_minion] in acceptable_place:
-            possible_moves.append([x_minion, y_minion + 1])
+        # a place taken by another minion is skipped even if its tile is empty, so the index stays consistent
+        for target in ((x_minion - 1, y_minion), (x_minion + 1, y_minion), (x_minion, y_minion - 1),
+                       (x_minion, y_minion + 1)):
+            if tiles[target[1] * width + target[0]] == EMPTY and target not in cells:
+                possible_moves.append(target)
 
         if len(possible_moves) > 0:
-            chosen_move = random.choice(possible_moves)
-            board[chosen_move[1]][chosen_move[0]] = board[y_minion][x_minion]
-            board[y_minion][x_minion] = ' '
-            minions_location[enemy_location_nr] = chosen_move.copy()
+            chosen_move = rng.choice(possible_moves)
+            tiles[chosen_move[1] * width + chosen_move[0]] = tiles[position]
+            tiles[position] = EMPTY
+            location[enemy_location_nr] = chosen_move
+            del cells[(x_minion, y_minion)]     # keeps index of occupied places up to date
+            cells[chosen_move] = enemy_location_nr
+
+    return board, minions
+
+
+def move_minions_batch(board, minions, rng=random):
+    """Function randomly moves all evil minions at once using numpy arrays (for levels with large swarms).
+        Every minion picks one of adjacent empty places, like in move_minions. Minions move simultaneously,
+        so a minion cannot enter a place left by another one in the same step, and if several minions
+        choose the same place, a random one of them moves there and the others stay.
+        A board made from a shared template gets its own bytearray of tiles first (the swarm changes tiles
+        all over the board, so an overlay would not save memory anyway). Without numpy installed
+        (or for other boards with tiles which are not a bytearray, like worlds) move_minions is used.
+
+    Args:
+        board (dict): tile board
+        minions (dict): positions of enemies on the board (see create_minions)
+        rng (random.Random): random numbers generator
+
+    Return:
+        board (dict): tile board
+        minions (dict): positions of enemies on the board (see create_minions)
+    """
+
+    if numpy is not None and isinstance(board['tiles'], OverlayTiles):
+        board['tiles'] = bytearray(bytes(board['tiles']))
+    if numpy is None or not minions['location'] or not isinstance(board['tiles'], bytearray):
+        return move_minions(board, minions, rng)
+
+    width = board['width']
+    grid = numpy.frombuffer(board['tiles'], dtype=numpy.uint8)     # shares memory with board tiles
+    generator = numpy.random.default_rng(rng.getrandbits(64))
+    location = numpy.array(minions['location'], dtype=numpy.int64)
+    positions = location[:, 1] * width + location[:, 0]
+    offsets = numpy.array([-1, 1, -width, width])    # left, right, up, down (order of move_minions)
+
+    possible_moves = grid[positions[:, None] + offsets] == EMPTY    # (minions, 4) mask of legal moves
+    moves_amount = possible_moves.sum(axis=1)
+    can_move = moves_amount > 0
+    chosen_nr = (generator.random(len(positions)) * moves_amount).astype(numpy.int64)
+    # index of the chosen_nr-th legal move of every minion
+    chosen_move = numpy.argmax(possible_moves.cumsum(axis=1) > chosen_nr[:, None], axis=1)
+    targets = positions + offsets[chosen_move]
+
+    # conflicts: of minions choosing the same place the first one in random order wins
+    movers = generator.permutation(numpy.flatnonzero(can_move))
+    unique_targets, first = numpy.unique(targets[movers], return_index=True)
+    winners = movers[first]
+
+    grid[targets[winners]] = grid[positions[winners]]
+    grid[positions[winners]] = EMPTY
+
+    positions[winners] = targets[winners]
+    lines, columnes = numpy.divmod(positions, width)
+    # index of occupied places is rebuilt in one go, most of minions have moved anyway
+    minions['location'] = list(zip(columnes.tolist(), lines.tolist()))
+    minions['cells'] = dict(zip(minions['location'], range(len(positions))))
+    return board, minions
+
+
+def chase_minions(board, minions, field, rng=random):
+    """Function moves evil minions towards the player, each one steps down the distance field
+        to the adjacent empty place closest to the player (a random one of equally close places).
+        Minion which cannot get closer stays in place. Minion which has caught the player (stands on his place,
+        like at the start where the player is sent back) steps away to the adjacent empty place farthest
+        from him, so the player is hurt only once and can run away.
+
+    Args:
+        board (dict): tile board
+        minions (dict): positions of enemies on the board (see create_minions)
+        field (dict): distance field to the player (see flow_field.update_flow_field)
+        rng (random.Random): random numbers generator
+
+    Return:
+        board (dict): tile board
+        minions (dict): positions of enemies on the board (see create_minions)
+    """
 
-    return board, minions_location
+    tiles = board['tiles']
+    width = board['width']
+    location = minions['location']
+    cells = minions['cells']
+    for enemy_location_nr in range(len(location)):
+        x_minion, y_minion = location[enemy_location_nr]
+        position = y_minion * width + x_minion
+        best_distance = field_distance(field, position)
+        direction = 1 if best_distance == 0 else -1     # the minion which has caught the player steps away
+        best_moves = []
+        for move in (-1, 1, -width, width):
+            target = position + move
+            # the player can clear a place taken by a minion, so occupied places are checked too
+            if tiles[target] == EMPTY and (target % width, target // width) not in cells:
+                distance = field_distance(field, target)
+                if (distance - best_distance) * direction > 0:
+                    best_distance = distance
+                    best_moves = [move]
+                elif distance == best_distance and best_moves:
+                    best_moves.append(move)
+
+        if best_moves:
+            chosen_position = position + rng.choice(best_moves)
+            chosen_move = (chosen_position % width, chosen_position // width)
+            tiles[chosen_position] = tiles[position]
+            tiles[position] = EMPTY
+            location[enemy_location_nr] = chosen_move
+            del cells[(x_minion, y_minion)]
+            cells[chosen_move] = enemy_location_nr
+
+    return board, minions
 
 
 def light_magic_lamps(board, x_player, y_player, button_pressed, lamps_lit):
     """Function lights magic lamps in contact with user.
 
     Args:
-        board (list): list of board rows (list)
+        board (dict): tile board
         x_player (int): horizontal position of player on the board
         y_player (int): vertical position of player on the board
         button_pressed (str): button pressed by user
         lamps_lit (int): number of lit magic lamps
 
     Return:
-        board (list): list of board rows (list)
+        board (dict): tile board
         lamps_lit (int): number of lit magic lamps
     """
 
-    reset_color = '\033[0m'
-    lamps_colors = {
-        'on': '\033[31m', 'off': '\033[33m'}
-    place_on_right_side = board[y_player][x_player + 1]
-    place_on_left_side = board[y_player][x_player - 1]
-    place_on_up_side = board[y_player - 1][x_player]
-    place_on_down_side = board[y_player + 1][x_player]
-
-    if button_pressed == 'd' and place_on_right_side == lamps_colors['off'] + '☀' + reset_color:
-        lamps_lit += 1
-        board[y_player][x_player + 1] = lamps_colors['on'] + '☀' + reset_color
-    elif button_pressed == 'a' and place_on_left_side == lamps_colors['off'] + '☀' + reset_color:
-        lamps_lit += 1
-        board[y_player][x_player - 1] = lamps_colors['on'] + '☀' + reset_color
-    elif button_pressed == 'w' and place_on_up_side == lamps_colors['off'] + '☀' + reset_color:
-        lamps_lit += 1
-        board[y_player - 1][x_player] = lamps_colors['on'] + '☀' + reset_color
-    elif button_pressed == 's' and place_on_down_side == lamps_colors['off'] + '☀' + reset_color:
-        lamps_lit += 1
-        board[y_player + 1][x_player] = lamps_colors['on'] + '☀' + reset_color
+    if button_pressed in MOVES:
+        x_lamp = x_player + MOVES[button_pressed][0]
+        y_lamp = y_player + MOVES[button_pressed][1]
+        if get_tile(board, x_lamp, y_lamp) == LAMP_OFF:
+            lamps_lit += 1
+            set_tile(board, x_lamp, y_lamp, LAMP_ON)
     return board, lamps_lit
@@ -2,29 +2,35 @@ import random
 import time
 import os
 
+TIME_LIMIT = 15     # seconds for the answer
+INSTRUCTION = """
+    *** Add 2 numbers! ***
+     You have 15 seconds.
+     """
+
 
 def initial_print():
     """Function prints the game instruction."""
 
     os.system('clear')
-    print("""
-    *** Add 2 numbers! ***
-     You have 15 seconds.
-     """)
+    print(INSTRUCTION)
 
 
-def generate_numbers():
+def generate_numbers(rng=random):
     """Function generates 2 numbers to be summed.
 
+    Args:
+        rng (random.Random): random numbers generator
+
     Return:
+        question (str): the sum to be counted
         total (int): sum of two generated numbers
     """
 
-    a = random.randrange(100, 1000)
-    b = random.randrange(100, 1000)
-    print('{} + {} = '.format(a, b))
+    a = rng.randrange(100, 1000)
+    b = rng.randrange(100, 1000)
     total = a + b
-    return total
+    return '{} + {} = '.format(a, b), total
 
 
 def guessing():
@@ -47,40 +53,41 @@ def check_answer(total, guess, your_time):
 
     Args:
         total (int): sum of two generated numbers
-        guess (int): user's guess
-        your_time (int): time since the beginning of the task
+        guess (int): user's guess (None if it is not a number)
+        your_time (float): time since the beginning of the task in seconds
 
     Return:
         won (bool): True if the user's answer is correct, False otherwise
+        message (str): result for the user
     """
 
     won = False
-    if your_time <= 15:
+    if your_time <= TIME_LIMIT:
         if guess != total:
-            print('Wrong answer. Try again')
+            message = 'Wrong answer. Try again'
         else:
-            print('Well done!')
-            time.sleep(2)
+            message = 'Well done!'
             won = True
     else:
-        print('You\'ve exceeded the time. Try again.')
-        time.sleep(2)
-    return won
+        message = 'You\'ve exceeded the time. Try again.'
+    return won, message
 
 
 def main():
     won = False
     while not won:
         initial_print()
-        total = generate_numbers()
-        guess = 0
+        question, total = generate_numbers()
+        print(question)
         your_time = 0
         start_guess = time.time()
-        while guess != total and your_time <= 15:
+        while not won and your_time <= TIME_LIMIT:
             guess = guessing()
             end_guess = time.time()
             your_time = int(end_guess - start_guess)
-            won = check_answer(total, guess, your_time)
+            won, message = check_answer(total, guess, your_time)
+            print(message)
+        time.sleep(2)
     return won
 
 
@@ -0,0 +1,75 @@
+from tiles import RESET_COLOR
+
+COLORS = ['\033[31m', '\033[32m', '\033[33m', '\033[34m', '\033[35m', '\033[36m', '\033[37m']
+FRAME_SEPARATOR = '***\n'
+# asset name: text file with frames separated by '***' lines
+ASSET_FILES = {'intro': 'intro.txt', 'level_titles': 'levels_title.txt', 'end_images': 'end_images.txt'}
+assets = {'frames': {}, 'colored': {}, 'lines': {}}     # cache of parsed frames and their colorized versions
+
+
+def load_assets(names=None):
+    """Function reads text assets into the cache, so they are shown later without any file reading.
+        Assets not loaded here are read the first time they are needed.
+
+    Args:
+        names (list): names of assets (see ASSET_FILES), all of them if not given
+    """
+
+    for name in names or ASSET_FILES:
+        asset_frames(name)
+
+
+def asset_frames(name):
+    """Function returns frames of text asset, reading the file only the first time.
+
+    Args:
+        name (str): name of the asset (see ASSET_FILES)
+
+    Return:
+        frames (tuple): texts of frames
+    """
+
+    frames = assets['frames'].get(name)
+    if frames is None:
+        with open(ASSET_FILES[name]) as asset_file:
+            frames = assets['frames'][name] = tuple(asset_file.read().split(FRAME_SEPARATOR))
+    return frames
+
+
+def colored_frame(name, number, color):
+    """Function returns frame of text asset in given color, colorized only the first time.
+
+    Args:
+        name (str): name of the asset (see ASSET_FILES)
+        number (int): number of the frame
+        color (str): escape code of the color
+
+    Return:
+        text (str): frame with color escape codes
+    """
+
+    key = (name, number, color)
+    text = assets['colored'].get(key)
+    if text is None:
+        text = assets['colored'][key] = color + asset_frames(name)[number] + RESET_COLOR
+    return text
+
+
+def colored_lines(name, number):
+    """Function returns lines of text asset frame in every color (see COLORS), colorized only the first time,
+        so lines can be shown in random colors without building them again.
+
+    Args:
+        name (str): name of the asset (see ASSET_FILES)
+        number (int): number of the frame
+
+    Return:
+        lines (tuple): for every line of the frame, tuple of the line in each color
+    """
+
+    key = (name, number)
+    lines = assets['lines'].get(key)
+    if lines is None:
+        lines = assets['lines'][key] = tuple(tuple(color + line + RESET_COLOR for color in COLORS)
+                                             for line in asset_frames(name)[number].splitlines())
+    return lines
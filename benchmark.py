@@ -0,0 +1,439 @@
+import gc
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import contextlib
+import display
+import highscore
+import environment
+import world
+import engine
+from actions import move_minions, move_minions_batch, chase_minions, evil_hamster_defeat
+from controls import enable_level_exit
+from flow_field import create_flow_field, update_flow_field
+from tiles import overlay_board
+
+BASELINE_FILENAME = 'benchmark_baseline.json'
+SYNTHETIC_SIZE = (1200, 400)    # columns and lines of scaled-up synthetic map (100 times more cells)
+
+
+def legacy_parse_level(filename):
+    """Function parses level file the way loading_level did before levels were compiled
+    (one str.replace pass over the row for every colored item).
+
+    Args:
+        filename (str): name of level file
+
+    Return:
+        board (list): list of board rows (list)
+    """
+
+    item_colors = {
+        '●': '\033[33m', '⚛': '\033[34m', '✿': '\033[31m', '✡': '\033[94m', 'ᴥ': '\033[31m',
+        '#': '\033[31m', '℥': '\033[32m', '☯': '\033[32m', '☂': '\033[32m', '♫': '\033[32m'}
+    reset_color = '\033[0m'
+
+    with open(filename) as level_file:
+        level_content = level_file.readlines()
+    board = []
+    for line in level_content:
+        board_line = list(line.strip('\n'))
+        for key in item_colors:
+            board_line = [char.replace(key, item_colors[key] + key + reset_color) for char in board_line]
+        board.append(board_line)
+    return board
+
+
+def text_parse_level(filename):
+    """Function parses level file without using the cache.
+
+    Args:
+        filename (str): name of level file
+
+    Return:
+        board (dict): tile board
+    """
+
+    with open(filename) as level_file:
+        return environment.parse_level(level_file.readlines())
+
+
+def write_synthetic_level(filename, columns, lines, seed=0):
+    """Function writes level file with random walls and barriers in the format of bundled levels.
+
+    Args:
+        filename (str): name of level file to create
+        columns (int): width of the map
+        lines (int): height of the map
+        seed (int): seed of random generator
+    """
+
+    rng = random.Random(seed)
+    inside = ' ' * 40 + 'X' * 3 + '#' * 2
+    with open(filename, 'w') as level_file:
+        level_file.write('X' * columns + ' Level: Ỻ\n')
+        for i in range(lines - 2):
+            row = ''.join(rng.choice(inside) for j in range(columns - 2))
+            level_file.write('X' + row + 'X\n')
+        level_file.write('X' * columns + '\n')
+
+
+def measure(function, *args, repeat=5):
+    """Function measures the best time of several calls of function.
+
+    Args:
+        function (function): measured function
+        args: arguments of measured function
+        repeat (int): number of calls
+
+    Return:
+        best_time (float): the shortest call time in seconds
+    """
+
+    best_time = float('inf')
+    for i in range(repeat):
+        start = time.perf_counter()
+        function(*args)
+        best_time = min(best_time, time.perf_counter() - start)
+    return best_time
+
+
+def benchmark_level_loading(sizes=((120, 40), (1200, 400), (3000, 1000))):
+    """Function compares loading of levels from text files and from the compiled cache.
+
+    Args:
+        sizes (tuple): (columns, lines) of synthetic maps
+
+    Return:
+        results (list): (level name, legacy parse, text parse, cached load) times in seconds
+    """
+
+    results = []
+    levels = [('level{}.txt'.format(level_nr), 'level{}.txt'.format(level_nr)) for level_nr in range(1, 5)]
+    with tempfile.TemporaryDirectory() as directory:
+        for columns, lines in sizes:
+            filename = os.path.join(directory, 'synthetic_{}x{}.txt'.format(columns, lines))
+            write_synthetic_level(filename, columns, lines)
+            levels.append(('{}x{}'.format(columns, lines), filename))
+        for name, filename in levels:
+            cache_filename = os.path.join(directory, os.path.basename(filename) + '.cache')
+            environment.load_compiled_level(filename, cache_filename)    # compiles the level once
+            repeat = 5 if os.path.getsize(filename) < 10 ** 6 else 2
+            results.append((name, measure(legacy_parse_level, filename, repeat=repeat),
+                            measure(text_parse_level, filename, repeat=repeat),
+                            measure(environment.load_compiled_level, filename, cache_filename, repeat=repeat)))
+    return results
+
+
+def print_level_loading(results):
+    """Function prints table with level loading times.
+
+    Args:
+        results (list): (level name, legacy parse, text parse, cached load) times in seconds
+    """
+
+    print('{:>12} {:>14} {:>14} {:>14} {:>8}'.format('level', 'legacy [ms]', 'text [ms]', 'cached [ms]', 'speedup'))
+    for name, legacy_time, text_time, cached_time in results:
+        print('{:>12} {:14.3f} {:14.3f} {:14.3f} {:7.1f}x'.format(
+            name, legacy_time * 1000, text_time * 1000, cached_time * 1000, legacy_time / cached_time))
+
+
+def synthetic_board(directory, columns, lines, minions_amount):
+    """Function creates scaled-up synthetic level with food and minions spread over the whole map.
+
+    Args:
+        directory (str): directory for the level file
+        columns (int): width of the map
+        lines (int): height of the map
+        minions_amount (int): number of minions
+
+    Return:
+        filename (str): name of synthetic level file
+        board (dict): tile board with items and minions
+        minions (dict): positions of enemies on the board (see create_minions)
+    """
+
+    filename = os.path.join(directory, 'synthetic_{}x{}.txt'.format(columns, lines))
+    write_synthetic_level(filename, columns, lines)
+    board = environment.load_compiled_level(filename)
+    free_cells = environment.create_free_cells(board, (1, lines - 1, 1, columns - 1))
+    board = environment.insert_food(board, 1, free_cells)
+    minions_location = []
+    for i in range(minions_amount):
+        minions_location.append(environment.place_in_free_cell(board, free_cells, environment.MINION))
+    return filename, board, environment.create_minions(minions_location)
+
+
+def copy_board(board):
+    """Function copies tile board so that measured function can change it.
+
+    Args:
+        board (dict): tile board
+
+    Return:
+        board (dict): copy of the tile board
+    """
+
+    board_copy = dict(board)
+    board_copy['tiles'] = bytearray(board['tiles'])
+    board_copy['labels'] = dict(board['labels'])
+    return board_copy
+
+
+def display_frame(board, minions, screen):
+    """Function moves minions and renders one game frame, as one iteration of the main loop does.
+
+    Args:
+        board (dict): tile board
+        minions (dict): positions of enemies on the board (see create_minions)
+        screen (dict): last frame emitted to the terminal (see display.create_screen)
+    """
+
+    move_minions(board, minions)
+    display.manage_display(board, 1, 1, '\033[31m', screen)
+
+
+def chase_step(board, minions, field, player):
+    """Function moves the player one step back and forth along the first map line and lets minions chase him.
+
+    Args:
+        board (dict): tile board
+        minions (dict): positions of enemies on the board (see create_minions)
+        field (dict): distance field to the player (see flow_field.create_flow_field)
+        player (list): horizontal position of the player and direction of his move
+    """
+
+    if not 1 <= player[0] + player[1] < 20:
+        player[1] = -player[1]
+    player[0] += player[1]
+    update_flow_field(field, board, player[0], 1, minions)
+    chase_minions(board, minions, field)
+
+
+def write_highscores(filename, amount):
+    """Function writes highscores log with random scores.
+
+    Args:
+        filename (str): name of highscores log
+        amount (int): number of scores
+    """
+
+    rng = random.Random(0)
+    with open(filename, 'w') as highscores_file:
+        for i in range(amount):
+            highscores_file.write(highscore.format_score_line(
+                (rng.randrange(30, 3600), rng.randrange(1, 100), '2017-05-06', 'player{}'.format(i))))
+
+
+def load_world_board(world_filename):
+    """Function opens chunked world file as a tile board and closes it, so repeated loading leaks no files.
+
+    Args:
+        world_filename (str): name of the world file
+    """
+
+    world.close_board(world.load_world(world_filename))
+
+
+def hot_path_cases(directory, resources):
+    """Function prepares benchmark cases of the game hot paths.
+
+    Args:
+        directory (str): directory for temporary files
+        resources (contextlib.ExitStack): closes files opened for the cases when they are finished
+
+    Return:
+        cases (list): (case name, setup function returning arguments, measured function)
+    """
+
+    cases = []
+    columns, lines = SYNTHETIC_SIZE
+    filename, big_board, big_minions = synthetic_board(directory, columns, lines, 1000)
+    random.seed(0)
+    level_board = environment.loading_level('2')
+    level_board, level_minions = environment.insert_minions(level_board, 2)
+    null_sink = resources.enter_context(open(os.devnull, 'w'))
+    level_screen = display.create_screen(null_sink)
+    big_screen = display.create_screen(null_sink)
+    display_frame(level_board, level_minions, level_screen)     # first frame is always full redraw
+    display_frame(big_board, big_minions, big_screen)
+    world_filename = os.path.splitext(filename)[0] + '.world'
+    world.convert_level_file(filename, world_filename)
+    world_board, world_minions = environment.insert_minions(world.load_world(world_filename), 2)
+    resources.callback(world.close_board, world_board)
+    world_screen = display.create_screen(null_sink)
+    display_frame(world_board, world_minions, world_screen)
+    inventory = {'●': 10, '☯': 1, '☂': 2, '♫': 3}
+
+    for level_nr in '1234':
+        cases.append(('loading_level/level' + level_nr, lambda level_nr=level_nr: (level_nr,),
+                      environment.loading_level))
+    cases.append(('loading_level/synthetic', lambda: (filename,), environment.load_compiled_level))
+    cases.append(('loading_level/world', lambda: (world_filename,), load_world_board))
+    # levels are loaded once, next games only get overlays of the shared templates
+    cases.append(('setting_next_level/level1', lambda: (0, {}, random.Random(0)), environment.setting_next_level))
+    cases.append(('insert_food/level2', lambda: (environment.loading_level('2'), 2), environment.insert_food))
+    cases.append(('insert_food/synthetic', lambda: (copy_board(big_board), 4), environment.insert_food))
+    cases.append(('move_minions/level2', lambda: (level_board, level_minions), move_minions))
+    cases.append(('move_minions/synthetic', lambda: (big_board, big_minions), move_minions))
+    cases.append(('move_minions_batch/synthetic', lambda: (big_board, big_minions), move_minions_batch))
+    # boards of the game are overlays of shared templates, the batch mover must not fall back to move_minions
+    overlay_template = dict(big_board, tiles=bytes(big_board['tiles']))
+    overlay_big_board = overlay_board(overlay_template)
+    overlay_minions = environment.create_minions(big_minions['location'])
+    cases.append(('move_minions_batch/overlay', lambda: (overlay_big_board, overlay_minions), move_minions_batch))
+    chase_board, chase_minions_location = copy_board(big_board), environment.create_minions(big_minions['location'])
+    chase_field, chase_player = create_flow_field(chase_board, 1, 1), [1, 1]
+    cases.append(('chase_minions/synthetic', lambda: (chase_board, chase_minions_location, chase_field, chase_player),
+                  chase_step))
+    # barriers are removed by the first call, next frames only check the conditions
+    hamster_board = environment.index_barriers(environment.loading_level('4'), 4)
+    cases.append(('evil_hamster_defeat/level4', lambda: (hamster_board, 1, 1, 4, 100), evil_hamster_defeat))
+    exit_board = environment.index_barriers(environment.loading_level('1'), 1)
+    cases.append(('enable_level_exit/level1', lambda: (exit_board, 1, {'●': 60}, 0), enable_level_exit))
+    game_state, events = engine.new_game('squirrel', seed=0)
+    cases.append(('handle_button/idle', lambda: (game_state, ''), engine.handle_button))
+    cases.append(('update_board_information/level2',
+                  lambda: (level_board, 2, 'squirrel', 30, inventory, 100, 600), display.update_board_information))
+    cases.append(('manage_display/level2', lambda: (level_board, level_minions, level_screen), display_frame))
+    cases.append(('manage_display/synthetic', lambda: (big_board, big_minions, big_screen), display_frame))
+    cases.append(('manage_display/world', lambda: (world_board, world_minions, world_screen), display_frame))
+
+    for amount in [10, 10000]:
+        highscores_filename = os.path.join(directory, 'highscores{}.log'.format(amount))
+        write_highscores(highscores_filename, amount)
+        cases.append(('load_highscores/{}'.format(amount), lambda filename=highscores_filename: (filename,),
+                      highscore.load_highscores))
+    highscores_store = highscore.load_highscores(highscores_filename)  # compacted now and then while adding
+    cases.append(('add_score/10000', lambda: (highscores_store, 50, 100, 'squirrel'), highscore.add_score))
+    return cases
+
+
+def run_case(setup, function, repeat=7, min_time=0.02):
+    """Function measures the best time of function call, excluding preparation of arguments.
+        Fast functions are called several times in a row to get above the timer resolution.
+
+    Args:
+        setup (function): function returning arguments of measured function
+        function (function): measured function
+        repeat (int): number of measurements
+        min_time (float): minimal time of one measurement in seconds
+
+    Return:
+        best_time (float): the shortest time of one call in seconds
+    """
+
+    args = setup()
+    start = time.perf_counter()
+    function(*args)
+    number = max(1, min(1000, int(min_time / max(time.perf_counter() - start, 1e-7))))
+    best_time = float('inf')
+    for i in range(repeat):
+        calls_args = [setup() for call in range(number)]
+        gc.disable()    # garbage collection would add random pauses to measurements
+        start = time.perf_counter()
+        for args in calls_args:
+            function(*args)
+        best_time = min(best_time, (time.perf_counter() - start) / number)
+        gc.enable()
+    return best_time
+
+
+def run_suite(case_filter=''):
+    """Function runs benchmark cases of the game hot paths.
+
+    Args:
+        case_filter (str): only cases containing this text in their name are run
+
+    Return:
+        results (dict): case name: the best time in seconds
+    """
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory, contextlib.ExitStack() as resources:
+        for name, setup, function in hot_path_cases(directory, resources):
+            if case_filter in name:
+                results[name] = run_case(setup, function)
+    return results
+
+
+def compare_with_baseline(results, baseline, threshold):
+    """Function finds cases slower than baseline by more than threshold.
+
+    Args:
+        results (dict): case name: the best time in seconds
+        baseline (dict): case name: the best time in seconds stored earlier
+        threshold (float): allowed slowdown (0.25 means 25%)
+
+    Return:
+        regressions (list): (case name, baseline time, current time)
+    """
+
+    regressions = []
+    for name in results:
+        if name in baseline and results[name] > baseline[name] * (1 + threshold):
+            regressions.append((name, baseline[name], results[name]))
+    return regressions
+
+
+def print_results(results, baseline):
+    """Function prints table with benchmark results.
+
+    Args:
+        results (dict): case name: the best time in seconds
+        baseline (dict): case name: the best time in seconds stored earlier
+    """
+
+    print('{:36} {:>14} {:>14} {:>8}'.format('case', 'time [ms]', 'baseline [ms]', 'change'))
+    for name in results:
+        if name in baseline:
+            print('{:36} {:14.3f} {:14.3f} {:+7.0%}'.format(
+                name, results[name] * 1000, baseline[name] * 1000, results[name] / baseline[name] - 1))
+        else:
+            print('{:36} {:14.3f} {:>14} {:>8}'.format(name, results[name] * 1000, '-', '-'))
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Benchmarks of The Day of the Squirrel hot paths.')
+    parser.add_argument('--baseline', default=BASELINE_FILENAME, help='JSON file with baseline results')
+    parser.add_argument('--save', action='store_true', help='save results as the new baseline')
+    parser.add_argument('--threshold', type=float, default=0.5, help='allowed slowdown, 0.5 means 50%%')
+    parser.add_argument('--filter', default='', help='run only cases containing this text')
+    parser.add_argument('--loading', action='store_true', help='compare text parsing and cached level loading')
+    arguments = parser.parse_args(arguments)
+
+    if arguments.loading:
+        print_level_loading(benchmark_level_loading())
+        return 0
+
+    if not arguments.save and not os.path.exists(arguments.baseline):
+        # results are machine specific, so the baseline is not kept in the repository
+        print('WARNING: baseline {} not found, nothing to compare with (run with --save first)'.format(
+            arguments.baseline), file=sys.stderr)
+        return 2
+    results = run_suite(arguments.filter)
+    baseline = {}
+    if os.path.exists(arguments.baseline):
+        with open(arguments.baseline) as baseline_file:
+            baseline = json.load(baseline_file)['results']
+    print_results(results, baseline)
+
+    if arguments.save:
+        baseline.update(results)
+        with open(arguments.baseline, 'w') as baseline_file:
+            json.dump({'python': sys.version.split()[0], 'results': baseline}, baseline_file, indent=2, sort_keys=True)
+        print('Baseline saved to', arguments.baseline)
+        return 0
+
+    regressions = compare_with_baseline(results, baseline, arguments.threshold)
+    for name, baseline_time, current_time in regressions:
+        print('REGRESSION {}: {:.3f} ms -> {:.3f} ms'.format(name, baseline_time * 1000, current_time * 1000))
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,94 @@
+import time
+
+
+def create_clock(rates, max_catch_up=None, now=None):
+    """Function creates fixed-timestep clock with independent timers, e.g. game simulation and screen rendering.
+
+    Args:
+        rates (dict): timer name: number of ticks per second
+        max_catch_up (dict): timer name: number of ticks run at most at once when the timer fell behind
+            (5 if not given), older ticks are dropped
+        now (float): current time (time.monotonic() if not given)
+
+    Return:
+        clock (dict): 'intervals' and time of the 'next' tick by timer name, 'max_catch_up' and 'stats'
+            (see clock_report)
+    """
+
+    now = time.monotonic() if now is None else now
+    max_catch_up = max_catch_up or {}
+    return {'intervals': {name: 1 / rates[name] for name in rates}, 'next': {name: now for name in rates},
+            'max_catch_up': {name: max_catch_up.get(name, 5) for name in rates},
+            'stats': {name: {'ticks': 0, 'late': 0, 'dropped': 0} for name in rates}}
+
+
+def due_ticks(clock, name, now=None):
+    """Function returns number of ticks of the timer which should be run now and schedules the next tick.
+        Ticks run more than one interval after their time are counted as late. If more than max_catch_up
+        ticks are due, the oldest ones are dropped, so a slow frame does not make the game run too fast later.
+
+    Args:
+        clock (dict): clock (see create_clock)
+        name (str): timer name
+        now (float): current time (time.monotonic() if not given)
+
+    Return:
+        ticks (int): number of ticks to run
+    """
+
+    now = time.monotonic() if now is None else now
+    next_time = clock['next'][name]
+    if now < next_time:
+        return 0
+    interval = clock['intervals'][name]
+    ticks = int((now - next_time) / interval) + 1
+    clock['next'][name] = next_time + ticks * interval
+    stats = clock['stats'][name]
+    stats['late'] += ticks - 1
+    dropped = max(ticks - clock['max_catch_up'][name], 0)
+    stats['dropped'] += dropped
+    stats['ticks'] += ticks - dropped
+    return ticks - dropped
+
+
+def time_to_next(clock, now=None):
+    """Function returns time left to the nearest tick of any timer.
+
+    Args:
+        clock (dict): clock (see create_clock)
+        now (float): current time (time.monotonic() if not given)
+
+    Return:
+        seconds (float): time to wait (0 if some tick is already due)
+    """
+
+    now = time.monotonic() if now is None else now
+    return max(min(clock['next'].values()) - now, 0)
+
+
+def reset_clock(clock, now=None):
+    """Function restarts all timers from now, e.g. after the game was paused by another screen,
+        so the pause does not count as late or dropped ticks.
+
+    Args:
+        clock (dict): clock (see create_clock)
+        now (float): current time (time.monotonic() if not given)
+    """
+
+    now = time.monotonic() if now is None else now
+    for name in clock['next']:
+        clock['next'][name] = now
+
+
+def clock_report(clock):
+    """Function describes how well timers kept their rates.
+
+    Args:
+        clock (dict): clock (see create_clock)
+
+    Return:
+        report (str): number of run, late and dropped ticks of each timer
+    """
+
+    return ', '.join('{}: {} ticks, {} late, {} dropped'.format(
+        name, stats['ticks'], stats['late'], stats['dropped']) for name, stats in clock['stats'].items())
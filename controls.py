@@ -1,8 +1,17 @@
 import os
+import sys
 import time
-import guess_number_game
-import add_numbers_game
-import remember_number_game
+import codecs
+import select
+from display import clear_screen
+from assets import COLORS, colored_frame
+from tiles import *
+
+MOVES = {'d': (1, 0), 'a': (-1, 0), 'w': (0, -1), 's': (0, 1)}    # button: change of player position
+LEVEL_EXIT_MINIGAMES = {1: 'guess_number', 2: 'add_numbers', 3: 'remember_number'}
+
+ARROW_KEYS = {'A': 'w', 'B': 's', 'C': 'd', 'D': 'a'}  # final characters of arrow keys escape sequences
+keyboard = {'fd': None, 'saved_settings': None, 'raw': False, 'pending': '', 'decoder': None}
 
 
 def user_control(board, x_player, y_player, button_pressed, inventory):
@@ -10,7 +19,7 @@ def user_control(board, x_player, y_player, button_pressed, inventory):
         Movent towards the obstacle ('X') is forbidden.
 
     Args:
-        board (list): list of board rows (list)
+        board (dict): tile board
         x_player (int): horizontal position of player on the board
         y_player (int): vertical position of player on the board
         button_pressed (str): button pressed by user
@@ -20,38 +29,13 @@ def user_control(board, x_player, y_player, button_pressed, inventory):
         y_player (int): vertical position of player on the board
     """
 
-    red = '\033[31m'
-    reset_color = '\033[0m'
-    item_colors = {
-        '●': '\033[33m', '⚛': '\033[34m', '✿': '\033[31m', '✡': '\033[94m',
-        '♦': '\033[32m', 'ᴥ': '\033[31m', '☀': '\033[33m'}
-    place_on_right_side = board[y_player][x_player + 1]
-    place_on_left_side = board[y_player][x_player - 1]
-    place_on_up_side = board[y_player - 1][x_player]
-    place_on_down_side = board[y_player + 1][x_player]
-    places_prohibited_to_stand_on = [
-            'X', red + '#' + reset_color, '☹', '☃', '♞', '☻', '☬', item_colors['☀'] + '☀' + reset_color, red
-            + '☀' + reset_color]
-
-    if button_pressed == 'd' and place_on_right_side not in places_prohibited_to_stand_on:
-        x_player += 1
-    elif button_pressed == 'a' and place_on_left_side not in places_prohibited_to_stand_on:
-        x_player -= 1
-    elif button_pressed == 'w' and place_on_up_side not in places_prohibited_to_stand_on:
-        y_player -= 1
-    elif button_pressed == 's' and place_on_down_side not in places_prohibited_to_stand_on:
-        y_player += 1
-
-    friends = ['☹', '☃', '♞', '☻', '☬']
-    #  conditions for level 4 (feeding friends)
-    if button_pressed == 'd' and place_on_right_side in friends and inventory['●'] > 19:
-        x_player += 1
-    elif button_pressed == 'a' and place_on_left_side in friends and inventory['●'] > 19:
-        x_player -= 1
-    elif button_pressed == 'w' and place_on_up_side in friends and inventory['●'] > 19:
-        y_player -= 1
-    elif button_pressed == 's' and place_on_down_side in friends and inventory['●'] > 19:
-        y_player += 1
+    if button_pressed in MOVES:
+        x_move, y_move = MOVES[button_pressed]
+        flags = tile_flags[get_tile(board, x_player + x_move, y_player + y_move)]
+        #  friends can be visited with enough nuts (level 4 - feeding friends)
+        if flags & PASSABLE or (flags & FRIEND and inventory['●'] > 19):
+            x_player += x_move
+            y_player += y_move
     return x_player, y_player
 
 
@@ -59,7 +43,7 @@ def check_obstacle_contact(board, x_player, y_player, button_pressed, health):
     """Function checks user contact with dangerous obstacle and lowers user health points if it occurs.
 
     Args:
-        board (list): list of board rows (list)
+        board (dict): tile board
         x_player (int): horizontal position of player on the board
         y_player (int): vertical position of player on the board
         button_pressed (str): button pressed by user
@@ -69,45 +53,124 @@ def check_obstacle_contact(board, x_player, y_player, button_pressed, health):
         health (int): player's health points
     """
 
-    red = '\033[31m'
-    reset_color = '\033[0m'
-    place_on_right_side = board[y_player][x_player + 1]
-    place_on_left_side = board[y_player][x_player - 1]
-    place_on_up_side = board[y_player - 1][x_player]
-    place_on_down_side = board[y_player + 1][x_player]
-
-    if button_pressed == 'd' and place_on_right_side == red + '#' + reset_color:
-        health -= 5
-    elif button_pressed == 'a' and place_on_left_side == red + '#' + reset_color:
-        health -= 5
-    elif button_pressed == 'w' and place_on_up_side == red + '#' + reset_color:
-        health -= 5
-    elif button_pressed == 's' and place_on_down_side == red + '#' + reset_color:
-        health -= 5
+    if button_pressed in MOVES:
+        x_move, y_move = MOVES[button_pressed]
+        if tile_flags[get_tile(board, x_player + x_move, y_player + y_move)] & HAZARD:
+            health -= 5
     return health
 
 
-def getch():
-    """Function returns the button pressed by user.
+def open_keyboard():
+    """Function prepares standard input to be read key by key for the whole game session."""
+
+    keyboard['fd'] = sys.stdin.fileno()
+    keyboard['decoder'] = codecs.getincrementaldecoder('utf-8')('replace')
+    keyboard['pending'] = ''
+    if os.isatty(keyboard['fd']):
+        import termios
+        keyboard['saved_settings'] = termios.tcgetattr(keyboard['fd'])
+    raw_mode()
+
+
+def raw_mode():
+    """Function switches terminal into key by key mode without echo (once, until cooked_mode is called)."""
+
+    if not keyboard['raw'] and keyboard['saved_settings'] is not None:
+        import tty
+        tty.setcbreak(keyboard['fd'])
+    keyboard['raw'] = True
+
+
+def cooked_mode():
+    """Function restores line mode of the terminal, e.g. before asking user for input()."""
+
+    if keyboard['raw'] and keyboard['saved_settings'] is not None:
+        import termios
+        termios.tcsetattr(keyboard['fd'], termios.TCSADRAIN, keyboard['saved_settings'])
+    keyboard['raw'] = False
+
+
+def close_keyboard():
+    """Function restores terminal settings saved by open_keyboard."""
+
+    cooked_mode()
+    keyboard['fd'] = None
+    keyboard['saved_settings'] = None
+
+
+def parse_keys(text):
+    """Function splits characters read from terminal into buttons, translating arrow keys into 'w', 's', 'a', 'd'.
+
+    Args:
+        text (str): characters read from terminal
 
     Return:
-        ch (str): button pressed by user
+        keys (list): buttons pressed by user
+        pending (str): beginning of an escape sequence which is not complete yet
     """
 
-    import sys, tty, termios
-    from select import select
-    fd = sys.stdin.fileno()
-    old_settings = termios.tcgetattr(fd)
-    try:
-        tty.setraw(sys.stdin.fileno())
-        [i, o, e] = select([sys.stdin.fileno()], [], [], 0.35)
-        if i:
-            ch = sys.stdin.read(1)
-        else:
-            ch = ''
-    finally:
-        termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
-    return ch
+    keys = []
+    position = 0
+    while position < len(text):
+        char = text[position]
+        if char != '\033':
+            keys.append(char)
+            position += 1
+            continue
+        end = position + 1
+        if end < len(text) and text[end] in '[O':
+            end += 1
+            while end < len(text) and text[end] in '0123456789;':
+                end += 1
+        if end >= len(text):    # sequence continues in data which has not arrived yet
+            return keys, text[position:]
+        if end > position + 1 and text[end] in ARROW_KEYS:
+            keys.append(ARROW_KEYS[text[end]])
+        position = end + 1      # other escape sequences are ignored
+    return keys, ''
+
+
+def merge_repeats(keys):
+    """Function merges repeated presses of the same button (e.g. when button is held) into one.
+
+    Args:
+        keys (list): buttons pressed by user
+
+    Return:
+        merged_keys (list): buttons without consecutive repeats
+    """
+
+    merged_keys = []
+    for key in keys:
+        if not merged_keys or merged_keys[-1] != key:
+            merged_keys.append(key)
+    return merged_keys
+
+
+def read_keys(timeout=0.35):
+    """Function waits up to timeout for user input and returns all buttons pressed since the last call.
+
+    Args:
+        timeout (float): maximal waiting time in seconds when no button is pending
+
+    Return:
+        keys (list): buttons pressed by user (empty if nothing was pressed)
+    """
+
+    if keyboard['fd'] is None:
+        open_keyboard()
+    raw_mode()
+    fd = keyboard['fd']
+    text = keyboard['pending']
+    ready, _, _ = select.select([fd], [], [], timeout)
+    while ready:    # drains everything which is waiting in stdin without blocking
+        data = os.read(fd, 1024)
+        if not data:
+            break
+        text += keyboard['decoder'].decode(data)
+        ready, _, _ = select.select([fd], [], [], 0)
+    keys, keyboard['pending'] = parse_keys(text)
+    return merge_repeats(keys)
 
 
 def checking_level_end(level, inventory, x_player, y_player, hamster_energy, board):
@@ -122,67 +185,56 @@ def checking_level_end(level, inventory, x_player, y_player, hamster_energy, boa
 
     Return:
         next_level (bool): True if level end conditions were met, False otherwise
+        minigame (str): name of the minigame player has to win to pass the exit (None if exit is not reached)
     """
 
     next_level = False
-    if level == 1 and board[y_player][x_player] == '⇵':
-        print_level_title(4)
-        you_win = guess_number_game.main()
-        if you_win:
-            next_level = True
-
-    elif level == 2 and board[y_player][x_player] == '⇵':
-        print_level_title(4)
-        won = add_numbers_game.main()
-        if won:
-            next_level = True
-
-    elif level == 3 and board[y_player][x_player] == '⇵':
-        print_level_title(4)
-        win = remember_number_game.main()
-        if win:
-            next_level = True
-
+    minigame = None
+    if level in LEVEL_EXIT_MINIGAMES and get_tile(board, x_player, y_player) == EXIT:
+        minigame = LEVEL_EXIT_MINIGAMES[level]
     elif level == 4 and hamster_energy == 0:
         next_level = True
-    return next_level
+    return next_level, minigame
 
 
 def print_level_title(number):
     """Function displays level title"""
 
-    color = ['\033[31m', '\033[32m', '\033[33m', '\033[34m', '\033[35m', '\033[36m', '\033[37m']
-    reset_color = '\033[0m'
+    clear_screen()
+    print(colored_frame('level_titles', number, COLORS[0]))
+    time.sleep(3)
 
-    img_file = open('levels_title.txt')
-    images = img_file.read().split('***\n')
-    img_file.close()
 
-    os.system('clear')
-    print(color[0] + images[number] + reset_color)
-    time.sleep(3)
+def exit_area(board):
+    """Function returns area around the exit with barriers removed when the exit is enabled.
+
+    Args:
+        board (dict): tile board
+
+    Return:
+        lines (range): lines of the area
+        columnes (range): columns of the area
+    """
+
+    # exit is in the bottom right corner of the map
+    return range(board['height'] - 3, board['height'] - 1), range(board['width'] - 4, board['width'] - 1)
 
 
 def enable_level_exit(board, level, inventory, lamps_lit):
     """Function removes barrier around exit enabling player go to the next level.
 
     Args:
-        board (list): list of board rows (list)
+        board (dict): tile board
         inventory (dict): collected items(keys) and their amounts (values)
         level (int): current game level
         lamps_lit (int): number of lit magical lamps
 
     Return:
-        board (list): list of board rows (list)
+        board (dict): tile board
     """
 
-    red = '\033[31m'
-    reset_color = '\033[0m'
     if (level == 1 and inventory['●'] > 59) or (level == 2 and inventory['●'] > 59 and lamps_lit == 6) or (
             level == 3 and inventory['●'] > 59 and inventory['℥'] == 4):
-        for lines in range(37, 39):
-            for columnes in range(116, 119):
-                if board[lines][columnes] == red + '#' + reset_color:
-                    board[lines][columnes] = ' '
+        remove_barrier_group(board, 'exit')
 
     return board
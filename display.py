@@ -1,6 +1,21 @@
 import os
+import re
+import sys
 import time
 import random
+import unicodedata
+from tiles import EMPTY, set_tile, tile_texts
+from assets import COLORS, asset_frames, colored_frame, colored_lines
+
+ANSI_ESCAPE = re.compile('\033\\[[0-9;]*[A-Za-z]')
+terminal = {'clears': 0}    # counts full screen clears made outside of the frame renderer
+VIEW_WIDTH = 120    # number of map columns visible on the screen
+VIEW_HEIGHT = 40    # number of map lines visible on the screen
+NUT_TEXT = '\033[33m●\033[0m'
+# HUD field: line and column of the side panel where its value starts
+HUD_FIELDS = {
+    'level': (0, 8), 'name': (1, 9), 'health': (2, 9), 'time': (3, 7), 'hamster': (4, 14), 'nuts': (6, 1),
+    'treasures': (7, 19)}
 
 
 def create_board(columns, lines):
@@ -35,62 +50,370 @@ def print_board(board):
         print(''.join(row))
 
 
+def clear_screen():
+    """Function clears terminal screen and marks the last rendered game frame as outdated."""
+
+    os.system('clear')
+    terminal['clears'] += 1
+
+
+def cell_width(cell):
+    """Function counts how many terminal columns the content of one board cell takes.
+
+    Args:
+        cell (str): content of board cell (may contain color escape codes)
+
+    Return:
+        width (int): number of terminal columns
+    """
+
+    width = 0
+    last_char_width = 0
+    for char in ANSI_ESCAPE.sub('', cell):
+        if char == '\ufe0f':    # emoji presentation selector widens previous character
+            width += 2 - last_char_width
+            last_char_width = 2
+        elif unicodedata.combining(char) or unicodedata.category(char) == 'Cf' or char == '\ufe0e':
+            continue
+        else:
+            last_char_width = 2 if unicodedata.east_asian_width(char) in 'WF' else 1
+            width += last_char_width
+    return width
+
+
+def create_screen(output=None, view_width=VIEW_WIDTH, view_height=VIEW_HEIGHT):
+    """Function creates dictionary keeping the last frame emitted to the terminal.
+
+    Args:
+        output (file): stream the frames are written to (sys.stdout by default)
+        view_width (int): number of map columns visible on the screen
+        view_height (int): number of map lines visible on the screen
+
+    Return:
+        screen (dict): rendered rows, stream, visible part of the map and statistics of the last frame
+    """
+
+    return {'rows': None, 'output': output or sys.stdout, 'clears': terminal['clears'], 'widths': {},
+            'view': [0, 0, view_width, view_height], 'view_size': (view_width, view_height),
+            'last_frame': {'bytes': 0, 'cells': 0}}
+
+
+def follow_player(screen, board, x_player, y_player):
+    """Function moves visible part of the map (viewport) when player gets close to its edge.
+        Viewport jumps by half of its size, so the whole screen changes only once in a while.
+
+    Args:
+        screen (dict): last frame emitted to the terminal (see create_screen)
+        board (dict): tile board of the map
+        x_player (int): horizontal position of player on the board
+        y_player (int): vertical position of player on the board
+    """
+
+    view = screen['view']
+    for axis, position, map_size in [(0, x_player, board['width']), (1, y_player, board['height'])]:
+        size = min(screen['view_size'][axis], map_size)
+        margin = size // 5
+        start = view[axis]
+        if position < start + margin or position >= start + size - margin:
+            start = position - size // 2
+        view[axis] = max(0, min(start, map_size - size))
+        view[axis + 2] = size
+
+
+def row_part(board, y, first_column, width, texts):
+    """Function describes a part of one board row visible on the screen.
+
+    Args:
+        board (dict): tile board
+        y (int): vertical position of the row on the board
+        first_column (int): first visible column
+        width (int): number of visible columns
+        texts (dict): texts drawn over tiles, by row ({y: [(x, text)]})
+
+    Return:
+        part (tuple): visible tiles (bytes) and texts drawn over them (with columns counted from first_column)
+    """
+
+    row_start = y * board['width']
+    tiles = bytes(board['tiles'][row_start + first_column:row_start + min(first_column + width, board['width'])])
+    row_texts = tuple((x - first_column, text) for x, text in texts.get(y, ())
+                      if first_column <= x < first_column + width)
+    return tiles, row_texts
+
+
+def part_cells(part):
+    """Function returns texts of cells of visible part of board row.
+
+    Args:
+        part (tuple): visible tiles and texts drawn over them (see row_part)
+
+    Return:
+        cells (list): texts of cells
+    """
+
+    tiles, texts = part
+    cells = [tile_texts[tile] for tile in tiles]
+    for x, text in texts:
+        if x >= len(cells):
+            cells.extend([''] * (x + 1 - len(cells)))
+        cells[x] = text
+    return cells
+
+
+def texts_by_row(*text_dicts):
+    """Function groups texts drawn over board tiles by rows.
+
+    Args:
+        text_dicts (dict): texts ({(y, x): text}), later ones are drawn over earlier ones
+
+    Return:
+        texts (dict): row number: list of (x, text)
+    """
+
+    texts = {}
+    for text_dict in text_dicts:
+        for (y, x), text in text_dict.items():
+            texts.setdefault(y, []).append((x, text))
+    return texts
+
+
+def screen_rows(screen, board, overlays):
+    """Function lists parts of the map, side panel and text below the map forming each screen row.
+
+    Args:
+        screen (dict): last frame emitted to the terminal (see create_screen)
+        board (dict): tile board of the map with 'panel' and 'footer' tile boards
+        overlays (dict): texts ({(y, x): text}) drawn over map tiles and labels
+
+    Return:
+        rows (list): tuples of row parts (see row_part)
+    """
+
+    view_x, view_y, view_width, view_height = screen['view']
+    map_texts = texts_by_row(board['labels'], overlays)
+    panel = board['panel']
+    panel_texts = texts_by_row(panel['labels'])
+    footer = board['footer']
+    footer_texts = texts_by_row(footer['labels'])
+    rows = []
+    for screen_y in range(min(view_height, board['height'])):
+        parts = (row_part(board, view_y + screen_y, view_x, view_width, map_texts),)
+        if screen_y < panel['height']:
+            parts += (row_part(panel, screen_y, 0, panel['width'], panel_texts),)
+        rows.append(parts)
+    for y in range(footer['height']):
+        rows.append((row_part(footer, y, 0, footer['width'], footer_texts),))
+    return rows
+
+
+def render_row(y, row, old_row, old_columns, widths):
+    """Function creates escape sequences rewriting only the changed cells of one board row.
+
+    Args:
+        y (int): vertical position of the row on the screen
+        row (list): texts of cells of the new row
+        old_row (list): texts of cells of the row displayed in the previous frame
+        old_columns (list): screen columns of the previous row cells (and end of the row)
+        widths (dict): cache of cells widths
+
+    Return:
+        parts (list): strings to write to the terminal
+        columns (list): screen columns of the new row cells (and end of the row)
+        cells_written (int): number of rewritten cells
+    """
+
+    parts = []
+    columns = []
+    cells_written = 0
+    column = 0
+    in_run = False
+    for x, cell in enumerate(row):
+        columns.append(column)
+        if x < len(old_row) and cell == old_row[x] and column == old_columns[x]:
+            in_run = False
+        else:
+            if not in_run:
+                parts.append('\033[{};{}H'.format(y + 1, column + 1))   # moves cursor to the cell
+                in_run = True
+            parts.append(cell)
+            cells_written += 1
+        width = widths.get(cell)
+        if width is None:
+            width = widths[cell] = cell_width(cell)
+        column += width
+    columns.append(column)
+    if old_columns and column < old_columns[-1]:    # new row is shorter, rest of the old one is erased
+        parts.append('\033[{};{}H\033[K'.format(y + 1, column + 1))
+    return parts, columns, cells_written
+
+
+def render_frame(screen, board, overlays=None):
+    """Function writes to the terminal only the cells which changed since the previous frame.
+
+    Args:
+        screen (dict): last frame emitted to the terminal (see create_screen)
+        board (dict): tile board of the map with 'panel' and 'footer' tile boards
+        overlays (dict): texts ({(y, x): text}) drawn over map tiles and labels, e.g. player character
+
+    Return:
+        frame_stats (dict): number of bytes and cells written in this frame
+    """
+
+    parts = []
+    previous_rows = screen['rows']
+    if previous_rows is None or screen['clears'] != terminal['clears']:    # screen content is unknown
+        parts.append('\033[H\033[2J')
+        previous_rows = []
+    rows = []
+    cells_written = 0
+    for y, row_key in enumerate(screen_rows(screen, board, overlays or {})):
+        if y < len(previous_rows):
+            old_key, old_row, old_columns = previous_rows[y]
+            if row_key == old_key:
+                rows.append(previous_rows[y])
+                continue
+        else:
+            old_row, old_columns = (), []
+        row = []
+        for part in row_key:
+            row.extend(part_cells(part))
+        row_parts, columns, row_cells = render_row(y, row, old_row, old_columns, screen['widths'])
+        parts.extend(row_parts)
+        cells_written += row_cells
+        rows.append((row_key, row, columns))
+    for y in range(len(rows), len(previous_rows)):     # erases rows which are not on the screen anymore
+        parts.append('\033[{};1H\033[K'.format(y + 1))
+    if parts:
+        parts.append('\033[{};1H'.format(len(rows) + 1))    # parks cursor below the board
+    frame = ''.join(parts)
+    screen['output'].write(frame)
+    screen['output'].flush()
+    screen['rows'] = rows
+    screen['clears'] = terminal['clears']
+    screen['last_frame'] = {'bytes': len(frame.encode('utf-8')), 'cells': cells_written}
+    return screen['last_frame']
+
+
 def print_end_image(game_won):
-    """Function displays final images from text file.
+    """Function displays final images (see assets).
 
     Args:
         game_won (bool): shows whether a player has won or not
     """
 
-    color = ['\033[31m', '\033[32m', '\033[33m', '\033[34m', '\033[35m', '\033[36m', '\033[37m']
-    reset_color = '\033[0m'
+    first_image = 3 if game_won else 0
+    for i in range(5):
+        for image_nr in range(first_image, first_image + 3):
+            clear_screen()
+            print(colored_frame('end_images', image_nr, random.choice(COLORS)))
+            time.sleep(0.2)
 
-    with open('end_images.txt', 'r') as img_file:
-        images = img_file.read().split('***\n')
-        if not game_won:
-            for i in range(5):
-                for image_nr in range(3):
-                    os.system('clear')
-                    print(random.choice(color) + images[image_nr] + reset_color)
-                    time.sleep(0.2)
-        else:
-            for i in range(5):
-                for image_nr in range(3, 6):
-                    os.system('clear')
-                    print(random.choice(color) + images[image_nr] + reset_color)
-                    time.sleep(0.2)
-
-
-def update_board_information(board, level, character_name, health, inventory, start_time, hamster_energy):
-    item_colors = {'●': '\033[33m', '⚛': '\033[34m', '✿': '\033[31m', '✡': '\033[94m'}
-    reset_color = '\033[0m'
-    end_time = time.time()
-    your_time = int(end_time - start_time)
-    board[0][128] = str(level)
-    board[1][129] = character_name
-    board[2][129] = str(health)
-    board[3][127] = str(your_time)
-    board[6][121] = item_colors['●'] + '●' + reset_color + ' : ' + str(inventory['●'])  # inserts nr of nuts
-    board[7][139] = str(inventory['☯'] + inventory['☂'] + inventory['♫'])  # inserts total amount of treasures
+
+def create_hud(panel):
+    """Function creates HUD (game information in the side panel) remembering values it displays.
+
+    Args:
+        panel (dict): tile board of the side panel
+
+    Return:
+        hud (dict): side panel, displayed values and number of cells they take, by field name
+    """
+
+    return {'panel': panel, 'values': {}, 'widths': {}}
+
+
+def hud_cells(name, value):
+    """Function turns value of HUD field into texts of board cells, one character per cell.
+
+    Args:
+        name (str): name of the field (see HUD_FIELDS)
+        value: value of the field
+
+    Return:
+        cells (list): texts of cells
+    """
+
+    if name == 'nuts':
+        return [NUT_TEXT] + list(' : ' + str(value))
+    return list(str(value))
+
+
+def update_hud(hud, values):
+    """Function writes into the side panel only the HUD fields whose values changed.
+        Cells left by a value which got shorter show the side panel again.
+
+    Args:
+        hud (dict): HUD (see create_hud)
+        values (dict): field name (see HUD_FIELDS): value
+
+    Return:
+        changed (list): names of rewritten fields
+    """
+
+    labels = hud['panel']['labels']
+    displayed = hud['values']
+    widths = hud['widths']
+    changed = []
+    for name, value in values.items():
+        if name in displayed and displayed[name] == value:
+            continue
+        displayed[name] = value
+        line, column = HUD_FIELDS[name]
+        cells = hud_cells(name, value)
+        for i in range(len(cells)):
+            labels[(line, column + i)] = cells[i]
+        for i in range(len(cells), widths.get(name, 0)):
+            del labels[(line, column + i)]
+        widths[name] = len(cells)
+        changed.append(name)
+    return changed
+
+
+def update_board_information(board, level, character_name, health, inventory, your_time, hamster_energy):
+    """Function updates game information displayed in the side panel next to the map.
+
+    Args:
+        board (dict): tile board with the side panel ('panel'), HUD is kept in board['hud']
+        level (int): actual game level
+        character_name (str): name of the character chosen by user
+        health (int): player's health points
+        inventory (dict): collected items(keys) and their amounts (values)
+        your_time (int): game time in seconds
+        hamster_energy (int): enemy's health points
+
+    Return:
+        board (dict): tile board
+    """
+
+    if 'hud' not in board:
+        board['hud'] = create_hud(board['panel'])
+    values = {'level': level, 'name': character_name, 'health': health, 'time': your_time, 'nuts': inventory['●'],
+              'treasures': inventory['☯'] + inventory['☂'] + inventory['♫']}
     if level == 4:
-        board[4][134] = str(hamster_energy)
+        values['hamster'] = hamster_energy
+    update_hud(board['hud'], values)
     return board
 
 
-def manage_display(board, x_player, y_player, character_color):
+def manage_display(board, x_player, y_player, character_color, screen):
     """Function takes care of game pseudo animation.
 
     Args:
-        board (list): list of board rows (list)
+        board (dict): tile board
         x_player (int): horizontal position of player on the board
         y_player (int): vertical position of player on the board
         character_color (str): escape code for chosen character color
+        screen (dict): last frame emitted to the terminal (see create_screen)
+
+    Return:
+        frame_stats (dict): number of bytes and cells written in this frame
     """
 
-    os.system('clear')  # clears terminal screen
-    board = insert_player(board, x_player, y_player, character_color)    # inserts player character on the gameboard
-    print_board(board)  # displays gameboard
+    follow_player(screen, board, x_player, y_player)    # scrolls the map if player is close to the screen edge
+    player = insert_player({}, x_player, y_player, character_color)    # player character is drawn over the gameboard
+    frame_stats = render_frame(screen, board, player)  # displays changed part of the gameboard
     board = clear_player(board, x_player, y_player)  # clears place on the gameboard occupied by user
+    return frame_stats
 
 
 def prepare_board_to_print(inventory, board):
@@ -140,7 +463,7 @@ def print_additional_game_info(inventory):
     """
 
     info_table = create_board(120, 40)
-    os.system('clear')
+    clear_screen()
     info_table = prepare_board_to_print(inventory, info_table)
     print_board(info_table)
     input('Press ENTER to return to the game.')
@@ -167,22 +490,11 @@ def insert_text_into_board(y, x, text, board):
 def intro():
     """Function displays game intro"""
 
-    color = ['\033[31m', '\033[32m', '\033[33m', '\033[34m', '\033[35m', '\033[36m', '\033[37m']
-    reset_color = '\033[0m'
-
-    img_file = open('intro.txt')
-    images = img_file.read().split('***\n')
-    img_file.close()
-
-    for image_nr in range(len(images)):
-        image = images[image_nr]
-        image = image.splitlines()
+    for image_nr in range(len(asset_frames('intro'))):
+        image = [random.choice(colors) for colors in colored_lines('intro', image_nr)]
 
         for i in range(len(image)):
-            image[i] = random.choice(color) + image[i] + reset_color
-
-        for i in range(len(image)):
-            os.system('clear')
+            clear_screen()
             for j in range(i+1):
                 print(image[j])
             time.sleep(0.1)
@@ -190,39 +502,41 @@ def intro():
         input('Press ENTER to continue')
 
         for i in range(len(image)):
-            os.system('clear')
+            clear_screen()
             image[i] = ' '
             for j in range(len(image)):
                 print(image[j])
             time.sleep(0.1)
 
 
-def insert_player(board, x_player, y_player, character_color):
-    """Function inserts player character into the list representing our gameboard.
+def insert_player(overlays, x_player, y_player, character_color):
+    """Function inserts player character into the texts drawn over the gameboard.
 
     Args:
-        board (list): list of board rows (list)
+        overlays (dict): texts ({(y, x): text}) drawn over board tiles
+        x_player (int): horizontal position of player on the board
+        y_player (int): vertical position of player on the board
         character_color (str): escape code for chosen character color
 
     Return:
-        board (list): list of board rows (list) after player insertion
+        overlays (dict): texts drawn over board tiles after player insertion
     """
 
-    board[y_player][x_player] = character_color + '🐿️' + '\033[0m'
-    return board
+    overlays[(y_player, x_player)] = character_color + '🐿️' + '\033[0m'
+    return overlays
 
 
 def clear_player(board, x_player, y_player):
-    """Function clears the place occupied by the player character in the list representing our gameboard.
+    """Function clears the place occupied by the player character on the gameboard.
 
     Args:
-        board (list): list of board rows (list)
+        board (dict): tile board
         x_player (int): horizontal position of player on the board
         y_player (int): vertical position of player on the board
 
     Return:
-        board (list): list of board rows (list) after clearing the player position
+        board (dict): tile board after clearing the player position
     """
 
-    board[y_player][x_player] = ' '
+    set_tile(board, x_player, y_player, EMPTY)
     return board
@@ -0,0 +1,405 @@
+import random
+from environment import setting_next_level
+from controls import *
+from actions import *
+from tiles import *
+from flow_field import create_flow_field, update_flow_field
+from frame_timing import mark
+from world import close_board
+
+HAMSTER_MINIGAME = 'hot_cold'
+BATCH_MINIONS = 1000    # swarms at least this big are moved all at once (see move_minions_batch)
+
+
+def new_game(character_name='', seed=None, chase=False, minion_period=1):
+    """Function creates state of a new game and sets the first level.
+
+    Args:
+        character_name (str): name of the character chosen by user
+        seed (int): seed of random numbers generator (random if not given)
+        chase (bool): True for harder game, where minions chase the player instead of walking at random
+        minion_period (int): number of game ticks (see step) between minions moves
+
+    Return:
+        state (dict): game state
+        events (list): events (name, value) the front-end should react to
+    """
+
+    state = {
+        'character_name': character_name, 'rng': random.Random(seed), 'level': 0, 'inventory': {},
+        'health': 30, 'lamps_lit': 0, 'hamster_energy': 600, 'time': 0, 'ticks': 0, 'minion_period': minion_period,
+        'game_won': False, 'game_over': False, 'minigame': None, 'chase': chase, 'field': None, 'counters': None,
+        'touching': None}
+    events = start_next_level(state)
+    return state, events
+
+
+def start_next_level(state):
+    """Function moves game state to the next level.
+
+    Args:
+        state (dict): game state
+
+    Return:
+        events (list): events (name, value) the front-end should react to
+    """
+
+    close_board(state.get('board', []))     # world file of the finished level is not used any more
+    (state['game_won'], state['level'], state['inventory'], state['board'], state['x_player'], state['y_player'],
+     state['minions']) = setting_next_level(state['level'], state['inventory'], state['rng'])
+    if state['game_won']:
+        state['game_over'] = True
+        return [('game_end', True)]
+    state['counters'] = None    # conditions are checked for the new level (see check_conditions)
+    state['touching'] = None    # minion the player shares the place with (see handle_button)
+    if state['chase']:
+        state['field'] = create_flow_field(state['board'], state['x_player'], state['y_player'])
+    return [('next_level', state['level'])]
+
+
+def close_game(state):
+    """Function releases what the board of a finished game holds (world file, see world.close_board).
+        Front-ends call it when they do not need the final state any more.
+
+    Args:
+        state (dict): game state
+    """
+
+    close_board(state['board'])
+    state['board'] = []
+
+
+def advance_minions(state):
+    """Function moves all minions by one step.
+
+    Args:
+        state (dict): game state
+    """
+
+    if state['chase']:
+        update_flow_field(state['field'], state['board'], state['x_player'], state['y_player'], state['minions'])
+        state['board'], state['minions'] = chase_minions(
+            state['board'], state['minions'], state['field'], state['rng'])
+    else:
+        if len(state['minions']['location']) >= BATCH_MINIONS:
+            move = move_minions_batch
+        else:
+            move = move_minions
+        state['board'], state['minions'] = move(state['board'], state['minions'], state['rng'])
+
+
+def collect_item(state, tick, x, y):
+    """Function adds item the player stepped on into inventory (tile trigger, see TRIGGERS).
+
+    Args:
+        state (dict): game state
+        tick (dict): results of handled button: 'events', 'minigame', 'next_level' and 'button' pressed
+        x (int): horizontal position of the tile
+        y (int): vertical position of the tile
+    """
+
+    health = state['health']
+    state['inventory'], state['health'] = collecting_food(state['board'], x, y, state['inventory'], health)
+    if state['health'] < health:
+        tick['events'].append(('damage', 'rotten food'))
+
+
+def feed_friend(state, tick, x, y):
+    """Function feeds the friend the player visited (tile trigger, see TRIGGERS).
+
+    Args:
+        state (dict): game state
+        tick (dict): results of handled button (see collect_item)
+        x (int): horizontal position of the tile
+        y (int): vertical position of the tile
+    """
+
+    state['inventory'], state['hamster_energy'] = feeding_friends(
+        state['board'], x, y, state['inventory'], state['hamster_energy'])
+
+
+def reach_exit(state, tick, x, y):
+    """Function starts the minigame guarding passage to the next level (tile trigger, see TRIGGERS).
+
+    Args:
+        state (dict): game state
+        tick (dict): results of handled button (see collect_item)
+        x (int): horizontal position of the tile
+        y (int): vertical position of the tile
+    """
+
+    next_level, tick['minigame'] = checking_level_end(
+        state['level'], state['inventory'], x, y, state['hamster_energy'], state['board'])
+
+
+def reach_hamster(state, tick, x, y):
+    """Function starts the fight if the player got to the evil hamster (level trigger, see LEVEL_TRIGGERS).
+
+    Args:
+        state (dict): game state
+        tick (dict): results of handled button (see collect_item)
+        x (int): horizontal position of the player
+        y (int): vertical position of the player
+    """
+
+    state['board'], hamster_reached = evil_hamster_defeat(state['board'], x, y, state['level'], state['hamster_energy'])
+    if hamster_reached:
+        tick['minigame'] = HAMSTER_MINIGAME
+
+
+def light_lamp(state, tick, x, y):
+    """Function lights magic lamp the player bumped into (tile trigger, see TRIGGERS).
+
+    Args:
+        state (dict): game state
+        tick (dict): results of handled button (see collect_item)
+        x (int): horizontal position of the tile
+        y (int): vertical position of the tile
+    """
+
+    state['board'], state['lamps_lit'] = light_magic_lamps(
+        state['board'], state['x_player'], state['y_player'], tick['button'], state['lamps_lit'])
+
+
+def hurt_player(state, tick, x, y):
+    """Function lowers health of the player who bumped into dangerous obstacle (tile trigger, see TRIGGERS).
+
+    Args:
+        state (dict): game state
+        tick (dict): results of handled button (see collect_item)
+        x (int): horizontal position of the tile
+        y (int): vertical position of the tile
+    """
+
+    state['health'] = check_obstacle_contact(
+        state['board'], state['x_player'], state['y_player'], tick['button'], state['health'])
+    tick['events'].append(('damage', 'barrier'))
+
+
+def unlock_exit(state, tick):
+    """Function opens passage to the next level if the player collected what was needed (condition, see CONDITIONS).
+
+    Args:
+        state (dict): game state
+        tick (dict): results of handled button (see collect_item)
+    """
+
+    state['board'] = enable_level_exit(state['board'], state['level'], state['inventory'], state['lamps_lit'])
+
+
+def weaken_hamster(state, tick):
+    """Function removes the hamster's shield or finishes the last level when his energy drops (condition).
+
+    Args:
+        state (dict): game state
+        tick (dict): results of handled button (see collect_item)
+    """
+
+    if state['hamster_energy'] == 100:
+        remove_barrier_group(state['board'], 'shield')
+    if state['level'] == 4 and state['hamster_energy'] == 0:
+        tick['next_level'] = True
+
+
+# (tile flag, handler) fired when the player steps on a tile ('enter') or faces it after a move ('bump')
+TRIGGERS = {
+    'enter': [(COLLECTIBLE, collect_item), (FRIEND, feed_friend), (PASSAGE, reach_exit)],
+    'bump': [(LAMP, light_lamp), (HAZARD, hurt_player)]}
+LEVEL_TRIGGERS = {4: [reach_hamster]}     # level: handlers fired whenever the player enters a new place
+# (counters, handler) fired when any of the counters changed (see watched_counters)
+CONDITIONS = [(('●', '℥', 'lamps_lit'), unlock_exit), (('hamster_energy',), weaken_hamster)]
+tile_triggers = {'enter': [], 'bump': []}   # handlers by tile id, extended when new tiles are registered
+
+
+def tile_handlers(kind, tile):
+    """Function returns handlers registered for the tile (see TRIGGERS).
+
+    Args:
+        kind (str): 'enter' or 'bump'
+        tile (int): tile id
+
+    Return:
+        handlers (list): functions handling the tile
+    """
+
+    handlers = tile_triggers[kind]
+    while len(handlers) <= tile:
+        flags = tile_flags[len(handlers)]
+        handlers.append([handler for flag, handler in TRIGGERS[kind] if flags & flag])
+    return handlers[tile]
+
+
+def watched_counters(state):
+    """Function returns values the level conditions depend on.
+
+    Args:
+        state (dict): game state
+
+    Return:
+        counters (dict): counter name: value
+    """
+
+    inventory = state['inventory']
+    return {'●': inventory.get('●'), '℥': inventory.get('℥'), 'lamps_lit': state['lamps_lit'],
+            'hamster_energy': state['hamster_energy']}
+
+
+def check_conditions(state, tick):
+    """Function fires conditions depending on counters which changed since they were checked last time.
+
+    Args:
+        state (dict): game state
+        tick (dict): results of handled button (see collect_item)
+    """
+
+    counters = watched_counters(state)
+    old_counters = state['counters']
+    if counters == old_counters:
+        return
+    state['counters'] = counters
+    for names, handler in CONDITIONS:
+        if old_counters is None or any(counters[name] != old_counters[name] for name in names):
+            handler(state, tick)
+
+
+def handle_button(state, button_pressed):
+    """Function applies game rules to the button pressed by user.
+        Rules are fired only by what happened: tiles the player stepped on or bumped into (TRIGGERS, LEVEL_TRIGGERS),
+        minions meeting the player and changed counters (CONDITIONS).
+
+    Args:
+        state (dict): game state
+        button_pressed (str): button pressed by user ('' if none)
+
+    Return:
+        events (list): events (name, value) the front-end should react to
+    """
+
+    if state['game_over'] or state['minigame']:
+        return []
+    tick = {'events': [], 'minigame': None, 'next_level': False, 'button': button_pressed}
+    events = tick['events']
+    board = state['board']
+    x_start, y_start = state['x_player'], state['y_player']
+
+    if button_pressed == '\\':
+        state['game_over'] = True
+        return [('game_end', False)]
+    if button_pressed == 'i':
+        events.append(('show_info', None))
+    if button_pressed == ',':   # developer_cheat_mode, moves player next to the exit
+        state['x_player'], state['y_player'] = board['width'] - 6, board['height'] - 3
+
+    if button_pressed in MOVES:
+        # changes user position based on pressed button
+        state['x_player'], state['y_player'] = user_control(
+            board, state['x_player'], state['y_player'], button_pressed, state['inventory'])
+        x_ahead = state['x_player'] + MOVES[button_pressed][0]
+        y_ahead = state['y_player'] + MOVES[button_pressed][1]
+        for handler in tile_handlers('bump', get_tile(board, x_ahead, y_ahead)):
+            handler(state, tick, x_ahead, y_ahead)
+    x_player, y_player = state['x_player'], state['y_player']
+    if (x_player, y_player) != (x_start, y_start):
+        for handler in tile_handlers('enter', get_tile(board, x_player, y_player)) + LEVEL_TRIGGERS.get(
+                state['level'], []):
+            handler(state, tick, x_player, y_player)
+
+    # checks if user encounters an enemy and chenges user properties if it has happened; a minion sharing
+    # the place with the player hurts only once (ticks are more frequent than minions moves)
+    health = state['health']
+    if (x_player, y_player, state['minions']['cells'].get((x_player, y_player))) != state['touching']:
+        x_player, y_player, state['health'] = minion_encounter(x_player, y_player, state['minions'], health)
+    if state['health'] < health:
+        events.append(('damage', 'minion'))
+        tick['minigame'] = None     # player is pushed back to the start, away from the exit or the hamster
+    check_conditions(state, tick)
+
+    if tick['minigame'] == HAMSTER_MINIGAME:
+        x_player, y_player = 1, 1   # player is moved back to the start whatever the fight result is
+    if (x_player, y_player) not in state['minions']['cells']:   # a minion at the start is not eaten
+        set_tile(state['board'], x_player, y_player, EMPTY)     # the squirrel eats whatever it stands on
+    state['x_player'], state['y_player'] = x_player, y_player
+    minion_nr = state['minions']['cells'].get((x_player, y_player))
+    state['touching'] = None if minion_nr is None else (x_player, y_player, minion_nr)
+
+    if state['health'] <= 0:
+        state['game_over'] = True
+        events.append(('game_end', False))
+    elif tick['minigame']:
+        state['minigame'] = tick['minigame']
+        events.append(('minigame', tick['minigame']))
+    elif tick['next_level']:
+        events.extend(start_next_level(state))
+    return events
+
+
+def finish_minigame(state, won):
+    """Function applies result of the minigame started by handle_button.
+
+    Args:
+        state (dict): game state
+        won (bool): True if user won the minigame, False otherwise
+
+    Return:
+        events (list): events (name, value) the front-end should react to
+    """
+
+    minigame = state['minigame']
+    state['minigame'] = None
+    if minigame == HAMSTER_MINIGAME:
+        if won:
+            state['hamster_energy'] = 0
+        next_level, minigame = checking_level_end(
+            state['level'], state['inventory'], state['x_player'], state['y_player'], state['hamster_energy'],
+            state['board'])
+    else:
+        next_level = won
+    if next_level:
+        return start_next_level(state)
+    return []
+
+
+def step(state, button_pressed, timer=None):
+    """Function advances the game by one tick: minions move (every minion_period ticks)
+        and the button pressed by user is handled.
+
+    Args:
+        state (dict): game state
+        button_pressed (str): button pressed by user ('' if none)
+        timer (dict): frame timer measuring 'minions' and 'rules' phases (see frame_timing), None if disabled
+
+    Return:
+        state (dict): game state
+        events (list): events (name, value) the front-end should react to
+    """
+
+    if not state['game_over'] and not state['minigame']:
+        if state['ticks'] % state['minion_period'] == 0:
+            advance_minions(state)
+            mark(timer, 'minions')
+        state['ticks'] += 1
+    events = handle_button(state, button_pressed)
+    mark(timer, 'rules')
+    return state, events
+
+
+def handle_buttons(state, buttons_pressed, timer=None):
+    """Function runs one game tick (see step) handling all buttons pressed since the previous tick.
+        Buttons pressed after an event other than damage (level change, minigame, info screen) are dropped.
+
+    Args:
+        state (dict): game state
+        buttons_pressed (list): buttons pressed by user since the previous tick
+        timer (dict): frame timer (see step), None if timing is disabled
+
+    Return:
+        events (list): events (name, value) the front-end should react to
+    """
+
+    state, events = step(state, buttons_pressed[0] if buttons_pressed else '', timer)
+    for button_pressed in buttons_pressed[1:]:
+        if any(name != 'damage' for name, value in events):
+            break
+        events += handle_button(state, button_pressed)
+        mark(timer, 'rules')
+    return events
@@ -1,131 +1,363 @@
-import random
 import os
+import random
+import marshal
+import hashlib
+from tiles import *
+from world import load_world, ChunkedTiles
+from controls import exit_area, LEVEL_EXIT_MINIGAMES
+
+
+LEVEL_CACHE_DIR = '.level_cache'
+LEVEL_CACHE_VERSION = 3
+WORLD_PLACEMENT_SIZE = 256  # items and minions are placed in this part of a world (next to the start)
+HAMSTER_SHIELD_AREA = (19, 30, 98, 119)     # first line, end line, first column and end column of hamster's shield
+
+# items placed on each level (items of level 4 are used for levels without their own)
+LEVEL_FOOD = {
+    1: {'●': 20, '⚛': 8, '✿': 5, '✡': 8, '☯': 3, '☂': 3, '♫': 3},
+    2: {'●': 20, '⚛': 4, '✿': 15, '✡': 4, '☀': 6, '☯': 3, '☂': 3, '♫': 3},
+    3: {'●': 20, '⚛': 6, '✿': 10, '✡': 6, '℥': 4, '☯': 3, '☂': 3, '♫': 3},
+    4: {'●': 20, '⚛': 5, '✿': 20, '✡': 2, '☯': 3, '☂': 3, '♫': 3}}
+LEVEL_MINIONS = {2: {'ᴥ': 5}, 3: {'ᴥ': 5}, 4: {'ᴥ': 5}}
+LEVEL_TEMPLATES = {}    # level number: read-only board shared by all games of the process (see level_template)
+
+
+def split_level(level_content):
+    """Function splits lines of level file into the map, the side panel next to it and the text below it.
+        The map is the rectangle framed with 'X' which starts in the top left corner of the file.
+
+    Args:
+        level_content (list): lines of level file (without new line characters)
+
+    Return:
+        map_lines (list): lines of the map
+        panel_lines (list): parts of lines on the right side of the map
+        footer_lines (list): lines below the map
+    """
+
+    first_line = level_content[0] if level_content else ''
+    map_width = len(first_line) - len(first_line.lstrip('X'))
+    map_height = len(level_content)
+    for line_nr in range(1, len(level_content)):
+        if level_content[line_nr][:map_width] == 'X' * map_width:    # bottom border of the map
+            map_height = line_nr + 1
+            break
+    map_lines = [line[:map_width] for line in level_content[:map_height]]
+    panel_lines = [line[map_width:] for line in level_content[:map_height]]
+    while panel_lines and panel_lines[-1] == '':
+        panel_lines.pop()
+    return map_lines, panel_lines, level_content[map_height:]
+
+
+def parse_level(level_content):
+    """Function turns lines of level file into tile board representing our gameboard.
+
+    Args:
+        level_content (list): lines of level file
+
+    Return:
+        board (dict): tile board of the map (see tiles.create_tile_board) with tile boards of
+            side panel ('panel') and text below the map ('footer')
+    """
+
+    # elements of the level map get their colored tiles
+    map_lines, panel_lines, footer_lines = split_level([line.strip('\n') for line in level_content])
+    board = board_from_lines(map_lines, ITEM_COLORS)
+    board['panel'] = board_from_lines(panel_lines, ITEM_COLORS)
+    board['footer'] = board_from_lines(footer_lines, ITEM_COLORS)
+    return board
+
+
+def compile_level(filename, cache_filename):
+    """Function parses level file and saves the result into cache file.
+
+    Args:
+        filename (str): name of level file
+        cache_filename (str): name of the cache file
+
+    Return:
+        board (dict): tile board
+    """
+
+    with open(filename, 'rb') as level_file:
+        source = level_file.read()
+    level_content = source.decode('utf-8').split('\n')
+    if level_content[-1] == '':
+        level_content.pop()
+    board = parse_level(level_content)
+    source_stat = os.stat(filename)
+    palette = [(tile_glyphs[tile], tile_colors[tile], tile_flags[tile]) for tile in range(len(tile_glyphs))]
+    parts = [(part['width'], part['height'], bytes(part['tiles'])) for part in [board, board['panel'], board['footer']]]
+    cache_content = (LEVEL_CACHE_VERSION, source_stat.st_mtime_ns, source_stat.st_size,
+                     hashlib.sha1(source).hexdigest(), palette, parts)
+    os.makedirs(os.path.dirname(cache_filename) or '.', exist_ok=True)
+    temporary_filename = '{}.{}.tmp'.format(cache_filename, os.getpid())
+    with open(temporary_filename, 'wb') as cache_file:
+        cache_file.write(marshal.dumps(cache_content))
+    os.replace(temporary_filename, cache_filename)     # other games never see half written cache
+    return board
+
+
+def load_compiled_level(filename, cache_filename=None):
+    """Function loads level from cache file, compiling it again if the level file has changed.
+
+    Args:
+        filename (str): name of level file
+        cache_filename (str): name of the cache file (in LEVEL_CACHE_DIR by default)
+
+    Return:
+        board (dict): tile board
+    """
+
+    if cache_filename is None:
+        cache_filename = os.path.join(os.path.dirname(filename), LEVEL_CACHE_DIR,
+                                      os.path.basename(filename) + '.cache')
+    try:
+        with open(cache_filename, 'rb') as cache_file:
+            version, mtime, size, digest, palette, parts = marshal.loads(cache_file.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return compile_level(filename, cache_filename)
+
+    source_stat = os.stat(filename)
+    if version != LEVEL_CACHE_VERSION:
+        return compile_level(filename, cache_filename)
+    if mtime != source_stat.st_mtime_ns or size != source_stat.st_size:
+        with open(filename, 'rb') as level_file:     # file was touched, content may be the same
+            if hashlib.sha1(level_file.read()).hexdigest() != digest:
+                return compile_level(filename, cache_filename)
+        compile_level(filename, cache_filename)     # refreshes stored modification time
+
+    # tile ids saved in cache are translated into ids of this game's tile table
+    translation = bytes([register_tile(glyph, color, flags) for glyph, color, flags in palette]).ljust(256, b'\x00')
+    board, panel, footer = [create_tile_board(width, height) for width, height, tiles in parts]
+    for part, (width, height, tiles) in zip([board, panel, footer], parts):
+        part['tiles'][:] = tiles.translate(translation)
+    board['panel'] = panel
+    board['footer'] = footer
+    return board
 
 
 def loading_level(level_nr):
     """Function loades list representing our gameboard from text files.
+        Chunked world file (see world.convert_level_file) is used instead of the text file if it exists.
 
     Args:
         level_nr (int): number of current game level
 
     Return:
-        board (list): list of board rows (list)
+        board (dict): tile board
     """
 
-    item_colors = {
-        '●': '\033[33m', '⚛': '\033[34m', '✿': '\033[31m', '✡': '\033[94m', 'ᴥ': '\033[31m',
-        '#': '\033[31m', '℥': '\033[32m', '☯': '\033[32m', '☂': '\033[32m', '♫': '\033[32m'}
-    reset_color = '\033[0m'
+    if os.path.exists('level' + level_nr + '.world'):
+        return load_world('level' + level_nr + '.world')
+    return load_compiled_level('level' + level_nr + '.txt')
 
-    level_file = open('level' + level_nr + '.txt')
-    level_content = level_file.readlines()
-    level_file.close()
 
-    board = []
-    for line in level_content:
-        line = line.strip('\n')
+def create_free_cells(board, area=None):
+    """Function lists empty places of the board where items and minions can be placed.
 
-        board_line = []
-        for character in line:
-            board_line.append(character)
-        # changes color of elements on the level map
-        for key in item_colors:
-            board_line = [char.replace(key, item_colors[key] + key + reset_color) for char in board_line]
-        board.append(board_line)
+    Args:
+        board (dict): tile board
+        area (tuple): first line, end line, first column and end column of searched area
+            (by default the map without its border and the places next to it,
+            for worlds only WORLD_PLACEMENT_SIZE x WORLD_PLACEMENT_SIZE places next to the start)
 
-    return board
+    Return:
+        free_cells (list): positions (line * board width + column) of empty places
+    """
+
+    if area is None:
+        area = (2, board['height'] - 2, 2, board['width'] - 2)
+        if isinstance(board['tiles'], ChunkedTiles):  # world is too big to be searched as a whole
+            area = (2, min(area[1], 2 + WORLD_PLACEMENT_SIZE), 2, min(area[3], 2 + WORLD_PLACEMENT_SIZE))
+    return find_tiles(board, EMPTY, area)
+
+
+def find_tiles(board, tile, area):
+    """Function lists places of the area with the given tile, searching line after line.
+
+    Args:
+        board (dict): tile board
+        tile (int): id of searched tile
+        area (tuple): first line, end line, first column and end column of searched area
+
+    Return:
+        positions (list): positions (line * board width + column) of found tiles
+    """
+
+    first_line, end_line, first_column, end_column = area
+    width = board['width']
+    tiles = board['tiles']
+    searched = bytes([tile])
+    positions = []
+    for line in range(first_line, min(end_line, board['height'])):
+        line_start = line * width
+        position = tiles.find(searched, line_start + first_column, line_start + min(end_column, width))
+        while position != -1:
+            positions.append(position)
+            position = tiles.find(searched, position + 1, line_start + min(end_column, width))
+    return positions
+
+
+def splits_way(board, position):
+    """Function checks if a tile which cannot be entered, put in the place, could cut off some places
+        from the others. It could not if passable neighbours of the place are connected by passable places
+        around it (ring of 8 places), so a way going through the place can go around it.
 
+    Args:
+        board (dict): tile board
+        position (int): position of the place (line * board width + column)
+
+    Return:
+        splits (bool): True if the place may be a chokepoint
+    """
+
+    width = board['width']
+    tiles = board['tiles']
+    # ring of places around, every one next to the previous: up, up right, right, ..., up left
+    ring = (-width, -width + 1, 1, width + 1, width, width - 1, -1, -width - 1)
+    passable = [tile_flags[tiles[position + move]] & PASSABLE for move in ring]
+    if all(passable):
+        return False
+    start = passable.index(0)
+    arcs = 0    # groups of consecutive passable places of the ring with a neighbour of the place in them
+    with_neighbour = False
+    for step in range(1, 9):
+        nr = (start + step) % 8
+        if passable[nr]:
+            with_neighbour = with_neighbour or nr % 2 == 0     # neighbours are on even places of the ring
+        else:
+            arcs += with_neighbour
+            with_neighbour = False
+    return arcs > 1
+
+
+def place_in_free_cell(board, free_cells, tile, rng=random):
+    """Function puts tile in a random empty place and removes this place from free cells.
+        Tiles which cannot be entered (like magic lamps) are not put in places where they could cut off
+        a part of the map (see splits_way).
+
+    Args:
+        board (dict): tile board
+        free_cells (list): positions of empty places (see create_free_cells)
+        tile (int): id of placed tile
+        rng (random.Random): random numbers generator
 
-def insert_food(board, level):
+    Return:
+        column (int): horizontal position of placed tile
+        line (int): vertical position of placed tile
+    """
+
+    tiles = board['tiles']
+    while free_cells:
+        cell_nr = rng.randrange(len(free_cells))
+        position = free_cells[cell_nr]
+        free_cells[cell_nr] = free_cells[-1]    # removes chosen place without shifting the list
+        free_cells.pop()
+        # place could have been filled after the list was created
+        if tiles[position] == EMPTY and (tile_flags[tile] & PASSABLE or not splits_way(board, position)):
+            tiles[position] = tile
+            line, column = divmod(position, board['width'])
+            return column, line
+    raise ValueError('There are no free places left on the board')
+
+
+def check_free_cells(free_cells, items, level):
+    """Function checks if there are enough empty places for all items.
+
+    Args:
+        free_cells (list): positions of empty places (see create_free_cells)
+        items (dict): items (keys) and their amounts (values)
+        level (int): actual game level
+    """
+
+    needed = sum(items.values())
+    if needed > len(free_cells):
+        raise ValueError('Level {} needs {} free places for {}, but only {} are left'.format(
+            level, needed, ', '.join(items), len(free_cells)))
+
+
+def insert_food(board, level, free_cells=None, rng=random):
     """Function inserts items to collect into gameboard.
 
     Args:
-        board (list): list of board rows (list)
+        board (dict): tile board
         level (int): actual game level
+        free_cells (list): positions of empty places (see create_free_cells), created if not given
+        rng (random.Random): random numbers generator
 
     Return:
-        board (list): list of board rows (list) after food to collect insertion
+        board (dict): tile board after food to collect insertion
     """
 
-    item_colors = {
-        '●': '\033[33m', '⚛': '\033[34m', '✿': '\033[31m', '✡': '\033[94m',
-        'ᴥ': '\033[31m', '☀': '\033[33m', '℥': '\033[32m', '☯': '\033[32m', '☂': '\033[32m', '♫': '\033[32m'}
-    reset_color = '\033[0m'
-    if level == 1:
-        food = {'●': 20, '⚛': 8, '✿': 5, '✡': 8, '☯': 3, '☂': 3, '♫': 3}
-    elif level == 3:
-        food = {'●': 20, '⚛': 6, '✿': 10, '✡': 6, '℥': 4, '☯': 3, '☂': 3, '♫': 3}
-    elif level == 2:
-        food = {'●': 20, '⚛': 4, '✿': 15, '✡': 4, '☀': 6, '☯': 3, '☂': 3, '♫': 3}
-    else:
-        food = {'●': 20, '⚛': 5, '✿': 20, '✡': 2, '☯': 3, '☂': 3, '♫': 3}
-
+    food = LEVEL_FOOD.get(level, LEVEL_FOOD[4])
+    if free_cells is None:
+        free_cells = create_free_cells(board)
+    check_free_cells(free_cells, food, level)
     for key in food:
         for i in range(food[key]):
-            ready = False
-            while not ready:
-                lines = random.randrange(2, 38)
-                columnes = random.randrange(2, 118)
-                if board[lines][columnes] == ' ':
-                    board[lines][columnes] = item_colors[key] + key + reset_color
-                    ready = True
+            place_in_free_cell(board, free_cells, ITEM_TILES[key], rng)
     return board
 
 
-def insert_minions(board, level):
+def create_minions(minions_location):
+    """Function creates minions positions together with index of places they occupy.
+
+    Args:
+        minions_location (list): list containing positions (x, y) of enemies on the board
+
+    Return:
+        minions (dict): 'location' - list of minions positions (x, y) by minion number,
+            'cells' - dictionary of occupied places {(x, y): minion number}
+    """
+
+    location = [(x_minion, y_minion) for x_minion, y_minion in minions_location]
+    cells = {position: minion_nr for minion_nr, position in enumerate(location)}
+    return {'location': location, 'cells': cells}
+
+
+def insert_minions(board, level, free_cells=None, rng=random):
     """Function inserts evil minions into gameboard.
 
     Args:
-        board (list): list of board rows (list)
+        board (dict): tile board
         level (int): actual game level
+        free_cells (list): positions of empty places (see create_free_cells), created if not given
+        rng (random.Random): random numbers generator
 
     Return:
-        board (list): list of board rows (list) after evil minions insertion
-        minions_location (list): list containing positions of enemies on the board
+        board (dict): tile board after evil minions insertion
+        minions (dict): positions of enemies on the board (see create_minions)
     """
 
-    item_colors = {'ᴥ': '\033[31m'}
-    reset_color = '\033[0m'
-    if level == 4:
-        minions = {'ᴥ': 5}
-    elif level == 2:
-        minions = {'ᴥ': 5}
-    elif level == 3:
-        minions = {'ᴥ': 5}
-    else:
-        minions = {}
-
+    minions = LEVEL_MINIONS.get(level, {})
+    if free_cells is None:
+        free_cells = create_free_cells(board)
+    check_free_cells(free_cells, minions, level)
     minions_location = []
     for key in minions:
         for i in range(minions[key]):
-            ready = False
-            while not ready:
-                lines = random.randrange(2, 38)
-                columnes = random.randrange(2, 118)
-                if board[lines][columnes] == ' ':
-                    board[lines][columnes] = item_colors[key] + key + reset_color
-                    ready = True
-                    minions_location.append([columnes, lines])
-    return board, minions_location
+            columnes, lines = place_in_free_cell(board, free_cells, ITEM_TILES[key], rng)
+            minions_location.append((columnes, lines))
+    return board, create_minions(minions_location)
 
 
 def insert_friends(board, level):
     """Function insert squirrel's friends into gameboard.
 
     Args:
-        board (list): list of board rows (list)
+        board (dict): tile board
         level (int): actual game level
 
     Return:
-        board (list): list of board rows (list) after friends insertion
+        board (dict): tile board after friends insertion
     """
 
-    friends = ['☹', '☃', '♞', '☻', '☬']
     if level == 4:
         lines = 37
         columnes = 34
-        for friend in friends:
-            board[lines][columnes] = friend
+        for friend in FRIENDS:
+            set_tile(board, columnes, lines, friend)
             columnes += 17
     return board
 
@@ -134,30 +366,78 @@ def colour_hamster(board, level):
     """Function colours hamster image on level4 gameboard.
 
     Args:
-        board (list): list of board rows (list)
+        board (dict): tile board
         level (int): actual game level
 
     Return:
-        board (list): list of board rows (list) after colouring hamster
+        board (dict): tile board after colouring hamster
     """
 
-    blue = '\033[34m'
-    darkgrey = '\033[90m'
-    yellow = '\033[93m'
-    reset_color = '\033[0m'
+    hamster_parts = {tile_ids[(glyph, '')]: HAMSTER_TILES[glyph] for glyph in HAMSTER_TILES
+                     if (glyph, '') in tile_ids}    # uncolored tile: colored tile
 
     if level == 4:
         for lines in range(20, 31):
             for columnes in range(100, 120):
-                if board[lines][columnes] == '&':
-                    board[lines][columnes] = blue + '&' + reset_color
-                elif board[lines][columnes] == '*':
-                    board[lines][columnes] = darkgrey + '*' + reset_color
-                elif board[lines][columnes] == '%':
-                    board[lines][columnes] = yellow + '%' + reset_color
+                tile = get_tile(board, columnes, lines)
+                if tile in hamster_parts:
+                    set_tile(board, columnes, lines, hamster_parts[tile])
+    return board
+
+
+def index_barriers(board, level):
+    """Function finds groups of barriers removed at once during the game (see tiles.remove_barrier_group):
+        barriers around the exit ('exit') and, on level 4, barriers protecting the evil hamster ('shield',
+        found in HAMSTER_SHIELD_AREA).
+
+    Args:
+        board (dict): tile board
+        level (int): actual game level
+
+    Return:
+        board (dict): tile board with barrier groups in board['barriers']
+    """
+
+    barriers = board['barriers']
+    if level in LEVEL_EXIT_MINIGAMES:
+        exit_lines, exit_columnes = exit_area(board)
+        barriers['exit'] = [(columnes, lines) for lines in exit_lines for columnes in exit_columnes
+                            if get_tile(board, columnes, lines) == BARRIER]
+    if level == 4:  # only the hamster's place is searched, the level may be a world too big to be searched
+        barriers['shield'] = [(position % board['width'], position // board['width'])
+                              for position in find_tiles(board, BARRIER, HAMSTER_SHIELD_AREA)]
     return board
 
 
+def level_template(level):
+    """Function returns level board shared by all games of the process, loading it only once.
+        The template has read-only tiles (bytes) with the hamster coloured, indexed barrier groups
+        and empty places found before items were placed ('free_cells').
+
+    Args:
+        level (int): game level
+
+    Return:
+        template (dict): tile board used by tiles.overlay_board, None for worlds
+            (their chunks are already loaded only when used, see world.ChunkedTiles)
+    """
+
+    if level in LEVEL_TEMPLATES:
+        return LEVEL_TEMPLATES[level]
+    board = loading_level(str(level))
+    if isinstance(board['tiles'], ChunkedTiles):
+        board['tiles'].close()
+        template = None
+    else:
+        board = index_barriers(colour_hamster(board, level), level)
+        template = dict(board, tiles=bytes(board['tiles']), free_cells=tuple(create_free_cells(board)),
+                        barriers={name: tuple(positions) for name, positions in board['barriers'].items()})
+        for name in ['panel', 'footer']:
+            template[name] = dict(board[name], tiles=bytes(board[name]['tiles']))
+    LEVEL_TEMPLATES[level] = template
+    return template
+
+
 def create_player():
     """Function asks user about name and color of the game character.
 
@@ -182,20 +462,22 @@ def create_player():
     return character_name, character_color
 
 
-def setting_next_level(level, inventory):
+def setting_next_level(level, inventory, rng=random):
     """Function sets parameters of next game level.
 
     Args:
         level (int): number of current game level
+        inventory (dict): collected items(keys) and their amounts (values)
+        rng (random.Random): random numbers generator
 
     Return:
         game_won (bool): True if player managed to finish the game, False otherwise
         level (int): number of next game level
         inventory (dict): collected items(keys) and their amounts (values)
-        board (list): list of board rows (list)
+        board (dict): tile board
         x_player (int): horizontal position of player on the board
         y_player (int): vertical position of player on the board
-        minions_location (list): list containing positions of enemies on the board
+        minions (dict): positions of enemies on the board (see create_minions)
     """
 
     x_player = 1    # player's initial horizontal position
@@ -210,13 +492,21 @@ def setting_next_level(level, inventory):
     if level == 5:
         game_won = True
         board = []
-        minions_location = []
+        minions = create_minions([])
     else:
-        board = loading_level(str(level))
-        board = insert_food(board, level)
-        board, minions_location = insert_minions(board, level)
+        template = level_template(level)
+        if template is None:
+            board = loading_level(str(level))
+            free_cells = create_free_cells(board)
+        else:   # the game keeps only its changes of the shared level
+            board = overlay_board(template)
+            free_cells = list(template['free_cells'])
+        board = insert_food(board, level, free_cells, rng)
+        board, minions = insert_minions(board, level, free_cells, rng)
         board = insert_friends(board, level)
-        board = colour_hamster(board, level)
+        if template is None:
+            board = colour_hamster(board, level)
+            board = index_barriers(board, level)
         game_won = False
     inventory['●'] = 0
-    return game_won, level, inventory, board, x_player, y_player, minions_location
+    return game_won, level, inventory, board, x_player, y_player, minions
@@ -0,0 +1,246 @@
+import heapq
+from array import array
+from tiles import *
+
+UNREACHED = 1 << 40     # distance of places the player cannot be reached from
+UPDATE_BUDGET = 20000   # places updated by update_flow_field at most, the rest is continued in next game ticks
+FIELD_RADIUS = 256      # distances are kept only for places at most so many columns and lines from the player
+
+
+def create_flow_field(board, x_player, y_player, budget=UPDATE_BUDGET):
+    """Function creates distance field: number of steps from every place of the board to the player.
+        Minions chasing the player step to a neighbouring place with smaller distance.
+        Distances are stored as raw values, real distance is raw value + offset (see move_field_source).
+        Only a window of places at most FIELD_RADIUS columns and lines from the player is kept (a frame of
+        places which cannot be entered is put around it), so memory and the first search do not grow with
+        the size of the map. At most budget places are updated now, the rest by next updates.
+
+    Args:
+        board (dict): tile board
+        x_player (int): horizontal position of player on the board
+        y_player (int): vertical position of player on the board
+        budget (int): number of places updated at most (no limit if None)
+
+    Return:
+        field (dict): raw distances ('distance') and passability ('walkable') of the window places,
+            passability of tiles ('passable'), 'offset', player position ('source'),
+            window on the board ('left', 'top', 'right', 'bottom', 'columns' with the frame),
+            heap of places waiting for update ('pending', see relax_field)
+            and number of board['opened'] places already applied ('opened_nr')
+    """
+
+    width = board['width']
+    left, top = max(x_player - FIELD_RADIUS, 0), max(y_player - FIELD_RADIUS, 0)
+    right, bottom = min(x_player + FIELD_RADIUS + 1, width), min(y_player + FIELD_RADIUS + 1, board['height'])
+    columns = right - left + 2
+    passable = bytes([tile_flags[tile] & PASSABLE for tile in range(len(tile_flags))]).ljust(256, b'\x00')
+    tiles = board['tiles']
+    walkable = bytearray(columns * (bottom - top + 2))
+    for line in range(top, bottom):
+        start = (line - top + 1) * columns + 1
+        walkable[start:start + right - left] = bytes(tiles[line * width + left:line * width + right]).translate(
+            passable)
+    field = {'width': width, 'height': board['height'], 'columns': columns, 'left': left, 'top': top,
+             'right': right, 'bottom': bottom, 'distance': array('q', [UNREACHED]) * len(walkable),
+             'walkable': walkable, 'passable': passable, 'offset': 0,
+             'source': (y_player - top + 1) * columns + x_player - left + 1, 'pending': [],
+             'opened_nr': len(board.get('opened', ()))}
+    field['distance'][field['source']] = 0
+    relax_field(field, [field['source']], budget=budget)
+    return field
+
+
+def window_position(field, x, y):
+    """Function returns position of the board place in the window of distance field.
+
+    Args:
+        field (dict): distance field (see create_flow_field)
+        x (int): horizontal position on the board
+        y (int): vertical position on the board
+
+    Return:
+        position (int): line of the window * window columns + column of the window
+    """
+
+    return (y - field['top'] + 1) * field['columns'] + x - field['left'] + 1
+
+
+def in_window(field, x, y):
+    """Function checks if the board place is kept in distance field.
+
+    Args:
+        field (dict): distance field (see create_flow_field)
+        x (int): horizontal position on the board
+        y (int): vertical position on the board
+
+    Return:
+        inside (bool): True if the place is in the window of the field
+    """
+
+    return field['left'] <= x < field['right'] and field['top'] <= y < field['bottom']
+
+
+def field_distance(field, position):
+    """Function returns number of steps from the place to the player.
+
+    Args:
+        field (dict): distance field (see create_flow_field)
+        position (int): position on the board (line * board width + column)
+
+    Return:
+        distance (int): number of steps (UNREACHED or more if the player cannot be reached
+            or the place is out of the window)
+    """
+
+    y, x = divmod(position, field['width'])
+    if not in_window(field, x, y):
+        return UNREACHED
+    return field['distance'][window_position(field, x, y)] + field['offset']
+
+
+def relax_field(field, starts, limit=UNREACHED, budget=None):
+    """Function lowers distances of places around the start places, as long as they get smaller.
+        Distances of other places are not touched, so the cost depends only on the changed area.
+        Places are updated from the nearest to the player, those left because of the limit or the budget
+        stay in the pending heap and are continued by the next call. Until then their distances
+        are too big, never too small.
+
+    Args:
+        field (dict): distance field (see create_flow_field)
+        starts (list): window positions with already lowered distances
+        limit (int): places farther than limit are not updated
+        budget (int): number of places updated at most (no limit if None)
+    """
+
+    distance = field['distance']
+    walkable = field['walkable']
+    columns = field['columns']
+    limit -= field['offset']    # limit of raw values
+    pending = field['pending']  # heap of (raw distance, window position)
+    for position in starts:
+        heapq.heappush(pending, (distance[position], position))
+    updated = 0
+    while pending and updated != budget:
+        position_distance, position = pending[0]
+        if position_distance >= limit:
+            break
+        heapq.heappop(pending)
+        if position_distance != distance[position]:     # place was lowered again after it was put on the heap
+            continue
+        updated += 1
+        next_distance = position_distance + 1
+        for neighbour in (position - 1, position + 1, position - columns, position + columns):
+            if distance[neighbour] > next_distance and walkable[neighbour]:
+                distance[neighbour] = next_distance
+                heapq.heappush(pending, (next_distance, neighbour))
+    if len(pending) > 100000:   # drops entries of places which were lowered again after they were put on the heap
+        pending[:] = [(position_distance, position) for position_distance, position in pending
+                      if distance[position] == position_distance]
+        heapq.heapify(pending)
+
+
+def window_fits(field, x_player, y_player):
+    """Function checks if the player is far enough from the sides of the window which are not sides of the board,
+        so places around him are still kept in distance field.
+
+    Args:
+        field (dict): distance field (see create_flow_field)
+        x_player (int): horizontal position of player on the board
+        y_player (int): vertical position of player on the board
+
+    Return:
+        fits (bool): False if the window should be moved to the player
+    """
+
+    margin = FIELD_RADIUS // 2
+    return ((field['left'] == 0 or x_player - field['left'] >= margin) and
+            (field['right'] == field['width'] or field['right'] - x_player > margin) and
+            (field['top'] == 0 or y_player - field['top'] >= margin) and
+            (field['bottom'] == field['height'] or field['bottom'] - y_player > margin))
+
+
+def move_field_source(field, board, x_player, y_player, limit=UNREACHED, budget=None):
+    """Function updates distance field after the player moved.
+        If the player moved by k steps, no distance grew by more than k, so all distances are raised by k
+        (only the offset changes) and then lowered from the new player position by relax_field.
+        The field is created again if the new position was not reached before or the player came close
+        to a side of the window (see window_fits).
+
+    Args:
+        field (dict): distance field (see create_flow_field)
+        board (dict): tile board
+        x_player (int): horizontal position of player on the board
+        y_player (int): vertical position of player on the board
+        limit (int): places farther than limit (measured before the move) are not updated
+        budget (int): number of places updated at most (see relax_field)
+    """
+
+    if not window_fits(field, x_player, y_player):
+        field.update(create_flow_field(board, x_player, y_player, budget))
+        return
+    source = window_position(field, x_player, y_player)
+    if source == field['source']:
+        return
+    steps = field['distance'][source] + field['offset']
+    if steps >= UNREACHED:
+        field.update(create_flow_field(board, x_player, y_player, budget))
+        return
+    field['offset'] += steps
+    field['source'] = source
+    field['distance'][source] = -field['offset']
+    relax_field(field, [source], limit + steps, budget)
+
+
+def open_field_places(field, board, limit=UNREACHED, budget=None):
+    """Function updates distance field after barriers were removed from the board (see tiles.open_tile).
+
+    Args:
+        field (dict): distance field (see create_flow_field)
+        board (dict): tile board
+        limit (int): places farther than limit are not updated
+        budget (int): number of places updated at most (see relax_field)
+    """
+
+    opened = board.get('opened', [])
+    distance = field['distance']
+    columns = field['columns']
+    starts = []
+    for place in opened[field['opened_nr']:]:
+        y, x = divmod(place, field['width'])
+        if not in_window(field, x, y) or not field['passable'][board['tiles'][place]]:
+            continue
+        position = window_position(field, x, y)
+        field['walkable'][position] = 1
+        nearest = min(distance[neighbour] for neighbour in (position - 1, position + 1, position - columns,
+                                                             position + columns))
+        if nearest + 1 < distance[position]:
+            distance[position] = nearest + 1
+            starts.append(position)
+    field['opened_nr'] = len(opened)
+    if starts:
+        relax_field(field, starts, limit, budget)
+
+
+def update_flow_field(field, board, x_player, y_player, minions, budget=UPDATE_BUDGET):
+    """Function brings distance field up to date with the board and player position.
+        Only places not farther from the player than the farthest minion (plus one step) are updated,
+        and at most budget of them in one call, starting from the nearest to the player.
+        On big maps far minions may follow a few steps old field for a while, then.
+
+    Args:
+        field (dict): distance field (see create_flow_field)
+        board (dict): tile board
+        x_player (int): horizontal position of player on the board
+        y_player (int): vertical position of player on the board
+        minions (dict): positions of enemies on the board (see environment.create_minions)
+        budget (int): number of places updated at most
+    """
+
+    width = field['width']
+    limit = max([field_distance(field, y * width + x) for x, y in minions['location']] + [0]) + 1
+    limit = min(limit, UNREACHED)
+    open_field_places(field, board, limit, budget)
+    if in_window(field, x_player, y_player) and window_position(field, x_player, y_player) == field['source']:
+        relax_field(field, [], limit, budget)    # continues pending updates
+    else:
+        move_field_source(field, board, x_player, y_player, limit, budget)
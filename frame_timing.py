@@ -0,0 +1,119 @@
+import os
+import json
+import time
+from collections import deque
+
+TIMING_VARIABLE = 'SQUIRREL_TIMING'     # environment variable with name of the timing file, enables timing
+TIMING_WINDOW = 2000    # number of the latest samples of each phase used for percentiles
+
+
+def create_frame_timer(filename=None, window=TIMING_WINDOW):
+    """Function creates timer measuring phases of the main loop, if timing is enabled
+        (filename given or set in SQUIRREL_TIMING environment variable).
+
+    Args:
+        filename (str): name of JSON file the timing is saved to (see save_timing)
+        window (int): number of the latest samples of each phase kept for percentiles
+
+    Return:
+        timer (dict): the latest samples ('samples') and totals ('totals') by phase name,
+            time of the previous mark ('last'), or None if timing is disabled
+    """
+
+    filename = filename or os.environ.get(TIMING_VARIABLE)
+    if not filename:
+        return None
+    return {'filename': filename, 'window': window, 'samples': {}, 'totals': {}, 'last': time.perf_counter(),
+            'started': time.time()}
+
+
+def mark(timer, phase):
+    """Function ends the phase: time since the previous mark is added to the phase samples.
+        Costs only one function call when timing is disabled (timer is None).
+
+    Args:
+        timer (dict): frame timer (see create_frame_timer) or None
+        phase (str): name of the phase which has just ended
+    """
+
+    if timer is None:
+        return
+    now = time.perf_counter()
+    elapsed = now - timer['last']
+    timer['last'] = now
+    samples = timer['samples'].get(phase)
+    if samples is None:
+        samples = timer['samples'][phase] = deque(maxlen=timer['window'])
+        timer['totals'][phase] = [0, 0.0, 0.0]     # count, sum, maximum
+    samples.append(elapsed)
+    totals = timer['totals'][phase]
+    totals[0] += 1
+    totals[1] += elapsed
+    totals[2] = max(totals[2], elapsed)
+
+
+def skip(timer):
+    """Function starts the next phase now without measuring time since the previous mark,
+        e.g. after level title or minigame screen.
+
+    Args:
+        timer (dict): frame timer (see create_frame_timer) or None
+    """
+
+    if timer is not None:
+        timer['last'] = time.perf_counter()
+
+
+def percentile(sorted_samples, fraction):
+    """Function returns sample below which given fraction of samples lie (nearest rank).
+
+    Args:
+        sorted_samples (list): samples in ascending order (not empty)
+        fraction (float): 0.5 for median, 0.95 for 95th percentile and so on
+
+    Return:
+        value (float): sample value
+    """
+
+    rank = max(int(fraction * len(sorted_samples) + 0.999999) - 1, 0)
+    return sorted_samples[min(rank, len(sorted_samples) - 1)]
+
+
+def timing_report(timer):
+    """Function summarizes timing of phases in milliseconds.
+
+    Args:
+        timer (dict): frame timer (see create_frame_timer)
+
+    Return:
+        report (dict): phase name: count, total, mean and max of all samples,
+            p50, p95 and p99 of the latest window of samples
+    """
+
+    report = {}
+    for phase, samples in timer['samples'].items():
+        count, total, maximum = timer['totals'][phase]
+        latest = sorted(samples)
+        report[phase] = {
+            'count': count, 'total_ms': round(total * 1000, 3), 'mean_ms': round(total * 1000 / count, 4),
+            'max_ms': round(maximum * 1000, 4), 'window': len(latest),
+            'p50_ms': round(percentile(latest, 0.5) * 1000, 4), 'p95_ms': round(percentile(latest, 0.95) * 1000, 4),
+            'p99_ms': round(percentile(latest, 0.99) * 1000, 4)}
+    return report
+
+
+def save_timing(timer, extra=None):
+    """Function writes timing report into the JSON file given when the timer was created.
+
+    Args:
+        timer (dict): frame timer (see create_frame_timer) or None (nothing is written then)
+        extra (dict): additional information saved with the report (e.g. game options)
+    """
+
+    if timer is None:
+        return
+    content = {'started': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(timer['started'])),
+               'duration_s': round(time.time() - timer['started'], 3), 'phases': timing_report(timer)}
+    content.update(extra or {})
+    with open(timer['filename'], 'w') as timing_file:
+        json.dump(content, timing_file, indent=2)
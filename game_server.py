@@ -0,0 +1,502 @@
+import sys
+import time
+import random
+import asyncio
+import argparse
+import codecs
+import highscore
+import hotcoldgame
+import add_numbers_game
+import guess_number_game
+import remember_number_game
+from assets import COLORS, asset_frames, colored_frame
+from types import SimpleNamespace
+from clock import *
+from engine import new_game, handle_buttons, finish_minigame, close_game, HAMSTER_MINIGAME
+from controls import parse_keys
+from display import create_screen, create_board, prepare_board_to_print, update_board_information, manage_display
+
+SERVER_HOST = '127.0.0.1'
+SERVER_PORT = 7777
+SIMULATION_RATE = 20    # game ticks per second (see squirrel_game)
+RENDER_RATE = 15    # frames per second at most, lower than in the terminal game to serve more players
+MINION_RATE = 3     # minions moves per second
+TITLE_TIME = 2  # seconds level title is shown for
+CHARACTER_COLORS = {'1': '\033[31m', '2': '\033[32m', '3': '\033[33m'}
+TELNET_IAC = 255
+# server echoes typed characters and suppresses go-ahead, so telnet clients send every key at once
+TELNET_HELLO = bytes([TELNET_IAC, 251, 1, TELNET_IAC, 251, 3])
+CLEAR = '\033[H\033[2J'
+MAX_PENDING_KEYS = 256  # buttons received and not handled yet kept at most (see receive_keys)
+MAX_LINE_LENGTH = 80    # characters of text typed by user kept at most (see read_line)
+
+
+def strip_telnet(data, session):
+    """Function removes telnet commands from data received from the client.
+
+    Args:
+        data (bytes): data received from the client
+        session (dict): game session (see create_session), keeps command which is not complete yet
+
+    Return:
+        data (bytes): data without telnet commands
+    """
+
+    data = session['telnet'] + data
+    session['telnet'] = b''
+    if TELNET_IAC not in data:
+        return data
+    result = bytearray()
+    position = 0
+    while position < len(data):
+        byte = data[position]
+        if byte != TELNET_IAC:
+            result.append(byte)
+            position += 1
+            continue
+        if position + 1 >= len(data):
+            session['telnet'] = data[position:]
+            break
+        command = data[position + 1]
+        if command == TELNET_IAC:   # escaped 255 byte
+            result.append(TELNET_IAC)
+            position += 2
+        elif command in (251, 252, 253, 254):     # WILL, WON'T, DO, DON'T with option byte
+            if position + 2 >= len(data):
+                session['telnet'] = data[position:]
+                break
+            position += 3
+        elif command == 250:    # subnegotiation lasts until IAC SE
+            end = data.find(bytes([TELNET_IAC, 240]), position + 2)
+            if end == -1:
+                session['telnet'] = data[position:]
+                break
+            position = end + 2
+        else:
+            position += 2
+    return bytes(result)
+
+
+def create_session(reader, writer):
+    """Function creates game session of one connected client.
+
+    Args:
+        reader (asyncio.StreamReader): stream of data received from the client
+        writer (asyncio.StreamWriter): stream of data sent to the client
+
+    Return:
+        session (dict): streams, buttons pressed and not handled yet ('keys'), event set when keys arrive,
+            'closed' flag and state of decoding the input
+    """
+
+    session = {'reader': reader, 'writer': writer, 'keys': [], 'arrived': asyncio.Event(), 'closed': False,
+               'telnet': b'', 'decoder': codecs.getincrementaldecoder('utf-8')('replace'), 'pending': ''}
+    # frames are written by display.render_frame like to the terminal
+    session['output'] = SimpleNamespace(write=lambda text: send(session, text), flush=lambda: None)
+    return session
+
+
+def send(session, text):
+    """Function sends text to the client without waiting (see drain).
+
+    Args:
+        session (dict): game session (see create_session)
+        text (str): text, new lines are sent as telnet new lines
+    """
+
+    if not session['closed']:
+        session['writer'].write(text.replace('\n', '\r\n').encode('utf-8'))
+
+
+async def drain(session):
+    """Function waits until data sent to the client is received, so slow client slows down only its session.
+
+    Args:
+        session (dict): game session (see create_session)
+    """
+
+    try:
+        await session['writer'].drain()
+    except ConnectionError:
+        session['closed'] = True
+
+
+async def receive_keys(session):
+    """Function reads data from the client until the connection is closed, splitting it into buttons.
+
+    Args:
+        session (dict): game session (see create_session)
+    """
+
+    try:
+        while True:
+            data = await session['reader'].read(1024)
+            if not data:
+                break
+            text = session['pending'] + session['decoder'].decode(strip_telnet(data, session))
+            keys, session['pending'] = parse_keys(text)
+            # buttons beyond the buffer are dropped, so a client sending faster than the game reads costs no memory
+            session['keys'] += keys[:MAX_PENDING_KEYS - len(session['keys'])]
+            session['arrived'].set()
+    except ConnectionError:
+        pass
+    finally:
+        session['closed'] = True
+        session['arrived'].set()
+
+
+async def wait_keys(session, timeout):
+    """Function waits up to timeout for buttons and returns all buttons pressed since the last call.
+
+    Args:
+        session (dict): game session (see create_session)
+        timeout (float): maximal waiting time in seconds when no button is pending
+
+    Return:
+        keys (list): buttons pressed by user (empty if nothing was pressed)
+    """
+
+    if not session['keys'] and not session['closed']:
+        session['arrived'].clear()
+        try:
+            await asyncio.wait_for(session['arrived'].wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+    keys = session['keys']
+    session['keys'] = []
+    return keys
+
+
+async def read_line(session, prompt=''):
+    """Function asks user for line of text, like input() in the terminal game.
+
+    Args:
+        session (dict): game session (see create_session)
+        prompt (str): text shown before the answer
+
+    Return:
+        line (str): text typed by user
+    """
+
+    send(session, prompt)
+    await drain(session)
+    line = ''
+    while True:
+        keys = await wait_keys(session, None)
+        if session['closed'] and not keys:
+            raise ConnectionError('client disconnected')
+        for position, key in enumerate(keys):
+            if key in '\r\n':
+                # the rest is kept for the game, null or line feed sent after carriage return is skipped
+                session['keys'] = [key for key in keys[position + 1:] if key not in '\0\n'] + session['keys']
+                send(session, '\n')
+                return line
+            if key in '\x7f\x08':
+                if line:
+                    line = line[:-1]
+                    send(session, '\b \b')
+            elif key.isprintable() and len(line) < MAX_LINE_LENGTH:
+                line += key
+                send(session, key)
+        await drain(session)
+
+
+async def show_text(session, text, seconds=None):
+    """Function shows screen of text until user presses ENTER or for given time.
+
+    Args:
+        session (dict): game session (see create_session)
+        text (str): shown text
+        seconds (float): time the text is shown for (until ENTER if None)
+    """
+
+    send(session, CLEAR + text)
+    if seconds is None:
+        await read_line(session, '\nPress ENTER to continue.')
+    else:
+        await drain(session)
+        await asyncio.sleep(seconds)
+        session['keys'] = []    # buttons pressed while the text was shown are dropped
+
+
+async def guess_number(session, rng):
+    """Function plays guess_number_game with the client.
+
+    Args:
+        session (dict): game session (see create_session)
+        rng (random.Random): random numbers generator of the session
+
+    Return:
+        won (bool): True if user won the minigame
+    """
+
+    number = guess_number_game.generate_number(rng)
+    send(session, CLEAR + guess_number_game.INSTRUCTION + '\n')
+    while True:
+        guess = await read_line(session)
+        problem = guess_number_game.input_problem(guess)
+        if problem:
+            send(session, problem + '\n')
+            continue
+        won, message = guess_number_game.guess_check(int(guess), number)
+        if won:
+            await show_text(session, message, 2)
+            return True
+        send(session, message + '\n')
+
+
+async def add_numbers(session, rng):
+    """Function plays add_numbers_game with the client.
+
+    Args:
+        session (dict): game session (see create_session)
+        rng (random.Random): random numbers generator of the session
+
+    Return:
+        won (bool): True if user won the minigame
+    """
+
+    while True:
+        question, total = add_numbers_game.generate_numbers(rng)
+        send(session, CLEAR + add_numbers_game.INSTRUCTION + '\n' + question)
+        start = time.monotonic()
+        while True:
+            guess = await read_line(session)
+            your_time = time.monotonic() - start
+            won, message = add_numbers_game.check_answer(total, int(guess) if guess.isdigit() else None, your_time)
+            if won or your_time > add_numbers_game.TIME_LIMIT:
+                break
+            send(session, message + '\n')
+        await show_text(session, message, 2)
+        if won:
+            return True
+
+
+async def remember_number(session, rng):
+    """Function plays remember_number_game with the client.
+
+    Args:
+        session (dict): game session (see create_session)
+        rng (random.Random): random numbers generator of the session
+
+    Return:
+        won (bool): True if user won the minigame
+    """
+
+    while True:
+        number = remember_number_game.generate_number(rng)
+        await show_text(session, remember_number_game.INSTRUCTION + '\ntelephone: ' + number,
+                        remember_number_game.SHOW_TIME)
+        send(session, CLEAR + remember_number_game.INSTRUCTION + '\n')
+        won, message = remember_number_game.check_answer(number, await read_line(session))
+        await show_text(session, message, 2)
+        if won:
+            return True
+
+
+async def hot_cold(session, rng):
+    """Function plays hotcoldgame with the client.
+
+    Args:
+        session (dict): game session (see create_session)
+        rng (random.Random): random numbers generator of the session
+
+    Return:
+        won (bool): True if user won the minigame
+    """
+
+    number = hotcoldgame.generate_number(rng)
+    send(session, CLEAR + hotcoldgame.ENDC + hotcoldgame.INSTRUCTION + '\n')
+    hot_amount = 0
+    for turn in range(1, hotcoldgame.GUESSES + 1):
+        guess = await read_line(session, 'Guess #{} '.format(turn))
+        while not hotcoldgame.valid_guess(guess):
+            guess = await read_line(session, hotcoldgame.INVALID_GUESS + '\n')
+        hot_amount, clues = hotcoldgame.hint(number, guess)
+        send(session, clues + '\n')
+        if hot_amount == 3:
+            break
+    won, message = hotcoldgame.final_result(hot_amount)
+    await show_text(session, message, 2)
+    return won
+
+
+# minigame name: (number of title image, minigame played with the client)
+SERVER_MINIGAMES = {
+    'guess_number': (4, guess_number), 'add_numbers': (4, add_numbers), 'remember_number': (4, remember_number),
+    HAMSTER_MINIGAME: (5, hot_cold)}
+
+
+async def handle_session_events(session, state, events, titles):
+    """Function shows screens requested by the game engine, like squirrel_game.handle_events.
+
+    Args:
+        session (dict): game session (see create_session)
+        state (dict): game state
+        events (list): events (name, value) returned by the game engine
+        titles (list): level title images (see load_titles)
+
+    Return:
+        paused (bool): True if another screen was shown
+    """
+
+    paused = False
+    for name, value in events:
+        if name == 'next_level' and value in [1, 2, 3, 4]:
+            await show_text(session, titles[value - 1], TITLE_TIME)
+        elif name == 'show_info':
+            await show_text(session, '\n'.join(''.join(row) for row in prepare_board_to_print(
+                state['inventory'], create_board(120, 40))))
+        elif name == 'minigame':
+            title_number, minigame = SERVER_MINIGAMES[value]
+            await show_text(session, titles[title_number], TITLE_TIME)
+            won = await minigame(session, session['rng'])
+            await handle_session_events(session, state, finish_minigame(state, won), titles)
+        else:
+            continue
+        paused = True
+    return paused
+
+
+async def play_session(session, options):
+    """Function plays one game with the client, like squirrel_game.main does in the terminal.
+
+    Args:
+        session (dict): game session (see create_session)
+        options (dict): 'tick_rate', 'fps', 'minion_rate', 'chase', highscores 'database', level 'titles'
+            and 'highscores_lock' (see serve)
+    """
+
+    send(session, CLEAR + 'Character creation screen.\n')
+    character_name = (await read_line(session, "Choose your character's name: "))[:10]
+    character_color = ''
+    while character_color not in CHARACTER_COLORS:
+        character_color = await read_line(session, "Choose your character's color [1, 2 or 3].\n"
+                                                   "    1. red\n    2. green\n    3. yellow\n")
+    character_color = CHARACTER_COLORS[character_color]
+    session['rng'] = random.Random()    # minigames get other random numbers than the game
+
+    minion_period = max(1, round(options['tick_rate'] / options['minion_rate']))
+    state, events = new_game(character_name, chase=options['chase'], minion_period=minion_period)
+    screen = create_screen(session['output'])
+    start_time = time.monotonic()
+    try:
+        await handle_session_events(session, state, events, options['titles'])
+        clock = create_clock({'tick': options['tick_rate'], 'render': options['fps']}, {'render': 1})
+        buttons_pressed = []
+        while not state['game_over'] and not session['closed']:
+            buttons_pressed += await wait_keys(session, time_to_next(clock))
+            for tick in range(due_ticks(clock, 'tick')):
+                state['time'] = int(time.monotonic() - start_time)
+                events = handle_buttons(state, buttons_pressed)
+                buttons_pressed = []
+                if await handle_session_events(session, state, events, options['titles']):
+                    reset_clock(clock)
+                    screen['rows'] = None   # other screen was shown, whole frame is drawn again
+                    break
+                if state['game_over']:
+                    break
+            if due_ticks(clock, 'render') and not state['game_over']:
+                update_board_information(state['board'], state['level'], character_name, state['health'],
+                                         state['inventory'], state['time'], state['hamster_energy'])
+                manage_display(state['board'], state['x_player'], state['y_player'], character_color, screen)
+                await drain(session)
+    finally:
+        close_game(state)
+
+    if session['closed']:
+        return
+    state['time'] = int(time.monotonic() - start_time)
+    async with options['highscores_lock']:  # file and database work runs in a thread, one game at a time
+        scores = await asyncio.get_running_loop().run_in_executor(
+            None, highscore.update_highscores, state['game_won'], state['health'], state['time'], character_name,
+            options['database'])
+    await show_text(session, '{}\n\n{}\n'.format(
+        'You won!' if state['game_won'] else 'Game over.', highscore.format_highscores(scores)), 3)
+
+
+async def handle_client(reader, writer, options):
+    """Function serves one connected client until the game ends or the client disconnects.
+
+    Args:
+        reader (asyncio.StreamReader): stream of data received from the client
+        writer (asyncio.StreamWriter): stream of data sent to the client
+        options (dict): game options (see play_session)
+    """
+
+    session = create_session(reader, writer)
+    receiving = asyncio.ensure_future(receive_keys(session))
+    try:
+        writer.write(TELNET_HELLO)
+        await play_session(session, options)
+    except ConnectionError:
+        pass
+    finally:
+        receiving.cancel()
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+def load_titles():
+    """Function prepares colorized level title images once for all sessions (see assets).
+
+    Return:
+        titles (list): images
+    """
+
+    return [colored_frame('level_titles', number, COLORS[0]) for number in range(len(asset_frames('level_titles')))]
+
+
+async def serve(host=SERVER_HOST, port=SERVER_PORT, options=None):
+    """Function starts game server, each connected client plays its own game.
+
+    Args:
+        host (str): address the server listens on
+        port (int): TCP port (0 for any free port)
+        options (dict): 'tick_rate', 'fps', 'minion_rate' and 'chase' options of the games,
+            SQLite highscores 'database' (see highscore.update_highscores)
+
+    Return:
+        server (asyncio.Server): running server
+    """
+
+    options = dict({'tick_rate': SIMULATION_RATE, 'fps': RENDER_RATE, 'minion_rate': MINION_RATE, 'chase': False,
+                    'database': None}, **(options or {}))
+    options['titles'] = load_titles()
+    options['highscores_lock'] = asyncio.Lock()
+    return await asyncio.start_server(lambda reader, writer: handle_client(reader, writer, options), host, port)
+
+
+def main(arguments=None):
+    """Function runs game server until it is interrupted (connect with: telnet 127.0.0.1 7777)."""
+
+    parser = argparse.ArgumentParser(description='Day of the squirrel server, one game per telnet connection')
+    parser.add_argument('--host', default=SERVER_HOST)
+    parser.add_argument('--port', type=int, default=SERVER_PORT)
+    parser.add_argument('--chase', action='store_true', help='harder game, minions chase the squirrel')
+    parser.add_argument('--tick-rate', type=float, default=SIMULATION_RATE, help='game ticks per second')
+    parser.add_argument('--fps', type=float, default=RENDER_RATE, help='frames per second at most')
+    parser.add_argument('--minion-rate', type=float, default=MINION_RATE, help='minions moves per second')
+    parser.add_argument('--highscores-db', metavar='FILE', help='keep highscores in SQLite database '
+                        '(or set {})'.format(highscore.DATABASE_VARIABLE))
+    arguments = parser.parse_args(arguments)
+
+    async def run():
+        server = await serve(arguments.host, arguments.port, {
+            'tick_rate': arguments.tick_rate, 'fps': arguments.fps, 'minion_rate': arguments.minion_rate,
+            'chase': arguments.chase, 'database': arguments.highscores_db})
+        print('Serving on {}:{}'.format(arguments.host, arguments.port))
+        async with server:
+            await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,15 +2,21 @@ import random
 import time
 import os
 
+INSTRUCTION = """*** Guess the number! ***
+    I'm thinking about a number between 1 and 30. Try to guess it."""
 
-def generate_number():
+
+def generate_number(rng=random):
     """Function generates number to be guessed.
 
+    Args:
+        rng (random.Random): random numbers generator
+
     Return:
         number (int): generated number between 1 and 30
     """
 
-    number = random.randrange(1, 31)
+    number = rng.randrange(1, 31)
     return number
 
 
@@ -18,8 +24,24 @@ def initial_print():
     """Function prints the game instruction."""
 
     os.system('clear')
-    print("""*** Guess the number! ***
-    I'm thinking about a number between 1 and 30. Try to guess it.""")
+    print(INSTRUCTION)
+
+
+def input_problem(guess):
+    """Function checks if the user's answer is a number with at most 2 digits.
+
+    Args:
+        guess (str): text typed by user
+
+    Return:
+        problem (str): description of the problem, empty if the answer is a number
+    """
+
+    if not guess.isdigit():
+        return "Invalid input. You must guess a number!"
+    if len(guess) not in [1, 2]:
+        return "Invaid input. You must guess a number between 1 and 30."
+    return ''
 
 
 def guessing():
@@ -29,44 +51,46 @@ def guessing():
         guess (int): user's guess
     """
 
-    guess = ''
-    while not guess.isdigit():
+    guess = input()
+    while input_problem(guess):
+        print(input_problem(guess))
         guess = input()
-        if not guess.isdigit():
-            print("Invalid input. You must guess a number!")
-        if len(guess) not in [1, 2]:
-            print("Invaid input. You must guess a number between 1 and 30.")
     guess = int(guess)
     return guess
 
 
 def guess_check(guess, number):
-    """Function checks if the user's answer is correct and print it out.
+    """Function checks if the user's answer is correct.
 
     Args:
         number (int): generated number
         guess (int): user's guess
+
+    Return:
+        you_win (bool): True if the number was guessed
+        message (str): hint for the user
     """
 
     you_win = False
     if guess > number:
-        print('%d is too high' % guess)
+        message = '%d is too high' % guess
     elif guess < number:
-        print('%d is too low' % guess)
+        message = '%d is too low' % guess
     else:
-        print('\nCongratulations! You\'ve guessed my number.')
-        time.sleep(2)
+        message = '\nCongratulations! You\'ve guessed my number.'
         you_win = True
-    return you_win
+    return you_win, message
 
 
 def main():
     initial_print()
     number = generate_number()
-    guess = 0
-    while guess != number:
+    you_win = False
+    while not you_win:
         guess = guessing()
-        you_win = guess_check(guess, number)
+        you_win, message = guess_check(guess, number)
+        print(message)
+    time.sleep(2)
     return you_win
 
 
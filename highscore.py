@@ -1,118 +1,358 @@
 import os
+import heapq
 import datetime
-import operator
+try:
+    import sqlite3
+except ImportError:     # Python built without SQLite, only the log can be used
+    sqlite3 = None
 
+HIGHSCORES_FILENAME = 'highscores.log'   # append-only log of won games, one 'time health date name' line each
+OLD_HIGHSCORES_FILENAME = 'highscores.txt'     # table used before, moved into the log once (see migrate_highscores)
+TOP_SIZE = 10   # number of the best scores shown
+COMPACT_LIMIT = 10000   # the log is compacted when it has so many scores more than TOP_SIZE
+DATABASE_VARIABLE = 'SQUIRREL_HIGHSCORES_DB'    # environment variable with name of SQLite database used instead
+BUSY_TIMEOUT = 5000     # ms a write waits for other processes writing to the database
 
-def import_highscores(filename='highscores.txt'):
-    """Function imports high scores from .txt file, formats them and put them into highscore list.
+
+def parse_score(line):
+    """Function turns line of highscores log into score.
 
     Args:
-        filename (str): name of the file with high scores
+        line (str): line of the log ('time health date name' separated with tabs)
 
     Return:
-        highscores (list): list of high scores from .txt file
-    """
-
-    highscores = []
-    highscores_lines = []
-    with open(filename, 'r') as highscores_file:  # read high scores from the file and put each line to the list
-        scores = highscores_file.read().splitlines()
-        for score in scores:  # add separated scores to highscores_lines
-            if score != '':
-                highscores_lines.append(score)
-    for item in highscores_lines:  # add formatted scores to highscores list
-        item = item.split(' | ')
-        highscores.append(item)
-    return highscores
+        score (tuple): game time in seconds (int), health points (int), date (str) and character name (str),
+            None if the line is broken (e.g. the game was closed while it was written)
+    """
 
+    fields = line.rstrip('\n').split('\t', 3)
+    if len(fields) != 4 or not line.endswith('\n'):
+        return None
+    try:
+        return int(fields[0]), int(fields[1]), fields[2], fields[3]
+    except ValueError:
+        return None
 
-def add_to_highscores(highscores, health, your_time, character_name):
-    """Function adds new score to the highscore list.
+
+def format_score_line(score):
+    """Function turns score into line of highscores log.
 
     Args:
-        highscores (list): list of high scores from .txt file
-        health (int): player's health points
-        your_time (int): whole game time in seconds
+        score (tuple): game time, health, date and character name (see parse_score)
 
     Return:
-        highscores (list): list of high scores with new score added
+        line (str): line of the log
     """
 
-    date = str(datetime.date.today())
-    minutes = your_time // 60
-    seconds = your_time % 60
-    time = '{:3d}:{:02d}'.format(minutes, seconds)
-    score = ['{:10s}'.format(character_name), time, '{:5d}'.format(health), date]
-    highscores.append(score)
-    return highscores
+    your_time, health, date, character_name = score
+    character_name = character_name.replace('\t', ' ').replace('\n', ' ')
+    return '{}\t{}\t{}\t{}\n'.format(your_time, health, date, character_name)
+
+
+def push_score(highscores, score):
+    """Function puts score into the heap of the best scores if it is good enough.
+        The root of the heap is the worst of the kept scores: the longest time, then the lowest health,
+        then the latest added, so one comparison decides about a new score.
+
+    Args:
+        highscores (dict): highscores store (see load_highscores)
+        score (tuple): game time, health, date and character name (see parse_score)
+    """
+
+    entry = (-score[0], score[1], -highscores['count'], score)
+    highscores['count'] += 1
+    if len(highscores['heap']) < highscores['size']:
+        heapq.heappush(highscores['heap'], entry)
+    elif entry > highscores['heap'][0]:
+        heapq.heapreplace(highscores['heap'], entry)
+
+
+def read_old_highscores(old_filename):
+    """Function reads scores from the old table ('name | m:ss | health | date' lines).
+
+    Args:
+        old_filename (str): name of the file with old table
+
+    Return:
+        scores (list): game time, health, date and character name of every score
+    """
+
+    scores = []
+    with open(old_filename) as old_file:
+        for line in old_file.read().splitlines():
+            fields = [field.strip() for field in line.split(' | ')]
+            if len(fields) != 4:
+                continue
+            minutes, seconds = fields[1].split(':')
+            scores.append((int(minutes) * 60 + int(seconds), int(fields[2]), fields[3], fields[0]))
+    return scores
+
+
+def migrate_highscores(old_filename, filename):
+    """Function moves scores from the old table into the log.
 
+    Args:
+        old_filename (str): name of the file with old table
+        filename (str): name of highscores log
+    """
+
+    scores = read_old_highscores(old_filename)
+    with open(filename + '.part', 'w') as highscores_file:
+        highscores_file.writelines(format_score_line(score) for score in scores)
+    os.replace(filename + '.part', filename)
 
-def sort_highscores(highscores):
-    """Function sorts high scores in the list (primary key = time of the game, secondary key = user's health points).
+
+def load_highscores(filename=HIGHSCORES_FILENAME, size=TOP_SIZE, old_filename=OLD_HIGHSCORES_FILENAME):
+    """Function reads highscores log keeping only the best scores, and compacts the log if it grew too long.
 
     Args:
-        highscores (list): list of high scores from .txt file
+        filename (str): name of highscores log
+        size (int): number of the best scores kept
+        old_filename (str): name of the old table, scores from it are moved into the log if there is no log yet
 
     Return:
-        highscores (list): list of high scores after sorting
+        highscores (dict): 'filename', 'size', heap of the best scores ('heap', see push_score),
+            number of scores in the log ('count') and True if the log ends with broken line ('broken')
     """
 
-    highscores = sorted(highscores, key=operator.itemgetter(2), reverse=True)  # sort highscores list (secondary key)
-    highscores = sorted(highscores, key=operator.itemgetter(1))  # sort highscores list (primary key)
-    if len(highscores) > 10:
-        highscores = highscores[:10]
+    if not os.path.exists(filename) and old_filename and os.path.exists(old_filename):
+        migrate_highscores(old_filename, filename)
+    highscores = {'filename': filename, 'size': size, 'heap': [], 'count': 0, 'broken': False}
+    if os.path.exists(filename):
+        with open(filename) as highscores_file:
+            line = ''
+            for line in highscores_file:
+                score = parse_score(line)
+                if score is not None:
+                    push_score(highscores, score)
+            highscores['broken'] = bool(line) and not line.endswith('\n')   # next score must start in new line
+    if highscores['count'] > size + COMPACT_LIMIT:
+        compact_highscores(highscores)
     return highscores
 
 
-def export_highscores(highscores, health, your_time, character_name, filename='highscores.txt'):
-    """Function exports highscores list to the .txt file after modification.
+def compact_highscores(highscores):
+    """Function rewrites highscores log with the best scores only, so reading it stays fast
+        however many games were won.
+
+    Args:
+        highscores (dict): highscores store (see load_highscores)
+    """
+
+    filename = highscores['filename']
+    scores = best_scores(highscores)
+    with open(filename + '.part', 'w') as highscores_file:
+        highscores_file.writelines(format_score_line(score) for score in scores)
+    os.replace(filename + '.part', filename)
+    highscores['heap'] = []
+    highscores['count'] = 0
+    for score in scores:    # scores are pushed in the order of the new log
+        push_score(highscores, score)
+
+
+def best_scores(highscores):
+    """Function returns the best scores, the best first (primary key = time of the game,
+        secondary key = user's health points, then the earlier added).
 
     Args:
-        highscores (list): list of high scores after adding new score and sorting
+        highscores (dict): highscores store (see load_highscores)
+
+    Return:
+        scores (list): game time, health, date and character name of the best scores
+    """
+
+    return [entry[3] for entry in sorted(highscores['heap'], reverse=True)]
+
+
+def add_score(highscores, health, your_time, character_name, date=None):
+    """Function appends new score to the log and to the best scores.
+
+    Args:
+        highscores (dict): highscores store (see load_highscores)
         health (int): player's health points
         your_time (int): whole game time in seconds
-        filename (str): name of the file with high scores
+        character_name (str): name of the character
+        date (str): date of the game (today if not given)
+    """
+
+    score = (your_time, health, date or str(datetime.date.today()), character_name)
+    with open(highscores['filename'], 'a') as highscores_file:
+        highscores_file.write('\n' * highscores['broken'] + format_score_line(score))
+    highscores['broken'] = False
+    push_score(highscores, score)
+    if highscores['count'] > highscores['size'] + COMPACT_LIMIT:
+        compact_highscores(highscores)
+
+
+def format_highscores(scores):
+    """Function turns the best scores into highscores table.
+
+    Args:
+        scores (list): the best scores (see best_scores)
 
     Return:
-        highscores (list): list of high scores
+        table (str): lines of the table
     """
 
-    highscores = add_to_highscores(highscores, health, your_time, character_name)
-    highscores = sort_highscores(highscores)
-    with open(filename, 'w') as highscores_file:  # save modified high scores into the file
-        for item in highscores:
-            highscores_file.write(' | '.join(item) + '\n')
-    return highscores
+    head_row = 'name' + ' '*9 + 'time' + ' '*4 + 'health' + ' '*3 + 'date' + ' '*6
+    lines = ['High scores', '-' * len(head_row), head_row, '-' * len(head_row)]
+    for your_time, health, date, character_name in scores:
+        lines.append('{:10s} | {:3d}:{:02d} | {:5d} | {}'.format(
+            character_name, your_time // 60, your_time % 60, health, date))
+    return '\n'.join(lines)
 
 
-def print_highscores(highscores):
+def print_highscores(scores):
     """Function prints highscores table.
 
     Args:
-        highscores (list): list of high scores
+        scores (list): the best scores (see best_scores)
     """
     os.system('clear')
-    print('\nHigh scores')
-    head_row = 'name' + ' '*9 + 'time' + ' '*4 + 'health' + ' '*3 + 'date' + ' '*6
-    print('-' * len(head_row))
-    print(head_row)
-    print('-' * len(head_row))
-    for item in highscores:
-        print(' | '.join(item))
+    print('\n' + format_highscores(scores))
+
+
+def open_database(filename, log_filename=HIGHSCORES_FILENAME, old_filename=OLD_HIGHSCORES_FILENAME):
+    """Function opens SQLite database of highscores, creating it if needed. The database is shared by many
+        game processes: WAL mode lets them read while one of them writes, and writes wait for each other
+        instead of failing. Scores from highscores log are moved into a new database.
+
+    Args:
+        filename (str): name of the database file
+        log_filename (str): name of highscores log moved into a new database
+        old_filename (str): name of the old table moved into a new database if there is no log
+
+    Return:
+        connection (sqlite3.Connection): connection in autocommit mode, so every score is written at once
+    """
+
+    if sqlite3 is None:
+        raise RuntimeError('SQLite is not available, highscores database cannot be used')
+    connection = sqlite3.connect(filename, timeout=BUSY_TIMEOUT / 1000, isolation_level=None)
+    connection.execute('PRAGMA busy_timeout = {}'.format(BUSY_TIMEOUT))
+    connection.execute('PRAGMA journal_mode = WAL')
+    connection.execute('PRAGMA synchronous = NORMAL')   # safe in WAL mode, only the latest scores can be lost
+    connection.execute('BEGIN IMMEDIATE')   # other processes wait until the tables are created
+    try:
+        new = connection.execute("SELECT count(*) FROM sqlite_master WHERE name = 'scores'").fetchone()[0] == 0
+        connection.execute('CREATE TABLE IF NOT EXISTS scores (id INTEGER PRIMARY KEY, name TEXT NOT NULL, '
+                           'time INTEGER NOT NULL, health INTEGER NOT NULL, date TEXT NOT NULL)')
+        connection.execute('CREATE INDEX IF NOT EXISTS scores_rank ON scores (time, health DESC, id)')
+        connection.execute('CREATE INDEX IF NOT EXISTS scores_player ON scores (name, time, health DESC, id)')
+        connection.execute('CREATE INDEX IF NOT EXISTS scores_date ON scores (date)')
+        scores = []
+        if new and os.path.exists(log_filename):
+            with open(log_filename) as highscores_file:
+                scores = [score for score in map(parse_score, highscores_file) if score is not None]
+        elif new and old_filename and os.path.exists(old_filename):
+            scores = read_old_highscores(old_filename)
+        connection.executemany('INSERT INTO scores (time, health, date, name) VALUES (?, ?, ?, ?)', scores)
+        connection.execute('COMMIT')
+    except BaseException:
+        connection.execute('ROLLBACK')
+        connection.close()
+        raise
+    return connection
+
+
+def add_score_to_database(connection, health, your_time, character_name, date=None):
+    """Function saves new score in highscores database.
+
+    Args:
+        connection (sqlite3.Connection): highscores database (see open_database)
+        health (int): player's health points
+        your_time (int): whole game time in seconds
+        character_name (str): name of the character
+        date (str): date of the game (today if not given)
+    """
+
+    connection.execute('INSERT INTO scores (time, health, date, name) VALUES (?, ?, ?, ?)',
+                       (your_time, health, date or str(datetime.date.today()), character_name))
+
+
+def best_database_scores(connection, size=TOP_SIZE, character_name=None, first_date=None, last_date=None):
+    """Function returns the best scores from highscores database, ordered like best_scores.
+
+    Args:
+        connection (sqlite3.Connection): highscores database (see open_database)
+        size (int): number of scores
+        character_name (str): only scores of this character are returned if given
+        first_date (str): only scores from this date ('YYYY-MM-DD') on are returned if given
+        last_date (str): only scores till this date (included) are returned if given
+
+    Return:
+        scores (list): game time, health, date and character name of the best scores
+    """
+
+    conditions = []
+    parameters = []
+    if character_name is not None:
+        conditions.append('name = ?')
+        parameters.append(character_name)
+    if first_date is not None:
+        conditions.append('date >= ?')
+        parameters.append(first_date)
+    if last_date is not None:
+        conditions.append('date <= ?')
+        parameters.append(last_date)
+    where = 'WHERE ' + ' AND '.join(conditions) if conditions else ''
+    return connection.execute('SELECT time, health, date, name FROM scores {} ORDER BY time, health DESC, id '
+                              'LIMIT ?'.format(where), parameters + [size]).fetchall()
+
+
+def player_best_score(connection, character_name):
+    """Function returns the best score of the character.
+
+    Args:
+        connection (sqlite3.Connection): highscores database (see open_database)
+        character_name (str): name of the character
+
+    Return:
+        score (tuple): game time, health, date and character name, None if the character has not won yet
+    """
+
+    scores = best_database_scores(connection, 1, character_name)
+    return scores[0] if scores else None
+
+
+def update_highscores(game_won, health, your_time, character_name, database=None):
+    """Function saves score of the won game and returns the best scores, without any output
+        (it can be called in a worker thread, see game_server).
+
+    Args:
+        game_won (bool): True if player managed to finish the game, False otherwise
+        health (int): player's health points
+        your_time (int): whole game time in seconds
+        character_name (str): name of the character
+        database (str): name of SQLite database used instead of highscores log
+            (taken from SQUIRREL_HIGHSCORES_DB environment variable if not given)
+
+    Return:
+        scores (list): game time, health, date and character name of the best scores
+    """
+    database = database or os.environ.get(DATABASE_VARIABLE)
+    if database:
+        connection = open_database(database)
+        try:
+            if game_won:
+                add_score_to_database(connection, health, your_time, character_name)
+            return best_database_scores(connection)
+        finally:
+            connection.close()
+    highscores = load_highscores()
+    if game_won:
+        add_score(highscores, health, your_time, character_name)
+    return best_scores(highscores)
 
 
-def manage_highscores(game_won, health, your_time, character_name):
+def manage_highscores(game_won, health, your_time, character_name, database=None):
     """Function calls other high scores functions depending on the user's win or loss.
 
     Args:
         game_won (bool): True if player managed to finish the game, False otherwise
         health (int): player's health points
         your_time (int): whole game time in seconds
+        database (str): name of SQLite database used instead of highscores log
+            (taken from SQUIRREL_HIGHSCORES_DB environment variable if not given)
     """
-    if not game_won:
-        highscores = import_highscores()
-        print_highscores(highscores)
-    else:
-        highscores = import_highscores()
-        highscores = export_highscores(highscores, health, your_time, character_name)
-        print_highscores(highscores)
+    print_highscores(update_highscores(game_won, health, your_time, character_name, database))
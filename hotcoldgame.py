@@ -5,16 +5,32 @@ COLD = '\033[34m'
 WARM = '\033[33m'
 HOT = '\033[31m'
 ENDC = '\033[37m'
+GUESSES = 10
+INVALID_GUESS = 'Try again! You should provide only 3-digit number!'
+INSTRUCTION = '''
+    I am thinking of a 3-digit number. Try to guess what it is.
+
+    Here are some clues:
+
+    When I say:    That means:
+
+      Cold       No digit is correct.
+      Warm       One digit is correct but in the wrong position.
+      Hot        One digit is correct and in the right position.
+
+    I have thought up a number. You have 10 guesses to get it.
+    '''
 
 
 def hint(number, guess):
-    """Function checks if user's guess is correct and print the appropriate hint.
+    """Function checks if user's guess is correct and gives the appropriate hint.
 
     Args:
         number (int): number to be guessed
         guess (int): user's guess
     Return:
         hot (int): amount of guessed digits (correct digit on the correct position)
+        clues (str): hint for the user
     """
 
     number = str(number)
@@ -29,12 +45,25 @@ def hint(number, guess):
             warm += 1
     if hot + warm == 0:
         cold = 1
-    print((HOT + 'hot ') * hot +
-          (WARM + 'warm ') * warm +
-          (COLD + 'cold ') * cold +
-          ENDC
-          )
-    return hot
+    clues = ((HOT + 'hot ') * hot +
+             (WARM + 'warm ') * warm +
+             (COLD + 'cold ') * cold +
+             ENDC
+             )
+    return hot, clues
+
+
+def valid_guess(guess):
+    """Function checks if user's guess is a 3-digit number.
+
+    Args:
+        guess (str): text typed by user
+
+    Return:
+        valid (bool): True if the guess can be checked
+    """
+
+    return len(guess) == 3 and guess.isdigit()
 
 
 def input_guess():
@@ -45,23 +74,26 @@ def input_guess():
     """
 
     guess = ''
-    while len(guess) != 3 or not guess.isdigit():
+    while not valid_guess(guess):
         guess = input()
-        if not guess.isdigit() or len(guess) != 3:
-            print('Try again! You should provide only 3-digit number!')
+        if not valid_guess(guess):
+            print(INVALID_GUESS)
     return guess
 
 
-def generate_number():
+def generate_number(rng=random):
     """Function generates 3-digit number to be guessed.
 
+    Args:
+        rng (random.Random): random numbers generator
+
     Return:
         number (int): number to be guessed
     """
 
     number = []
     while len(number) < 3:
-        digit = str(random.randint(0, 9))
+        digit = str(rng.randint(0, 9))
         if digit not in number:
             number.append(digit)
     number = ''.join(number)
@@ -71,19 +103,7 @@ def generate_number():
 def initial_print():
     """Function prints the game instruction."""
 
-    print(ENDC + '''
-    I am thinking of a 3-digit number. Try to guess what it is.
-
-    Here are some clues:
-
-    When I say:    That means:
-
-      Cold       No digit is correct.
-      Warm       One digit is correct but in the wrong position.
-      Hot        One digit is correct and in the right position.
-
-    I have thought up a number. You have 10 guesses to get it.
-    ''')
+    print(ENDC + INSTRUCTION)
 
 
 def guessing_loop(hot_amount, turn, number):
@@ -97,28 +117,33 @@ def guessing_loop(hot_amount, turn, number):
         hot_amount (int): amount of guessed digits (correct digit on the correct position)
     """
 
-    while hot_amount != 3 and turn <= 10:
+    while hot_amount != 3 and turn <= GUESSES:
         print('Guess #', turn)
         guess = input_guess()
-        hot_amount = hint(number, guess)
+        hot_amount, clues = hint(number, guess)
+        print(clues)
         turn += 1
     return hot_amount
 
 
-def final_print(hot_amount):
-    """Function prints the result of the game.
+def final_result(hot_amount):
+    """Function gives the result of the game.
 
     Args:
         hot_amount (int): amount of guessed digits (correct digit on the correct position)
+
+    Return:
+        win (bool): True if the number was guessed
+        message (str): result for the user
     """
 
     win = False
     if hot_amount == 3:
-        print('You got it!')
+        message = 'You got it!'
         win = True
     else:
-        print('You lost!')
-    return win
+        message = 'You lost!'
+    return win, message
 
 
 def main():
@@ -129,7 +154,8 @@ def main():
     number = generate_number()
     print(number)
     hot_amount = guessing_loop(hot_amount, turn, number)
-    win = final_print(hot_amount)
+    win, message = final_result(hot_amount)
+    print(message)
     return win
 
 
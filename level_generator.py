@@ -0,0 +1,257 @@
+import os
+import re
+import sys
+import time
+import random
+import argparse
+from tiles import *
+from controls import exit_area, LEVEL_EXIT_MINIGAMES
+from environment import parse_level, create_free_cells, insert_food, insert_minions, LEVEL_FOOD, LEVEL_MINIONS
+
+# side panel next to the map, the same as in hand-drawn levels (labels are drawn over the placeholders)
+PANEL_LINES = [
+    ' Level: Ỻ', ' Player: Ṅ', ' Health: Ĥ', ' Time: T', '', ' Inventory:', ' .', ' Total treasures :  ', '', '',
+    ' Legend:', ' ● : nut', ' ⚛ : bag full of nuts', ' ✡ : first aid', ' ✿ : rotten food', ' X : common obstacle',
+    ' # : thorny bush', ' ᴥ : evil minion', ' ⇵ : passage to the next level', ' Treasures:', ' ☯ : legendary cookie',
+    ' ☂ : ancient umbrella', ' ♫ : magic note', '', ' Controls:', ' w : up', ' s : down', ' a : left', ' d : right',
+    ' \\ : exit', ' i : info screen']
+LEVEL_GOALS = {
+    1: 'Goal: Collect 60 nuts to open the passage to the next level.',
+    2: 'Goal: Collect 60 nuts and light all 6 magic lamps ☀ to open the passage to the next level.',
+    3: 'Goal: Collect 60 nuts and 4 key shards ℥ to open the passage to the next level.'}
+NUTS_NEEDED = 60    # nuts needed to open the exit (see controls.enable_level_exit)
+LAMPS_NEEDED = 6
+KEY_SHARDS_NEEDED = 4
+
+
+def generate_map(rng, width, height, obstacles=0.03, bushes=0.02):
+    """Function draws random map: walls ('X') and thorny bushes ('#') inside the border,
+        the exit in the bottom right corner surrounded with bushes.
+
+    Args:
+        rng (random.Random): random numbers generator
+        width (int): number of map columns
+        height (int): number of map lines
+        obstacles (float): number of walls per map cell
+        bushes (float): number of bushes groups per map cell
+
+    Return:
+        map_lines (list): lines of the map
+    """
+
+    cells = [['X'] * width] + [['X'] + [' '] * (width - 2) + ['X'] for line in range(height - 2)] + [['X'] * width]
+    inside = (width - 2) * (height - 2)
+    for i in range(int(inside * obstacles)):    # straight walls of random length
+        x, y = rng.randrange(1, width - 1), rng.randrange(1, height - 1)
+        x_move, y_move = rng.choice([(1, 0), (0, 1)])
+        for step in range(rng.randrange(2, 9)):
+            if 0 < x < width - 1 and 0 < y < height - 1:
+                cells[y][x] = 'X'
+            x, y = x + x_move, y + y_move
+    for i in range(int(inside * bushes)):   # small groups of bushes
+        x, y = rng.randrange(1, width - 1), rng.randrange(1, height - 1)
+        for step in range(rng.randrange(1, 4)):
+            if 0 < x < width - 1 and 0 < y < height - 1:
+                cells[y][x] = '#'
+            x, y = x + rng.choice([-1, 0, 1]), y + rng.choice([-1, 0, 1])
+
+    for y in range(1, 4):   # squirrel starts in the top left corner
+        for x in range(1, 4):
+            cells[y][x] = ' '
+    for y in range(height - 5, height - 1):     # exit is surrounded with bushes removed by enable_level_exit
+        for x in range(width - 6, width - 1):
+            cells[y][x] = ' '
+    cells[height - 3][width - 4:width - 1] = ['#', '#', '#']
+    cells[height - 2][width - 4:width - 1] = ['#', '⇵', ' ']
+    return [''.join(line) for line in cells]
+
+
+def fill_unreachable(map_lines):
+    """Function fills empty places which cannot be reached from the start with walls,
+        so items are never placed where the squirrel cannot get them.
+
+    Args:
+        map_lines (list): lines of the map
+
+    Return:
+        map_lines (list): lines of the map
+    """
+
+    board = board_from_lines(map_lines, ITEM_COLORS)
+    width = board['width']
+    exit_lines, exit_columnes = exit_area(board)
+    reached = reachable_cells(board, [line * width + column for line in exit_lines for column in exit_columnes])
+    return [''.join('X' if char == ' ' and not reached[line_nr * width + column] else char
+                    for column, char in enumerate(line)) for line_nr, line in enumerate(map_lines)]
+
+
+def generate_level(seed, width=120, height=40, level=1, attempts=100):
+    """Function generates level file content from the seed, drawing maps until one passes validate_level.
+
+    Args:
+        seed (int): seed of random numbers generator, the same seed gives the same level
+        width (int): number of map columns
+        height (int): number of map lines
+        level (int): game level (1-3) the map is made for, it decides about the goal
+        attempts (int): number of maps drawn before giving up (maps with exit cut off are drawn again)
+
+    Return:
+        level_content (list): lines of level file (without new line characters)
+    """
+
+    if level not in LEVEL_EXIT_MINIGAMES:
+        raise ValueError('Only levels with an exit ({}) can be generated'.format(sorted(LEVEL_EXIT_MINIGAMES)))
+    if width < 12 or height < 10:
+        raise ValueError('Map must have at least 12 columns and 10 lines')
+    rng = random.Random(seed)
+    for attempt in range(attempts):
+        map_lines = fill_unreachable(generate_map(rng, width, height))
+        level_content = [map_line + (PANEL_LINES[line_nr] if line_nr < len(PANEL_LINES) else '')
+                         for line_nr, map_line in enumerate(map_lines)]
+        level_content += ['Story plot:', 'You are in a part of the forest nobody has seen before.', '',
+                          LEVEL_GOALS[level], '']
+        if not validate_level(parse_level(level_content), level):
+            return level_content
+    raise ValueError('No valid level found for seed {} in {} attempts'.format(seed, attempts))
+
+
+def reachable_cells(board, opened=()):
+    """Function finds places the squirrel can reach from the start (1, 1) using flood fill.
+
+    Args:
+        board (dict): tile board
+        opened (iterable): positions (line * board width + column) of tiles treated as passable,
+            e.g. barriers removed later by enable_level_exit
+
+    Return:
+        reached (bytearray): 1 for reachable positions, 0 for others
+    """
+
+    width = board['width']
+    passable = bytes([tile_flags[tile] & PASSABLE for tile in range(len(tile_flags))]).ljust(256, b'\x00')
+    free = bytearray(bytes(board['tiles']).translate(passable))     # 1 - passable and not reached yet
+    for position in opened:
+        free[position] = 1
+    reached = bytearray(len(free))
+    start = width + 1
+    if not free[start]:
+        return reached
+    free[start] = 0
+    reached[start] = 1
+    stack = [start]
+    while stack:
+        position = stack.pop()
+        for neighbour in (position - 1, position + 1, position - width, position + width):
+            if free[neighbour]:
+                free[neighbour] = 0
+                reached[neighbour] = 1
+                stack.append(neighbour)
+    return reached
+
+
+def validate_level(board, level, placed=False):
+    """Function checks if the level can be finished.
+        Barriers around the exit are treated as removed, because enable_level_exit removes them.
+        Items and minions never block the way (they are passable), apart from magic lamps.
+
+    Args:
+        board (dict): tile board
+        level (int): game level the board is used on
+        placed (bool): True if items were already placed (then reachable items are counted too)
+
+    Return:
+        problems (list): descriptions of problems found, empty if the level is valid
+    """
+
+    if level not in LEVEL_FOOD:
+        return ['there are no rules for level {}'.format(level)]
+    problems = []
+    width = board['width']
+    tiles = board['tiles']
+    exit_lines, exit_columnes = exit_area(board)
+    opened = [line * width + column for line in exit_lines for column in exit_columnes
+              if tiles[line * width + column] == BARRIER]
+    reached = reachable_cells(board, opened)
+    exits = [position for position in range(len(tiles)) if tiles[position] == EXIT]
+    if not reached[width + 1]:
+        problems.append('start (1, 1) is blocked')
+    if level in LEVEL_EXIT_MINIGAMES:
+        if not exits:
+            problems.append('there is no exit')
+        elif not any(reached[position] for position in exits):
+            problems.append('exit cannot be reached')
+
+    if not placed:
+        free_cells = create_free_cells(board)
+        needed = sum(LEVEL_FOOD[level].values()) + sum(LEVEL_MINIONS.get(level, {}).values())
+        reachable_free = sum(reached[position] for position in free_cells)
+        if reachable_free < needed:
+            problems.append('only {} reachable free places for {} items'.format(reachable_free, needed))
+        return problems
+
+    nuts = sum({NUT: 1, NUTS_BAG: 20}.get(tiles[position], 0) for position in range(len(tiles)) if reached[position])
+    if level in LEVEL_EXIT_MINIGAMES and nuts < NUTS_NEEDED:
+        problems.append('only {} nuts can be collected'.format(nuts))
+    if level == 3:
+        shards = sum(1 for position in range(len(tiles)) if tiles[position] == KEY_SHARD and reached[position])
+        if shards < KEY_SHARDS_NEEDED:
+            problems.append('only {} key shards can be collected'.format(shards))
+    if level == 2:  # lamps are lit from a neighbouring place
+        lamps = sum(1 for position in range(width, len(tiles) - width) if tiles[position] in (LAMP_OFF, LAMP_ON) and
+                    any(reached[position + move] for move in (-1, 1, -width, width)))
+        if lamps < LAMPS_NEEDED:
+            problems.append('only {} magic lamps can be lit'.format(lamps))
+    return problems
+
+
+def main(arguments=None):
+    """Function generates and validates batch of levels, saving the valid ones if output directory is given."""
+
+    parser = argparse.ArgumentParser(description='Generate and validate random levels.')
+    parser.add_argument('--count', type=int, default=1, help='number of generated levels')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first level, next ones get next seeds')
+    parser.add_argument('--width', type=int, default=120)
+    parser.add_argument('--height', type=int, default=40)
+    parser.add_argument('--level', type=int, default=1, help='game level (1-3) the levels are made for '
+                        '(checked files named levelN... are checked for level N)')
+    parser.add_argument('--output', help='directory for level files (levels are not saved if not given)')
+    parser.add_argument('--check', nargs='*', default=[], help='level files to validate instead of generating')
+    arguments = parser.parse_args(arguments)
+
+    start = time.perf_counter()
+    invalid = 0
+    for filename in arguments.check:
+        with open(filename, encoding='utf-8') as level_file:
+            board = parse_level(level_file.read().split('\n'))
+        name_match = re.match(r'level(\d+)', os.path.basename(filename))   # e.g. level1.txt or level1_5.txt
+        level = int(name_match.group(1)) if name_match else arguments.level
+        problems = validate_level(board, level)
+        invalid += bool(problems)
+        print('{}: {}'.format(filename, '; '.join(problems) or 'ok'))
+    if arguments.check:
+        return 1 if invalid else 0
+
+    for seed in range(arguments.seed, arguments.seed + arguments.count):
+        level_content = generate_level(seed, arguments.width, arguments.height, arguments.level)
+        board = parse_level(level_content)      # items are placed like in the game and checked again
+        rng = random.Random(seed)
+        free_cells = create_free_cells(board)
+        insert_food(board, arguments.level, free_cells, rng)
+        insert_minions(board, arguments.level, free_cells, rng)
+        problems = validate_level(board, arguments.level, placed=True)
+        if problems:
+            invalid += 1
+            print('seed {}: {}'.format(seed, '; '.join(problems)))
+        elif arguments.output:     # levels which fail validation are never saved
+            os.makedirs(arguments.output, exist_ok=True)
+            with open(os.path.join(arguments.output, 'level{}_{}.txt'.format(arguments.level, seed)), 'w',
+                      encoding='utf-8') as level_file:
+                level_file.write('\n'.join(level_content))
+    elapsed = time.perf_counter() - start
+    print('{} levels generated in {:.2f} s ({:.2f} ms per level), {} invalid after placing items'.format(
+        arguments.count, elapsed, elapsed * 1000 / max(arguments.count, 1), invalid))
+    return 1 if invalid else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
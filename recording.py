@@ -0,0 +1,301 @@
+import sys
+import time
+import hashlib
+import argparse
+from tiles import *
+from engine import new_game, handle_buttons, finish_minigame, close_game
+
+RECORDING_MAGIC = b'SQREC1'
+KEYS_RECORD = 1     # buttons handled in one tick
+MINIGAME_RECORD = 2     # result of the minigame started in the previous tick
+END_RECORD = 3  # game time and digest of the final state
+
+
+def write_number(data, number):
+    """Function appends non-negative integer to the data using as few bytes as possible
+        (7 bits per byte, the highest bit means that more bytes follow).
+
+    Args:
+        data (bytearray): encoded data
+        number (int): non-negative integer
+    """
+
+    while number >= 0x80:
+        data.append(number & 0x7f | 0x80)
+        number >>= 7
+    data.append(number)
+
+
+def read_number(data, position):
+    """Function reads integer written by write_number.
+
+    Args:
+        data (bytes): encoded data
+        position (int): position of the first byte of the number
+
+    Return:
+        number (int): decoded integer
+        position (int): position after the number
+    """
+
+    number = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        number |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return number, position
+        shift += 7
+
+
+def write_text(data, text):
+    """Function appends text (UTF-8, preceded by its length) to the data.
+
+    Args:
+        data (bytearray): encoded data
+        text (str): text
+    """
+
+    encoded = text.encode('utf-8')
+    write_number(data, len(encoded))
+    data += encoded
+
+
+def read_text(data, position):
+    """Function reads text written by write_text.
+
+    Args:
+        data (bytes): encoded data
+        position (int): position of the text length
+
+    Return:
+        text (str): decoded text
+        position (int): position after the text
+    """
+
+    length, position = read_number(data, position)
+    return data[position:position + length].decode('utf-8'), position + length
+
+
+def state_digest(state):
+    """Function computes fingerprint of the game state, used to check that a replay ended like the recorded game.
+        Tiles are compared by their look, because tile ids depend on the order the tiles were registered in.
+
+    Args:
+        state (dict): game state
+
+    Return:
+        digest (bytes): 16 bytes of MD5 digest
+    """
+
+    digest = hashlib.md5(repr((
+        state['level'], state['health'], state['x_player'], state['y_player'], sorted(state['inventory'].items()),
+        state['hamster_energy'], state['lamps_lit'], state['ticks'], state['game_won'], state['game_over'])).encode())
+    board = state['board']
+    if board != []:
+        texts = {tile: text for tile, text in enumerate(tile_texts)}
+        tiles = board['tiles']
+        for start in range(0, len(tiles), 1 << 16):
+            digest.update(bytes(tiles[start:start + (1 << 16)]).decode('latin-1').translate(texts).encode())
+    return digest.digest()
+
+
+def create_recorder(filename, seed, character_name='', chase=False, minion_period=1):
+    """Function starts recording of the game: options given to engine.new_game, then buttons of every tick
+        and results of minigames. Nothing else is needed to repeat the game, because all random numbers
+        of the game come from the seeded generator of the game state.
+
+    Args:
+        filename (str): name of the recording file
+        seed (int): seed of random numbers generator given to new_game
+        character_name (str): name of the character
+        chase (bool): chase option given to new_game
+        minion_period (int): minion_period option given to new_game
+
+    Return:
+        recorder (dict): open recording file ('file'), encoded records waiting to be written ('data'),
+            number of ticks without buttons since the last record ('idle') and 'start' time
+    """
+
+    data = bytearray(RECORDING_MAGIC)
+    write_number(data, seed)
+    write_text(data, character_name)
+    data.append(int(chase))
+    write_number(data, minion_period)
+    return {'file': open(filename, 'wb'), 'data': data, 'idle': 0, 'start': time.monotonic(), 'last_time': 0}
+
+
+def write_keys_record(recorder, buttons_pressed):
+    """Function appends record of buttons handled in one tick with time (in ms) since the previous record.
+
+    Args:
+        recorder (dict): game recorder (see create_recorder)
+        buttons_pressed (list): buttons handled in the tick
+    """
+
+    data = recorder['data']
+    now = int((time.monotonic() - recorder['start']) * 1000)
+    write_number(data, recorder['idle'])
+    data.append(KEYS_RECORD)
+    write_number(data, now - recorder['last_time'])
+    write_text(data, ''.join(buttons_pressed))
+    recorder['idle'] = 0
+    recorder['last_time'] = now
+    if len(data) > 4096:
+        recorder['file'].write(data)
+        data.clear()
+
+
+def record_tick(recorder, buttons_pressed):
+    """Function records buttons handled in one tick (see engine.handle_buttons).
+        Ticks without buttons are only counted, so idle time costs almost no space.
+
+    Args:
+        recorder (dict): game recorder (see create_recorder) or None if the game is not recorded
+        buttons_pressed (list): buttons handled in the tick
+    """
+
+    if recorder is None:
+        return
+    if buttons_pressed:
+        write_keys_record(recorder, buttons_pressed)
+    else:
+        recorder['idle'] += 1
+
+
+def record_minigame(recorder, won):
+    """Function records result of the minigame started in the last recorded tick.
+
+    Args:
+        recorder (dict): game recorder (see create_recorder) or None if the game is not recorded
+        won (bool): True if user won the minigame
+    """
+
+    if recorder is None:
+        return
+    if recorder['idle']:    # the minigame was started in a tick without buttons, which must be written first
+        recorder['idle'] -= 1
+        write_keys_record(recorder, [])
+    write_number(recorder['data'], 0)
+    recorder['data'] += bytes([MINIGAME_RECORD, int(bool(won))])
+
+
+def finish_recording(recorder, state):
+    """Function writes the end of the recording and closes the file.
+
+    Args:
+        recorder (dict): game recorder (see create_recorder) or None if the game is not recorded
+        state (dict): final game state
+    """
+
+    if recorder is None:
+        return
+    data = recorder['data']
+    write_number(data, recorder['idle'])
+    data.append(END_RECORD)
+    write_number(data, state['time'])
+    data += state_digest(state)
+    recorder['file'].write(data)
+    recorder['file'].close()
+
+
+def read_recording(filename):
+    """Function reads recording file.
+
+    Args:
+        filename (str): name of the recording file
+
+    Return:
+        options (dict): 'seed', 'character_name', 'chase' and 'minion_period' of the recorded game
+        records (list): (idle ticks before the record, record kind, value) where value is (time in ms since
+            the start, list of buttons) (KEYS_RECORD), minigame result (MINIGAME_RECORD)
+            or (game time in seconds, state digest) (END_RECORD)
+    """
+
+    with open(filename, 'rb') as recording_file:
+        data = recording_file.read()
+    if not data.startswith(RECORDING_MAGIC):
+        raise ValueError('{} is not a game recording'.format(filename))
+    options = {}
+    position = len(RECORDING_MAGIC)
+    options['seed'], position = read_number(data, position)
+    options['character_name'], position = read_text(data, position)
+    options['chase'] = bool(data[position])
+    options['minion_period'], position = read_number(data, position + 1)
+    records = []
+    game_time = 0
+    while position < len(data):
+        idle, position = read_number(data, position)
+        kind = data[position]
+        position += 1
+        if kind == KEYS_RECORD:
+            time_delta, position = read_number(data, position)
+            buttons, position = read_text(data, position)
+            game_time += time_delta
+            records.append((idle, kind, (game_time, list(buttons))))
+        elif kind == MINIGAME_RECORD:
+            records.append((idle, kind, bool(data[position])))
+            position += 1
+        elif kind == END_RECORD:
+            seconds, position = read_number(data, position)
+            records.append((idle, kind, (seconds, data[position:position + 16])))
+            position += 16
+        else:
+            raise ValueError('Unknown record {} in {}'.format(kind, filename))
+    return options, records
+
+
+def replay(filename):
+    """Function repeats recorded game without any output, as fast as possible.
+        Level files must be the same as when the game was recorded.
+
+    Args:
+        filename (str): name of the recording file
+
+    Return:
+        state (dict): final game state (its board is already closed, see engine.close_game)
+        matches (bool): True if the final state is the same as in the recorded game
+            (None if the recording has no end, e.g. the game crashed)
+    """
+
+    options, records = read_recording(filename)
+    state, events = new_game(options['character_name'], options['seed'], options['chase'], options['minion_period'])
+    matches = None
+    for idle, kind, value in records:
+        for tick in range(idle):
+            handle_buttons(state, [])
+        if kind == KEYS_RECORD:
+            handle_buttons(state, value[1])
+        elif kind == MINIGAME_RECORD:
+            finish_minigame(state, value)
+        else:
+            state['time'], digest = value
+            matches = state_digest(state) == digest
+    close_game(state)
+    return state, matches
+
+
+def main(arguments=None):
+    """Function replays recordings given in the command line, checking their final states and measuring speed."""
+
+    parser = argparse.ArgumentParser(description='Replay recorded games without output.')
+    parser.add_argument('recordings', nargs='+', help='recording files (see squirrel_game.py --record)')
+    parser.add_argument('--repeat', type=int, default=1, help='number of replays of every recording')
+    arguments = parser.parse_args(arguments)
+
+    failed = 0
+    for filename in arguments.recordings:
+        start = time.perf_counter()
+        for repeat in range(arguments.repeat):
+            state, matches = replay(filename)
+        elapsed = (time.perf_counter() - start) / arguments.repeat
+        failed += not matches
+        print('{}: {}, {} ticks in {:.3f} s ({:.0f} ticks/s)'.format(
+            filename, {True: 'final state matches', False: 'FINAL STATE DIFFERS', None: 'no end record'}[matches],
+            state['ticks'], elapsed, state['ticks'] / max(elapsed, 1e-9)))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,31 +2,36 @@ import random
 import time
 import os
 
+SHOW_TIME = 5   # seconds the number is shown for
+INSTRUCTION = """
+    *** Remember telephone number!
+    Write it down in the same format (divided into 3-digits blocks)***
+    """
+
 
 def initial_print():
     """Function prints the game instruction."""
 
     os.system('clear')
-    print("""
-    *** Remember telephone number!
-    Write it down in the same format (divided into 3-digits blocks)***
-    """)
+    print(INSTRUCTION)
 
 
-def generate_number():
+def generate_number(rng=random):
     """Function generates 9 random digits.
 
+    Args:
+        rng (random.Random): random numbers generator
+
     Return:
-        number (int): 9-digit number
+        number (str): 9 digits divided into 3-digits blocks
     """
 
     number = []
     for i in range(3):
         for i in range(3):
-            number.append(str(random.randint(0, 9)))
+            number.append(str(rng.randint(0, 9)))
         number.append(' ')
     number = (''.join(number)).strip(' ')
-    print('telephone: ', number)
     return number
 
 
@@ -45,34 +50,35 @@ def check_answer(number, guess):
     """Function checks if the user's answer is correct.
 
     Args:
-        number (int): generated number
-        guess (int): user's guess
+        number (str): generated number
+        guess (str): user's guess
 
     Return:
         won (bool): True if the user's answer is correct, False otherwise
+        message (str): result for the user
     """
 
     win = False
     if guess != number:
-        print('Wrong answer. Try again')
-        time.sleep(2)
+        message = 'Wrong answer. Try again'
     else:
-        print('Well done!')
-        time.sleep(2)
+        message = 'Well done!'
         win = True
-    return win
+    return win, message
 
 
 def main():
-    guess = ''
-    number = '0'
-    while guess != number:
+    win = False
+    while not win:
         initial_print()
         number = generate_number()
-        time.sleep(5)
+        print('telephone: ', number)
+        time.sleep(SHOW_TIME)
         initial_print()
         guess = guessing()
-        win = check_answer(number, guess)
+        win, message = check_answer(number, guess)
+        print(message)
+        time.sleep(2)
     return win
 
 
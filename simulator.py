@@ -0,0 +1,374 @@
+import os
+import json
+import time
+import random
+import argparse
+import multiprocessing
+from collections import Counter, deque
+import environment
+from tiles import *
+from controls import MOVES
+from engine import HAMSTER_MINIGAME, new_game, handle_buttons, finish_minigame, close_game
+
+SIMULATION_RATE = 20    # game ticks per second, like in squirrel_game
+MINION_PERIOD = 7   # game ticks between minions moves (squirrel_game: 20 ticks / 3 moves per second)
+MAX_TICKS = 24000   # games longer than this (20 minutes of game time) are stopped
+REPLAN_STEPS = 8    # seeker policy finds the way again after so many steps
+EXIT_NUTS = 60     # nuts needed to open the exit of levels 1-3 (see controls.enable_level_exit), not fed to friends
+GOOD_ITEMS = {NUT, NUTS_BAG, FIRST_AID, KEY_SHARD, COOKIE, UMBRELLA, MAGIC_NOTE}
+HAMSTER_AREA = (range(100, 118), range(20, 29))     # places starting the fight (see actions.evil_hamster_defeat)
+BATCHES_PER_PROCESS = 4     # games are split into so many batches per worker, so workers finishing early get more
+
+
+def random_policy(state, memory, rng):
+    """Function chooses button like a player running around at random, keeping direction for a while.
+
+    Args:
+        state (dict): game state
+        memory (dict): data the policy keeps between ticks
+        rng (random.Random): random numbers generator of the playthrough
+
+    Return:
+        button (str): pressed button
+    """
+
+    if memory.get('wander_steps', 0) <= 0:
+        memory['wander_button'] = rng.choice('wasd')
+        memory['wander_steps'] = rng.randrange(1, 8)
+    memory['wander_steps'] -= 1
+    return memory['wander_button']
+
+
+def find_way(state, careful=True):
+    """Function finds the shortest way to the nearest target of the seeker policy (breadth-first search):
+        useful items, magic lamps, friends to feed (with nuts to spare), the exit and the evil hamster.
+        Minions and hazards are avoided, a careful search also avoids rotten food and moves which end
+        facing a hazard (they cost health).
+
+    Args:
+        state (dict): game state
+        careful (bool): False if health may be lost on the way
+
+    Return:
+        buttons (list): buttons leading to the target (empty if no target can be reached)
+    """
+
+    board = state['board']
+    width = board['width']
+    tiles = bytes(board['tiles'])
+    walkable = bytearray(256)
+    hazard = bytearray(256)
+    for tile, flags in enumerate(tile_flags):
+        walkable[tile] = flags & PASSABLE and not flags & HAZARD and not (careful and tile == ROTTEN_FOOD)
+        hazard[tile] = careful and flags & HAZARD
+    targets = bytearray(256)
+    wanted = GOOD_ITEMS | {EXIT, LAMP_OFF}
+    if state['inventory']['●'] - 20 >= EXIT_NUTS * (state['level'] < 4):
+        wanted |= set(FRIENDS)
+    for tile in wanted:
+        targets[tile] = 1
+    hamster = state['level'] == 4
+    blocked = {y * width + x for x, y in state['minions']['cells']}
+    moves = [(button, x_move + y_move * width) for button, (x_move, y_move) in MOVES.items()]
+    start = state['y_player'] * width + state['x_player']
+    came_from = bytearray(len(tiles))   # number of the move (from 1) the place was reached with
+    came_from[start] = len(moves) + 1
+    queue = deque([start])
+    while queue:
+        position = queue.popleft()
+        for move_nr, (button, move) in enumerate(moves, 1):
+            neighbour = position + move
+            if came_from[neighbour] or neighbour in blocked:
+                continue
+            tile = tiles[neighbour]
+            if targets[tile] or hamster and walkable[tile] and neighbour % width in HAMSTER_AREA[0] and \
+                    neighbour // width in HAMSTER_AREA[1]:
+                came_from[neighbour] = move_nr
+                buttons = []
+                while neighbour != start:
+                    button, move = moves[came_from[neighbour] - 1]
+                    buttons.append(button)
+                    neighbour -= move
+                return buttons[::-1]
+            if walkable[tile] and not hazard[tiles[neighbour + move]]:
+                came_from[neighbour] = move_nr
+                queue.append(neighbour)
+    return []
+
+
+def safe_button(state, rng):
+    """Function chooses random move which does not bump into a hazard or minion, and if possible
+        does not end facing a hazard either.
+
+    Args:
+        state (dict): game state
+        rng (random.Random): random numbers generator of the playthrough
+
+    Return:
+        button (str): pressed button ('' if every move is dangerous)
+    """
+
+    board = state['board']
+    x, y = state['x_player'], state['y_player']
+    safe = []
+    careful = []
+    for button, (x_move, y_move) in MOVES.items():
+        flags = tile_flags[get_tile(board, x + x_move, y + y_move)]
+        if flags & HAZARD or (x + x_move, y + y_move) in state['minions']['cells']:
+            continue
+        safe.append(button)
+        if not flags & PASSABLE or not tile_flags[get_tile(board, x + 2 * x_move, y + 2 * y_move)] & HAZARD:
+            careful.append(button)
+    buttons = careful or safe
+    return rng.choice(buttons) if buttons else ''
+
+
+def seeker_policy(state, memory, rng):
+    """Function chooses button like a player going straight for useful items, lamps, friends and the exit.
+
+    Args:
+        state (dict): game state
+        memory (dict): data the policy keeps between ticks
+        rng (random.Random): random numbers generator of the playthrough
+
+    Return:
+        button (str): pressed button
+    """
+
+    if (memory.get('level') != state['level'] or memory['steps'] >= REPLAN_STEPS or
+            memory['found'] and not memory['way']):
+        memory['way'] = find_way(state) or find_way(state, careful=False)
+        memory['found'] = bool(memory['way'])    # without a target the player wanders until the next search
+        memory['steps'] = 0
+        memory['level'] = state['level']
+    memory['steps'] += 1
+    if memory['way']:
+        return memory['way'].pop(0)
+    return safe_button(state, rng)
+
+
+POLICIES = {'random': random_policy, 'seeker': seeker_policy}
+
+
+def apply_overrides(options):
+    """Function changes game balance in this process before games are simulated.
+
+    Args:
+        options (dict): simulation options, 'food' ({item: amount} for every level)
+            and 'minions' (amount on levels with minions) are used if given
+    """
+
+    for item, amount in (options.get('food') or {}).items():
+        for food in environment.LEVEL_FOOD.values():
+            food[item] = amount
+    if options.get('minions') is not None:
+        for minions in environment.LEVEL_MINIONS.values():
+            minions['ᴥ'] = options['minions']
+
+
+def simulate_game(seed, options):
+    """Function plays one game without output, choosing buttons with the policy.
+
+    Args:
+        seed (int): seed of the game (the policy and minigames get their own generator from it)
+        options (dict): 'policy', 'max_ticks', 'minigame_win' (chance of winning the fight
+            with the evil hamster, exit minigames are repeated until won like in the game), 'chase',
+            'minion_period' and optional 'health' and 'hamster_energy' at the start
+
+    Return:
+        result (dict): 'outcome' ('won', 'died' or 'timeout'), reached 'level', 'ticks', final 'health',
+            'cause' of death, ticks spent on finished levels ('level_ticks'), 'damage' by cause, 'minigames'
+    """
+
+    state, events = new_game('simulator', seed, options['chase'], options['minion_period'])
+    if options.get('health') is not None:
+        state['health'] = options['health']
+    if options.get('hamster_energy') is not None:
+        state['hamster_energy'] = options['hamster_energy']
+    rng = random.Random(seed * 2 + 1)
+    policy = POLICIES[options['policy']]
+    memory = {}
+    damage = Counter()
+    level_ticks = {}
+    level_start = 0
+    minigames = 0
+    cause = None
+    while not state['game_over'] and state['ticks'] < options['max_ticks']:
+        level = state['level']
+        events = handle_buttons(state, [policy(state, memory, rng)])
+        for name, value in events:
+            if name == 'damage':
+                damage[value] += 1
+                cause = value
+            elif name == 'minigame':
+                minigames += 1
+                events += finish_minigame(state, value != HAMSTER_MINIGAME or rng.random() < options['minigame_win'])
+        if state['level'] != level:
+            level_ticks[level] = state['ticks'] - level_start
+            level_start = state['ticks']
+    close_game(state)
+    if state['game_won']:
+        outcome = 'won'
+    elif state['game_over']:
+        outcome = 'died'
+    else:
+        outcome = 'timeout'
+    return {'seed': seed, 'outcome': outcome, 'level': min(state['level'], 4), 'ticks': state['ticks'],
+            'health': state['health'], 'cause': cause if outcome == 'died' else None, 'level_ticks': level_ticks,
+            'damage': dict(damage), 'minigames': minigames}
+
+
+def simulate_batch(task):
+    """Function simulates games of one batch in a worker process.
+
+    Args:
+        task (tuple): seeds (range) and simulation options
+
+    Return:
+        results (list): results of games (see simulate_game)
+    """
+
+    seeds, options = task
+    return [simulate_game(seed, options) for seed in seeds]
+
+
+def percentile(values, fraction):
+    """Function returns value below which given fraction of values lie (nearest rank).
+
+    Args:
+        values (list): values in ascending order (not empty)
+        fraction (float): 0.5 for median, 0.9 for 90th percentile and so on
+
+    Return:
+        value: one of the values
+    """
+
+    return values[min(max(int(fraction * len(values) + 0.999999) - 1, 0), len(values) - 1)]
+
+
+def combine_results(results):
+    """Function combines results of games into balance statistics.
+
+    Args:
+        results (list): results of games (see simulate_game)
+
+    Return:
+        report (dict): share of outcomes, statistics of levels (how many games reached and finished them,
+            seconds spent on finished ones), causes of death and of damage
+    """
+
+    games = len(results)
+    outcomes = Counter(result['outcome'] for result in results)
+    levels = {}
+    for level in range(1, 5):
+        seconds = sorted(result['level_ticks'][level] / SIMULATION_RATE for result in results
+                         if level in result['level_ticks'])
+        reached = sum(1 for result in results if result['level'] >= level)
+        levels[level] = {'reached': reached, 'finished': len(seconds),
+                         'finish_rate': round(len(seconds) / reached, 3) if reached else None}
+        if seconds:
+            levels[level].update({'mean_s': round(sum(seconds) / len(seconds), 1),
+                                  'p50_s': percentile(seconds, 0.5), 'p90_s': percentile(seconds, 0.9)})
+    damage = Counter()
+    for result in results:
+        damage.update(result['damage'])
+    return {'games': games, 'outcomes': {outcome: round(amount / games, 3) for outcome, amount in outcomes.items()},
+            'levels': levels, 'death_causes': dict(Counter(result['cause'] for result in results if result['cause'])),
+            'deaths_by_level': dict(Counter(result['level'] for result in results if result['outcome'] == 'died')),
+            'damage_taken': dict(damage),
+            'minigames_per_game': round(sum(result['minigames'] for result in results) / games, 2)}
+
+
+def run_simulation(games, seed, options, processes=None, batch_size=None):
+    """Function simulates games on all CPU cores. Every game has its own seed, so results do not depend
+        on the number of processes, and batches keep the processes busy with little communication.
+        By default every process gets about BATCHES_PER_PROCESS batches, so long games are spread
+        over the processes while small runs still use all of them.
+
+    Args:
+        games (int): number of games
+        seed (int): seed of the first game, next games get next seeds
+        options (dict): simulation options (see simulate_game and apply_overrides)
+        processes (int): number of worker processes (number of CPU cores by default, 1 runs in this process)
+        batch_size (int): number of games sent to a worker at once (derived from games and processes if not given)
+
+    Return:
+        results (list): results of games ordered by seed
+    """
+
+    processes = processes or os.cpu_count() or 1
+    batch_size = batch_size or max(1, -(-games // (processes * BATCHES_PER_PROCESS)))
+    tasks = [(range(first, min(first + batch_size, seed + games)), options)
+             for first in range(seed, seed + games, batch_size)]
+    apply_overrides(options)
+    if processes == 1:
+        batches = map(simulate_batch, tasks)
+        return [result for batch in batches for result in batch]
+    with multiprocessing.Pool(processes, apply_overrides, (options,)) as pool:
+        return [result for batch in pool.imap(simulate_batch, tasks) for result in batch]
+
+
+def print_report(report, elapsed, processes):
+    """Function prints balance statistics.
+
+    Args:
+        report (dict): statistics (see combine_results)
+        elapsed (float): simulation time in seconds
+        processes (int): number of worker processes
+    """
+
+    print('{} games in {:.1f} s ({:.1f} games/s, {} processes)'.format(
+        report['games'], elapsed, report['games'] / max(elapsed, 1e-9), processes))
+    print('outcomes: ' + ', '.join('{} {:.1%}'.format(outcome, share)
+                                   for outcome, share in sorted(report['outcomes'].items())))
+    print('level  reached  finished  finish rate  mean [s]  p50 [s]  p90 [s]')
+    for level, stats in report['levels'].items():
+        print('{:5d}  {:7d}  {:8d}  {:>11}  {:>8}  {:>7}  {:>7}'.format(
+            level, stats['reached'], stats['finished'], '-' if stats['finish_rate'] is None else
+            '{:.1%}'.format(stats['finish_rate']), stats.get('mean_s', '-'), stats.get('p50_s', '-'),
+            stats.get('p90_s', '-')))
+    print('death causes: {}'.format(report['death_causes'] or '-'))
+    print('deaths by level: {}'.format(report['deaths_by_level'] or '-'))
+    print('damage taken: {}'.format(report['damage_taken'] or '-'))
+    print('minigames per game: {}'.format(report['minigames_per_game']))
+
+
+def main(arguments=None):
+    """Function runs batch of simulated games and prints balance statistics."""
+
+    parser = argparse.ArgumentParser(description='Simulate many games to check game balance.')
+    parser.add_argument('--games', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0, help='seed of the first game, next games get next seeds')
+    parser.add_argument('--policy', choices=sorted(POLICIES), default='seeker', help='how buttons are chosen')
+    parser.add_argument('--processes', type=int, help='worker processes (number of CPU cores by default)')
+    parser.add_argument('--max-ticks', type=int, default=MAX_TICKS, help='game ticks before a game is stopped')
+    parser.add_argument('--minigame-win', type=float, default=0.5,
+                        help='chance of winning the fight with the evil hamster')
+    parser.add_argument('--chase', action='store_true', help='minions chase the squirrel')
+    parser.add_argument('--minion-period', type=int, default=MINION_PERIOD, help='game ticks between minions moves')
+    parser.add_argument('--health', type=int, help='health at the start (30 in the game)')
+    parser.add_argument('--hamster-energy', type=int, help='evil hamster energy (600 in the game)')
+    parser.add_argument('--minions', type=int, help='number of minions on levels with minions')
+    parser.add_argument('--food', nargs='*', default=[], metavar='ITEM=AMOUNT',
+                        help='amount of an item placed on every level, e.g. ✿=10')
+    parser.add_argument('--json', metavar='FILE', help='save statistics to JSON file')
+    arguments = parser.parse_args(arguments)
+
+    options = {'policy': arguments.policy, 'max_ticks': arguments.max_ticks, 'minigame_win': arguments.minigame_win,
+               'chase': arguments.chase, 'minion_period': arguments.minion_period, 'health': arguments.health,
+               'hamster_energy': arguments.hamster_energy, 'minions': arguments.minions,
+               'food': {item: int(amount) for item, amount in (food.split('=') for food in arguments.food)}}
+    processes = arguments.processes or os.cpu_count() or 1
+    start = time.perf_counter()
+    results = run_simulation(arguments.games, arguments.seed, options, processes)
+    elapsed = time.perf_counter() - start
+    report = combine_results(results)
+    print_report(report, elapsed, processes)
+    if arguments.json:
+        with open(arguments.json, 'w') as report_file:
+            json.dump(dict(report, options=options, seconds=round(elapsed, 3), processes=processes), report_file,
+                      indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,75 +1,140 @@
-import os
 import time
 import random
+import argparse
 import highscore
-from environment import *
+import hotcoldgame
+import guess_number_game
+import add_numbers_game
+import remember_number_game
+from clock import *
+from engine import *
+from assets import load_assets
+from frame_timing import *
+from recording import create_recorder, record_tick, record_minigame, finish_recording
+from environment import create_player
 from controls import *
 from display import *
-from actions import *
 
+# minigame name: (number of title image, main function of the minigame)
+MINIGAMES = {
+    'guess_number': (4, guess_number_game.main), 'add_numbers': (4, add_numbers_game.main),
+    'remember_number': (4, remember_number_game.main), HAMSTER_MINIGAME: (5, hotcoldgame.main)}
+SIMULATION_RATE = 20    # game ticks per second, buttons pressed since the last tick are handled every tick
+RENDER_RATE = 30    # frames per second at most
+MINION_RATE = 3     # minions moves per second
 
-def main():
+
+def handle_events(state, events, recorder=None):
+    """Function shows screens requested by the game engine (level titles, minigames, inventory).
+
+    Args:
+        state (dict): game state
+        events (list): events (name, value) returned by the game engine
+        recorder (dict): game recorder saving results of minigames (see recording), None if not recorded
+    """
+
+    for name, value in events:
+        if name == 'next_level' and value in [1, 2, 3, 4]:
+            print_level_title(value - 1)
+        elif name == 'show_info':
+            cooked_mode()
+            print_additional_game_info(state['inventory'])
+        elif name == 'minigame':
+            title_number, minigame = MINIGAMES[value]
+            print_level_title(title_number)
+            cooked_mode()
+            won = minigame()
+            record_minigame(recorder, won)
+            handle_events(state, finish_minigame(state, won), recorder)
+
+
+def run_tick(state, buttons_pressed, timer=None, recorder=None):
+    """Function runs one game tick handling all buttons pressed since the previous one.
+
+    Args:
+        state (dict): game state
+        buttons_pressed (list): buttons pressed by user since the previous tick
+        timer (dict): frame timer (see frame_timing), None if timing is disabled
+        recorder (dict): game recorder (see recording), None if the game is not recorded
+
+    Return:
+        paused (bool): True if another screen (level title, minigame, info) was shown during the tick
+    """
+
+    events = handle_buttons(state, buttons_pressed, timer)
+    record_tick(recorder, buttons_pressed)
+    handle_events(state, events, recorder)
+    paused = any(name != 'damage' for name, value in events)
+    if paused:
+        skip(timer)     # time spent on other screen is not measured
+    return paused
+
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description='Day of the squirrel')
+    parser.add_argument('--chase', action='store_true', help='harder game, minions chase the squirrel')
+    parser.add_argument('--tick-rate', type=float, default=SIMULATION_RATE, help='game ticks per second')
+    parser.add_argument('--fps', type=float, default=RENDER_RATE, help='frames per second at most')
+    parser.add_argument('--minion-rate', type=float, default=MINION_RATE, help='minions moves per second')
+    parser.add_argument('--timing', metavar='FILE',
+                        help='save timing of main loop phases to JSON file (or set {})'.format(TIMING_VARIABLE))
+    parser.add_argument('--record', metavar='FILE', help='record the game to replay it later (see recording.py)')
+    parser.add_argument('--highscores-db', metavar='FILE', help='keep highscores in SQLite database shared by players '
+                        '(or set {})'.format(highscore.DATABASE_VARIABLE))
+    arguments = parser.parse_args(arguments)
+
+    load_assets()   # level titles and end images are shown later without reading files
     intro()
     character_name, character_color = create_player()
-    level = 0
-    # sets parameters of next game level
-    inventory = {}
-    game_won, level, inventory, board, x_player, y_player, minions_location = setting_next_level(level, inventory)
-
-    button_pressed = ''
-    health = 30  # player's initial health points
-    lamps_lit = 0
-    hamster_energy = 600
-    game_won = False
+    # sets parameters of the first game level
+    minion_period = max(1, round(arguments.tick_rate / arguments.minion_rate))
+    seed = random.randrange(1 << 63)
+    state, events = new_game(character_name, seed, arguments.chase, minion_period)
     start_time = time.time()
+    screen = create_screen()
+    timer = create_frame_timer(arguments.timing)
+    recorder = None
+    if arguments.record:
+        recorder = create_recorder(arguments.record, seed, character_name, arguments.chase, minion_period)
+
+    open_keyboard()
+    try:
+        handle_events(state, events)
+        clock = create_clock({'tick': arguments.tick_rate, 'render': arguments.fps}, {'render': 1})
+        buttons_pressed = []
+        while not state['game_over']:   # game end conditions
+            # waits for buttons until the next tick or frame
+            buttons_pressed += read_keys(time_to_next(clock))
+            mark(timer, 'input')    # includes waiting for the next tick or frame
+            for tick in range(due_ticks(clock, 'tick')):
+                state['time'] = int(time.time() - start_time)
+                paused = run_tick(state, buttons_pressed, timer, recorder)
+                buttons_pressed = []
+                if paused:
+                    reset_clock(clock)  # time spent on other screen is not counted as late ticks
+                    break
+                if state['game_over']:
+                    break
+            if due_ticks(clock, 'render') and not state['game_over']:
+                # update text info on board
+                update_board_information(state['board'], state['level'], character_name, state['health'],
+                                         state['inventory'], state['time'], state['hamster_energy'])
+                mark(timer, 'hud')
+                # creates current animation frame
+                manage_display(state['board'], state['x_player'], state['y_player'], character_color, screen)
+                mark(timer, 'display')
+    finally:
+        close_keyboard()
+        save_timing(timer, {'tick_rate': arguments.tick_rate, 'fps': arguments.fps, 'chase': arguments.chase})
+        state['time'] = int(time.time() - start_time)
+        finish_recording(recorder, state)
+        close_game(state)
 
-    print_level_title(level - 1)
-
-    while button_pressed != '\\' and health > 0 and not game_won:   # game end conditions
-        # update text info on board
-        board = update_board_information(board, level, character_name, health, inventory, start_time, hamster_energy)
-        manage_display(board, x_player, y_player, character_color)   # creates current frame of game animation
-        board, minions_location = move_minions(board, minions_location, character_color)
-
-        button_pressed = getch()    # reads button pressed by user
-
-        if button_pressed == 'i':
-            print_additional_game_info(inventory)
-
-        # developer_cheat_mode
-        if button_pressed == ',':
-            x_player = 114
-            y_player = 37
-
-        # changes user position based on pressed button
-        x_player, y_player = user_control(board, x_player, y_player, button_pressed, inventory)
-        # lights magic lamps in contact with user
-        board, lamps_lit = light_magic_lamps(board, x_player, y_player, button_pressed, lamps_lit)
-        # checks if user encounters an obstacle and lowers user health
-        health = check_obstacle_contact(board, x_player, y_player, button_pressed, health)
-        # changes user inventory and health if user collected special items
-        inventory, health = collecting_food(board, x_player, y_player, inventory, health)
-        # changes evil hamster's energy if user fed his friends with collected items
-        inventory, hamster_energy = feeding_friends(board, x_player, y_player, inventory, hamster_energy)
-        # checks if user encounters an enemy and chenges user properties if it has happened
-        x_player, y_player, health = minion_encounter(x_player, y_player, minions_location, health)
-        # checks enemy's energy, removes his protection and defeats him if the user is on his position
-        board, hamster_energy, your_time = evil_hamster_defeat(
-            board, x_player, y_player, level, hamster_energy, start_time)
-        # opens passage to the next level
-        board = enable_level_exit(board, level, inventory, lamps_lit)
-        # checks if level end conditions were met
-        next_level = checking_level_end(level, inventory, x_player, y_player, hamster_energy, board)
-
-        if next_level:
-            # sets parameters of next game level
-            game_won, level, inventory, board, x_player, y_player, minions_location = setting_next_level(
-                level, inventory)
-            if level in [1, 2, 3, 4]:
-                print_level_title(level - 1)
-
-    print_end_image(game_won)
-    highscore.manage_highscores(game_won, health, your_time, character_name)
+    print_end_image(state['game_won'])
+    highscore.manage_highscores(state['game_won'], state['health'], state['time'], character_name,
+                                arguments.highscores_db)
+    if timer is not None:   # frame and tick statistics are shown only when timing was asked for
+        print(clock_report(clock))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,67 @@
+import os
+import asyncio
+import tempfile
+import unittest
+import game_server
+
+CLIENTS = 8
+MOVES = [b'w', b'a', b's', b'd', b'\x1b[A', b'\x1b[C']
+
+
+async def play_client(port, number):
+    """Function plays short game as telnet client: creates a character, moves around and quits.
+
+    Args:
+        port (int): port of the game server
+        number (int): number of the client, used in the character's name
+
+    Return:
+        received (bytes): everything the server sent until it closed the connection
+    """
+
+    reader, writer = await asyncio.open_connection(game_server.SERVER_HOST, port)
+    receiving = asyncio.ensure_future(reader.read(-1))     # reads until the server closes the connection
+    writer.write(bytes([game_server.TELNET_IAC, 253, 1]) + 'player{}\r\n'.format(number).encode() + b'1\r\0')
+    await asyncio.sleep(game_server.TITLE_TIME + 0.5)
+    for move in range(20):
+        writer.write(MOVES[(number + move) % len(MOVES)])
+        await asyncio.sleep(0.05)
+    writer.write(b'\\')
+    received = await asyncio.wait_for(receiving, 10)
+    writer.close()
+    await writer.wait_closed()
+    return received
+
+
+class GameServerTest(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.working_directory = os.getcwd()
+        os.chdir(os.path.dirname(os.path.abspath(__file__)))    # level files are read from the game directory
+        self.directory = tempfile.TemporaryDirectory()
+        self.database = os.path.join(self.directory.name, 'highscores.db')
+
+    def tearDown(self):
+        self.directory.cleanup()
+        os.chdir(self.working_directory)
+
+    async def test_sessions(self):
+        server = await game_server.serve(game_server.SERVER_HOST, 0, {'database': self.database})
+        port = server.sockets[0].getsockname()[1]
+        try:
+            outputs = await asyncio.gather(*[play_client(port, number) for number in range(CLIENTS)])
+        finally:
+            server.close()
+            await server.wait_closed()
+        for output in outputs:
+            text = output.decode('utf-8', 'replace')
+            self.assertTrue(output.startswith(game_server.TELNET_HELLO))
+            self.assertIn("Choose your character's name", text)
+            self.assertIn('Game over.', text)
+            self.assertIn('High scores', text)
+            self.assertGreater(text.count('●'), 0)     # game frames were drawn
+        self.assertTrue(os.path.exists(self.database))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import os
+import random
+import tempfile
+import unittest
+import highscore
+
+
+def random_scores(amount, seed=0):
+    """Function makes random scores with many equal times and health points, so ties are ordered too.
+
+    Args:
+        amount (int): number of scores
+        seed (int): seed of random numbers generator
+
+    Return:
+        scores (list): game time, health, date and character name of every score
+    """
+
+    rng = random.Random(seed)
+    return [(rng.randrange(30, 40), rng.randrange(1, 5), '2017-05-06', 'player{}'.format(i)) for i in range(amount)]
+
+
+def expected_best(scores, size=highscore.TOP_SIZE):
+    """Function orders scores by time, then health (the highest first), then the order they were added in.
+
+    Args:
+        scores (list): scores in the order they were added
+        size (int): number of the best scores
+
+    Return:
+        scores (list): the best scores, the best first
+    """
+
+    order = sorted(range(len(scores)), key=lambda nr: (scores[nr][0], -scores[nr][1], nr))
+    return [scores[nr] for nr in order[:size]]
+
+
+class HighscoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, 'highscores.log')
+        self.old_filename = os.path.join(self.directory.name, 'highscores.txt')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def add_scores(self, scores):
+        highscores = highscore.load_highscores(self.filename, old_filename=None)
+        for your_time, health, date, character_name in scores:
+            highscore.add_score(highscores, health, your_time, character_name, date)
+        return highscores
+
+    def test_best_scores_order(self):
+        scores = random_scores(500)
+        highscores = self.add_scores(scores)
+        self.assertEqual(highscore.best_scores(highscores), expected_best(scores))
+        loaded = highscore.load_highscores(self.filename, old_filename=None)
+        self.assertEqual(highscore.best_scores(loaded), expected_best(scores))
+
+    def test_compaction_keeps_best_scores(self):
+        compact_limit = highscore.COMPACT_LIMIT
+        highscore.COMPACT_LIMIT = 50
+        try:
+            scores = random_scores(500, 1)
+            highscores = self.add_scores(scores)
+        finally:
+            highscore.COMPACT_LIMIT = compact_limit
+        self.assertEqual(highscore.best_scores(highscores), expected_best(scores))
+        with open(self.filename) as highscores_file:
+            self.assertLessEqual(len(highscores_file.readlines()), highscore.TOP_SIZE + 50)
+        loaded = highscore.load_highscores(self.filename, old_filename=None)
+        self.assertEqual(highscore.best_scores(loaded), expected_best(scores))
+
+    def test_migration_from_old_table(self):
+        scores = random_scores(30, 2)
+        with open(self.old_filename, 'w') as old_file:
+            for your_time, health, date, character_name in scores:
+                old_file.write('{:10s} | {:3d}:{:02d} | {:5d} | {}\n'.format(
+                    character_name, your_time // 60, your_time % 60, health, date))
+        highscores = highscore.load_highscores(self.filename, old_filename=self.old_filename)
+        self.assertEqual(highscore.best_scores(highscores), expected_best(scores))
+        self.assertTrue(os.path.exists(self.filename))
+
+    def test_broken_last_line_is_skipped(self):
+        scores = random_scores(5, 3)
+        self.add_scores(scores)
+        with open(self.filename, 'a') as highscores_file:
+            highscores_file.write('31\t4\t2017')  # the game was closed while the score was written
+        highscores = self.add_scores([(30, 1, '2017-05-07', 'last')])
+        self.assertEqual(highscore.best_scores(highscores), expected_best(scores + [(30, 1, '2017-05-07', 'last')]))
+        loaded = highscore.load_highscores(self.filename, old_filename=None)
+        self.assertEqual(highscore.best_scores(loaded), highscore.best_scores(highscores))
+
+    @unittest.skipIf(highscore.sqlite3 is None, 'SQLite is not available')
+    def test_database_order_matches_log(self):
+        scores = random_scores(200, 4)
+        self.add_scores(scores)
+        connection = highscore.open_database(os.path.join(self.directory.name, 'highscores.db'), self.filename)
+        try:
+            self.assertEqual(highscore.best_database_scores(connection), expected_best(scores))
+        finally:
+            connection.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
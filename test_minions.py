@@ -0,0 +1,147 @@
+import os
+import random
+import unittest
+import engine
+from tiles import *
+from actions import move_minions, chase_minions
+from environment import create_minions
+from flow_field import FIELD_RADIUS, create_flow_field, update_flow_field, field_distance
+
+GAME_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+
+def open_board(width, height):
+    """Function creates empty board surrounded by walls.
+
+    Args:
+        width (int): number of columns
+        height (int): number of lines
+
+    Return:
+        board (dict): tile board
+    """
+
+    tiles = bytearray([EMPTY]) * (width * height)
+    for position in range(width * height):
+        if position % width in (0, width - 1) or position // width in (0, height - 1):
+            tiles[position] = WALL
+    return {'width': width, 'height': height, 'tiles': tiles, 'labels': {}, 'opened': [], 'barriers': {}}
+
+
+def place_minions(board, cells):
+    """Function puts minions on the board.
+
+    Args:
+        board (dict): tile board
+        cells (list): (x, y) positions of minions
+
+    Return:
+        minions (dict): positions of enemies on the board (see create_minions)
+    """
+
+    for x, y in cells:
+        set_tile(board, x, y, MINION)
+    return create_minions(list(cells))
+
+
+def game_with_minion_at_start(seed, minion_period):
+    """Function starts game on the second level (the first one with minions) with a minion at the start place
+        and the player next to it.
+
+    Args:
+        seed (int): seed of the game
+        minion_period (int): game ticks between minions moves
+
+    Return:
+        state (dict): game state
+    """
+
+    working_directory = os.getcwd()
+    os.chdir(GAME_DIRECTORY)    # level files are read from the game directory
+    try:
+        state, events = engine.new_game('tester', seed, minion_period=minion_period)
+        engine.start_next_level(state)
+    finally:
+        os.chdir(working_directory)
+    board = state['board']
+    minions = state['minions']
+    x_minion, y_minion = minions['location'][0]
+    set_tile(board, x_minion, y_minion, EMPTY)
+    del minions['cells'][(x_minion, y_minion)]
+    if (1, 1) in minions['cells']:
+        return None
+    set_tile(board, 1, 1, MINION)
+    minions['location'][0] = (1, 1)
+    minions['cells'][(1, 1)] = 0
+    state['x_player'], state['y_player'] = 2, 1
+    return state
+
+
+class MinionsTest(unittest.TestCase):
+
+    def check_index(self, board, minions):
+        self.assertEqual(len(minions['cells']), len(minions['location']))
+        for minion_nr, cell in enumerate(minions['location']):
+            self.assertEqual(minions['cells'][cell], minion_nr)
+            self.assertEqual(get_tile(board, *cell), MINION)
+
+    def test_minions_do_not_enter_taken_cells(self):
+        board = open_board(6, 5)
+        minions = place_minions(board, [(1, 1), (2, 1), (3, 1), (1, 2), (2, 2)])
+        set_tile(board, 2, 1, EMPTY)    # place of a minion which looks empty must not be entered
+        rng = random.Random(0)
+        for step in range(200):
+            move_minions(board, minions, rng)
+            self.assertEqual(len(minions['cells']), len(minions['location']))
+            set_tile(board, *minions['location'][1], MINION)
+
+    def test_minion_at_start_stays_on_board(self):
+        for seed in range(40):
+            state = game_with_minion_at_start(seed, 1)
+            if state is None:
+                continue
+            engine.step(state, 'a')     # the player meets the minion and is sent back to the start, where it is
+            self.check_index(state['board'], state['minions'])
+            for tick in range(100):
+                engine.step(state, '')
+                if state['game_over']:
+                    break
+                self.check_index(state['board'], state['minions'])
+
+    def test_minion_contact_hurts_once(self):
+        for seed in range(10):
+            state = game_with_minion_at_start(seed, 1000)
+            if state is None:
+                continue
+            state['ticks'] = 1      # minions do not move during the test
+            health = state['health']
+            engine.step(state, 'a')     # the player meets the minion and is sent back to the start, where it is
+            for tick in range(50):
+                engine.step(state, '')
+            self.assertFalse(state['game_over'])
+            self.assertEqual(state['health'], health - 10)
+
+    def test_chasing_minion_leaves_caught_player(self):
+        board = open_board(7, 7)
+        minions = place_minions(board, [(3, 3)])
+        field = create_flow_field(board, 3, 3)
+        chase_minions(board, minions, field, random.Random(0))
+        self.assertNotEqual(minions['location'][0], (3, 3))
+        self.check_index(board, minions)
+
+    def test_flow_field_keeps_window_around_player(self):
+        board = open_board(FIELD_RADIUS * 8, 9)
+        minions = place_minions(board, [(FIELD_RADIUS * 8 - 2, 7)])
+        field = create_flow_field(board, 1, 1)
+        self.assertLessEqual(len(field['distance']), (FIELD_RADIUS + 4) * 11)
+        for x_player in range(2, FIELD_RADIUS * 6):
+            update_flow_field(field, board, x_player, 1, minions, budget=None)
+        self.assertGreater(field['left'], 0)
+        self.assertLessEqual(len(field['distance']), (2 * FIELD_RADIUS + 3) * 11)
+        for x in range(x_player - FIELD_RADIUS // 2, x_player + FIELD_RADIUS // 2):
+            for y in range(1, 8):
+                self.assertEqual(field_distance(field, y * board['width'] + x), abs(x - x_player) + y - 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import os
+import random
+import tempfile
+import unittest
+import engine
+import recording
+from simulator import seeker_policy
+
+SESSIONS = 12
+SESSION_TICKS = 4000
+# final states (see recording.state_digest) of the sessions by seed, the same with the rules chained in
+# handle_button before they were dispatched through engine.TRIGGERS and engine.CONDITIONS (session 7 is taken
+# since magic lamps are not put in chokepoints); a change of game rules which changes how a game ends shows up here
+REFERENCE_DIGESTS = {
+    0: '7f32fac7a95bf06c5341cc21d3ad352e', 1: '11df50ab6449b3c7ea949b6fc779544f',
+    2: '55a2584d23e476f33b0699d6e50ee71f', 3: '6924fe8cec279426a441a496050d123b',
+    4: '52766e005006c9fd75ad3a933ea39228', 5: '9b2393dcf0bffd7960ec9ac2d915c711',
+    6: '42b8862fe0a5e5a7635132ae258c62be', 7: '59638e635dc3930df80c6f14cf0d8367',
+    8: '5c57ea419b01729f4ced9912ee282740', 9: '6608889db521181d45a3dfdd16847325',
+    10: 'e45b8855f97a20a2c53bd2841f415bc4', 11: '18de67444572128f7b6e527d37a24c18',
+}
+
+
+def play_session(seed, recording_filename=None):
+    """Function plays session with the seeker player of the simulator, recording it if the file name is given.
+        Exit minigames are won (they are repeated until won in the game), the fight with the hamster is won
+        at random.
+
+    Args:
+        seed (int): seed of the game and of the player
+        recording_filename (str): name of the recording file (see recording.create_recorder)
+
+    Return:
+        digest (bytes): digest of the final state (see recording.state_digest)
+    """
+
+    state, events = engine.new_game('tester', seed)
+    recorder = recording.create_recorder(recording_filename, seed, 'tester') if recording_filename else None
+    rng = random.Random(seed)
+    memory = {}
+    while not state['game_over'] and state['ticks'] < SESSION_TICKS:
+        buttons_pressed = [seeker_policy(state, memory, rng)]
+        events = engine.handle_buttons(state, buttons_pressed)
+        recording.record_tick(recorder, buttons_pressed)
+        if state['minigame']:
+            won = state['minigame'] != engine.HAMSTER_MINIGAME or rng.random() < 0.5
+            engine.finish_minigame(state, won)
+            recording.record_minigame(recorder, won)
+    recording.finish_recording(recorder, state)
+    digest = recording.state_digest(state)
+    engine.close_game(state)
+    return digest
+
+
+class ReplayTest(unittest.TestCase):
+
+    def setUp(self):
+        self.working_directory = os.getcwd()
+        os.chdir(os.path.dirname(os.path.abspath(__file__)))    # level files are read from the game directory
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+        os.chdir(self.working_directory)
+
+    def test_replay_matches_recorded_game(self):
+        for seed in range(SESSIONS):
+            filename = os.path.join(self.directory.name, 'session{}.rec'.format(seed))
+            play_session(seed, filename)
+            state, matches = recording.replay(filename)
+            self.assertTrue(matches, 'replay of session {} ended differently'.format(seed))
+
+    def test_sessions_match_reference(self):
+        for seed in range(SESSIONS):
+            self.assertEqual(play_session(seed).hex(), REFERENCE_DIGESTS[seed], 'session {}'.format(seed))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,266 @@
+import bisect
+
+RESET_COLOR = '\033[0m'
+
+# tile flags
+PASSABLE = 1    # player can step on the tile
+HAZARD = 2      # bumping into the tile costs player health
+COLLECTIBLE = 4     # tile is picked up when player steps on it
+FRIEND = 8      # squirrel's friend, player can visit him having enough nuts
+LAMP = 16       # magic lamp which can be lit
+PASSAGE = 32    # passage to the next level
+
+tile_glyphs = []    # character of tile with given id
+tile_colors = []    # escape code of tile color
+tile_flags = []     # tile flags (see above)
+tile_texts = []     # character with color escape codes, used only when frame is rendered
+tile_ids = {}       # (glyph, color): tile id
+
+
+def register_tile(glyph, color='', flags=PASSABLE):
+    """Function returns id of tile with given glyph and color, adding it to the tile table if needed.
+
+    Args:
+        glyph (str): character of the tile
+        color (str): escape code of tile color
+        flags (int): tile flags used when the tile is new
+
+    Return:
+        tile (int): tile id (0-255)
+    """
+
+    tile = tile_ids.get((glyph, color))
+    if tile is None:
+        if len(tile_glyphs) == 256:
+            raise ValueError('Too many different tiles, cannot add {!r}'.format(glyph))
+        tile = len(tile_glyphs)
+        tile_glyphs.append(glyph)
+        tile_colors.append(color)
+        tile_flags.append(flags)
+        tile_texts.append(color + glyph + RESET_COLOR if color else glyph)
+        tile_ids[(glyph, color)] = tile
+    return tile
+
+
+VOID = register_tile('', '', 0)     # fills rows shorter than the board, nothing is displayed
+EMPTY = register_tile(' ')
+WALL = register_tile('X', '', 0)
+BARRIER = register_tile('#', '\033[31m', HAZARD)
+NUT = register_tile('●', '\033[33m', PASSABLE | COLLECTIBLE)
+NUTS_BAG = register_tile('⚛', '\033[34m', PASSABLE | COLLECTIBLE)
+ROTTEN_FOOD = register_tile('✿', '\033[31m', PASSABLE | COLLECTIBLE)
+FIRST_AID = register_tile('✡', '\033[94m', PASSABLE | COLLECTIBLE)
+KEY_SHARD = register_tile('℥', '\033[32m', PASSABLE | COLLECTIBLE)
+COOKIE = register_tile('☯', '\033[32m', PASSABLE | COLLECTIBLE)
+UMBRELLA = register_tile('☂', '\033[32m', PASSABLE | COLLECTIBLE)
+MAGIC_NOTE = register_tile('♫', '\033[32m', PASSABLE | COLLECTIBLE)
+MINION = register_tile('ᴥ', '\033[31m')
+LAMP_OFF = register_tile('☀', '\033[33m', LAMP)
+LAMP_ON = register_tile('☀', '\033[31m', 0)
+EXIT = register_tile('⇵', '', PASSABLE | PASSAGE)
+FRIENDS = [register_tile(friend, '', FRIEND) for friend in ['☹', '☃', '♞', '☻', '☬']]
+HAMSTER_TILES = {
+    '&': register_tile('&', '\033[34m'), '*': register_tile('*', '\033[90m'), '%': register_tile('%', '\033[93m')}
+
+# items placed by insert_food and colored in level files
+ITEM_TILES = {
+    '●': NUT, '⚛': NUTS_BAG, '✿': ROTTEN_FOOD, '✡': FIRST_AID, '℥': KEY_SHARD, '☯': COOKIE, '☂': UMBRELLA,
+    '♫': MAGIC_NOTE, 'ᴥ': MINION, '#': BARRIER, '☀': LAMP_OFF}
+
+# characters of level files which get colored tiles
+ITEM_COLORS = {
+    '●': '\033[33m', '⚛': '\033[34m', '✿': '\033[31m', '✡': '\033[94m', 'ᴥ': '\033[31m',
+    '#': '\033[31m', '℥': '\033[32m', '☯': '\033[32m', '☂': '\033[32m', '♫': '\033[32m'}
+
+
+def create_tile_board(width, height):
+    """Function creates empty board storing one tile id per cell.
+
+    Args:
+        width (int): number of board columns
+        height (int): number of board rows
+
+    Return:
+        board (dict): board size, tiles (bytearray, row after row), text labels ({(y, x): text}),
+            positions of barriers removed during the game ('opened', see open_tile)
+            and groups of barriers removed at once ('barriers', see remove_barrier_group)
+    """
+
+    return {'width': width, 'height': height, 'tiles': bytearray(width * height), 'labels': {}, 'opened': [],
+            'barriers': {}}
+
+
+def board_from_lines(lines, colored_items):
+    """Function turns lines of text into tile board.
+
+    Args:
+        lines (list): lines of text (without new line characters)
+        colored_items (dict): characters (keys) which get tiles with color (values)
+
+    Return:
+        board (dict): tile board
+    """
+
+    width = max([len(line) for line in lines] + [0])
+    board = create_tile_board(width, len(lines))
+    codes = {}      # character: tile id (as character of the same code point)
+    for char in set(''.join(lines)):
+        codes[ord(char)] = chr(register_tile(char, colored_items.get(char, '')))
+    tiles = board['tiles']
+    for y, line in enumerate(lines):
+        tiles[y * width:y * width + len(line)] = line.translate(codes).encode('latin-1')
+    return board
+
+
+def get_tile(board, x, y):
+    """Function returns id of the tile at given position.
+
+    Args:
+        board (dict): tile board
+        x (int): horizontal position on the board
+        y (int): vertical position on the board
+
+    Return:
+        tile (int): tile id
+    """
+
+    return board['tiles'][y * board['width'] + x]
+
+
+def set_tile(board, x, y, tile):
+    """Function puts tile at given position.
+
+    Args:
+        board (dict): tile board
+        x (int): horizontal position on the board
+        y (int): vertical position on the board
+        tile (int): tile id
+    """
+
+    board['tiles'][y * board['width'] + x] = tile
+
+
+def open_tile(board, x, y):
+    """Function removes obstacle from given position, keeping track of removed obstacles
+        (for things which depend on the shape of the map, like distance field of chasing minions).
+
+    Args:
+        board (dict): tile board
+        x (int): horizontal position on the board
+        y (int): vertical position on the board
+    """
+
+    set_tile(board, x, y, EMPTY)
+    board['opened'].append(y * board['width'] + x)
+
+
+def remove_barrier_group(board, name):
+    """Function removes group of barriers indexed when the level was loaded (see environment.index_barriers).
+        The group is removed only once, later calls cost nothing.
+
+    Args:
+        board (dict): tile board
+        name (str): name of the group ('exit' or 'shield')
+    """
+
+    for x, y in board['barriers'].pop(name, ()):
+        if get_tile(board, x, y) == BARRIER:
+            open_tile(board, x, y)
+
+
+class OverlayTiles:
+    """Tiles of a board made from a read-only template shared by many games (see overlay_board).
+
+    Works like the bytearray of a tile board: tiles[position] reads or changes one tile, slices and find()
+    are supported as well. The template is never changed, changed tiles are kept in a sparse overlay
+    (a dictionary and a sorted list of changed positions, for slices), so memory used by one game
+    grows only with the number of tiles it changed.
+    """
+
+    def __init__(self, template):
+        self.template = template    # tiles of the template (bytes)
+        self.changed = {}   # position: tile of tiles different from the template
+        self.positions = []     # changed positions in ascending order
+
+    def __len__(self):
+        return len(self.template)
+
+    def __bytes__(self):
+        return self[0:len(self.template)]
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            start, end, step = position.indices(len(self.template))
+            if step != 1:
+                raise ValueError('only slices of consecutive tiles are supported')
+            tiles = self.template[start:end]
+            first = bisect.bisect_left(self.positions, start)
+            last = bisect.bisect_left(self.positions, end)
+            if first >= last:
+                return tiles
+            tiles = bytearray(tiles)
+            for changed in self.positions[first:last]:
+                tiles[changed - start] = self.changed[changed]
+            return bytes(tiles)
+        if position < 0:
+            position += len(self.template)
+        tile = self.changed.get(position)
+        return self.template[position] if tile is None else tile
+
+    def __setitem__(self, position, tile):
+        if position < 0:
+            position += len(self.template)
+        if self.template[position] != tile:
+            if position not in self.changed:
+                bisect.insort(self.positions, position)
+            self.changed[position] = tile
+        elif position in self.changed:  # tile is the same as in the template again
+            del self.changed[position]
+            del self.positions[bisect.bisect_left(self.positions, position)]
+
+    def find(self, tile, start=0, end=None):
+        """Method returns position of the first tile equal to the given one, like bytearray.find.
+
+        Args:
+            tile (bytes): searched tile id (one byte)
+            start (int): first searched position
+            end (int): end of searched positions (the end of the board by default)
+
+        Return:
+            position (int): position of the tile, -1 if not found
+        """
+
+        if end is None:
+            end = len(self.template)
+        found = self.template.find(tile, start, end)
+        while found != -1 and found in self.changed:    # tile changed in this game
+            found = self.template.find(tile, found + 1, end)
+        limit = end if found == -1 else found   # tiles put by this game are searched before the found one
+        for changed in self.positions[bisect.bisect_left(self.positions, max(start, 0)):]:
+            if changed >= limit:
+                break
+            if self.changed[changed] == tile[0]:
+                return changed
+        return found
+
+
+def overlay_board(template):
+    """Function creates board of one game from a shared template board with read-only tiles (bytes).
+        Side panel and text below the map get their own overlays as well, labels are not shared.
+
+    Args:
+        template (dict): tile board with 'panel' and 'footer' tile boards and 'barriers' groups
+
+    Return:
+        board (dict): tile board with OverlayTiles as tiles
+    """
+
+    board = {'width': template['width'], 'height': template['height'],
+             'tiles': OverlayTiles(template['tiles']), 'labels': dict(template['labels']),
+             'opened': [], 'barriers': dict(template['barriers'])}
+    for name in ['panel', 'footer']:
+        part = template[name]
+        board[name] = {'width': part['width'], 'height': part['height'],
+                       'tiles': OverlayTiles(part['tiles']), 'labels': dict(part['labels']),
+                       'opened': [], 'barriers': {}}
+    return board
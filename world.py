@@ -0,0 +1,328 @@
+import os
+import sys
+import mmap
+import struct
+import marshal
+from collections import OrderedDict
+from tiles import *
+
+WORLD_MAGIC = b'SQWORLD1'
+WORLD_CHUNK_SIZE = 64       # chunks are squares of WORLD_CHUNK_SIZE x WORLD_CHUNK_SIZE tiles
+WORLD_MAX_CHUNKS = 256      # decoded chunks kept in memory (256 chunks of 64 x 64 tiles take 1 MB)
+
+
+class ChunkedTiles:
+    """Tiles of a world stored in a memory-mapped file, decoded chunk by chunk when they are used.
+
+    Works like the bytearray of a tile board (see tiles.create_tile_board): tiles[line * width + column]
+    reads or changes one tile, slices of one row and find() are supported as well. Only the used chunks
+    are decoded, the least recently used ones are dropped when more than max_chunks are in memory.
+    Changed chunks are kept (as bytes) after they are dropped, so memory grows only with the changed area.
+    """
+
+    def __init__(self, world_file, width, height, chunk_size, data_start, translation, max_chunks=WORLD_MAX_CHUNKS):
+        self.world_file = world_file
+        self.data = mmap.mmap(world_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.width = width
+        self.height = height
+        self.chunk_size = chunk_size
+        self.chunks_across = -(-width // chunk_size)
+        self.data_start = data_start
+        self.translation = translation      # tile ids of the world file: tile ids of the game
+        self.max_chunks = max_chunks
+        self.chunks = OrderedDict()     # chunk nr: decoded tiles (bytearray), least recently used first
+        self.changed = set()    # numbers of decoded chunks which were changed
+        self.saved = {}     # chunk nr: tiles of changed chunks dropped from memory
+        self.decoded = 0    # number of chunk decodings, for statistics
+
+    def __len__(self):
+        return self.width * self.height
+
+    def chunk(self, chunk_nr):
+        """Method returns decoded tiles of the chunk, decoding it if needed.
+
+        Args:
+            chunk_nr (int): chunk number (chunk line * chunks across + chunk column)
+
+        Return:
+            tiles (bytearray): tiles of the chunk, row after row
+        """
+
+        tiles = self.chunks.get(chunk_nr)
+        if tiles is not None:
+            self.chunks.move_to_end(chunk_nr)
+            return tiles
+        if chunk_nr in self.saved:
+            tiles = bytearray(self.saved.pop(chunk_nr))
+            self.changed.add(chunk_nr)
+        else:
+            chunk_bytes = self.chunk_size * self.chunk_size
+            start = self.data_start + chunk_nr * chunk_bytes
+            tiles = bytearray(self.data[start:start + chunk_bytes].translate(self.translation))
+            self.decoded += 1
+        self.chunks[chunk_nr] = tiles
+        while len(self.chunks) > self.max_chunks:
+            old_nr, old_tiles = self.chunks.popitem(last=False)
+            if old_nr in self.changed:
+                self.changed.discard(old_nr)
+                self.saved[old_nr] = bytes(old_tiles)
+        return tiles
+
+    def locate(self, position):
+        """Method finds chunk containing the tile.
+
+        Args:
+            position (int): position of the tile (line * width + column)
+
+        Return:
+            chunk_nr (int): chunk number
+            offset (int): position of the tile in the chunk
+        """
+
+        if not 0 <= position < self.width * self.height:
+            raise IndexError('tile position out of the world')
+        line, column = divmod(position, self.width)
+        chunk_line, line_in_chunk = divmod(line, self.chunk_size)
+        chunk_column, column_in_chunk = divmod(column, self.chunk_size)
+        return chunk_line * self.chunks_across + chunk_column, line_in_chunk * self.chunk_size + column_in_chunk
+
+    def segments(self, start, end):
+        """Method splits range of positions into parts lying in one row of one chunk.
+
+        Args:
+            start (int): first position
+            end (int): end position (not included)
+
+        Return:
+            segments (list): (position, chunk nr, offset in chunk, length)
+        """
+
+        segments = []
+        position = max(start, 0)
+        end = min(end, self.width * self.height)
+        while position < end:
+            column = position % self.width
+            length = min(end - position, self.chunk_size - column % self.chunk_size, self.width - column)
+            chunk_nr, offset = self.locate(position)
+            segments.append((position, chunk_nr, offset, length))
+            position += length
+        return segments
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            start, end, step = position.indices(self.width * self.height)
+            if step != 1:
+                raise ValueError('only slices of consecutive tiles are supported')
+            return b''.join([bytes(self.chunk(chunk_nr)[offset:offset + length])
+                             for _, chunk_nr, offset, length in self.segments(start, end)])
+        if position < 0:
+            position += self.width * self.height
+        chunk_nr, offset = self.locate(position)
+        return self.chunk(chunk_nr)[offset]
+
+    def __setitem__(self, position, tile):
+        if position < 0:
+            position += self.width * self.height
+        chunk_nr, offset = self.locate(position)
+        tiles = self.chunk(chunk_nr)
+        if tiles[offset] != tile:
+            tiles[offset] = tile
+            self.changed.add(chunk_nr)
+
+    def find(self, tile, start=0, end=None):
+        """Method returns position of the first tile equal to the given one, like bytearray.find.
+
+        Args:
+            tile (bytes): searched tile id (one byte)
+            start (int): first searched position
+            end (int): end of searched positions (the end of the world by default)
+
+        Return:
+            position (int): position of the tile, -1 if not found
+        """
+
+        if end is None:
+            end = self.width * self.height
+        for position, chunk_nr, offset, length in self.segments(start, end):
+            found = self.chunk(chunk_nr).find(tile, offset, offset + length)
+            if found != -1:
+                return position + found - offset
+        return -1
+
+    def close(self):
+        """Method closes memory-mapped world file."""
+
+        self.data.close()
+        self.world_file.close()
+
+
+def close_board(board):
+    """Function closes world file of the board if its tiles are read from one (see load_world).
+
+    Args:
+        board (dict): tile board ([] after the last level)
+    """
+
+    if board != [] and isinstance(board['tiles'], ChunkedTiles):
+        board['tiles'].close()
+
+
+def write_world_header(world_file, width, height, chunk_size, palette, parts):
+    """Function writes header of the world file.
+
+    Args:
+        world_file (file): world file opened for binary writing
+        width (int): number of map columns
+        height (int): number of map lines
+        chunk_size (int): size of a chunk side
+        palette (list): (glyph, color, flags) of tile ids used in the file
+        parts (list): (width, height, tiles) of side panel and text below the map
+
+    Return:
+        data_start (int): position in the file where chunks start
+    """
+
+    meta = marshal.dumps((width, height, chunk_size, palette, parts))
+    world_file.write(WORLD_MAGIC + struct.pack('<I', len(meta)) + meta)
+    return len(WORLD_MAGIC) + 4 + len(meta)
+
+
+def write_world(board, world_filename, chunk_size=WORLD_CHUNK_SIZE):
+    """Function saves tile board (with its side panel and text below the map) as a chunked world file.
+
+    Args:
+        board (dict): tile board
+        world_filename (str): name of the world file
+        chunk_size (int): size of a chunk side
+    """
+
+    width, height = board['width'], board['height']
+    palette = [(tile_glyphs[tile], tile_colors[tile], tile_flags[tile]) for tile in range(len(tile_glyphs))]
+    parts = [(part['width'], part['height'], bytes(part['tiles'])) for part in [board['panel'], board['footer']]]
+    with open(world_filename, 'wb') as world_file:
+        write_world_header(world_file, width, height, chunk_size, palette, parts)
+        for first_line in range(0, height, chunk_size):
+            band = [bytes(board['tiles'][line * width:(line + 1) * width])
+                    for line in range(first_line, min(first_line + chunk_size, height))]
+            write_chunks_band(world_file, band, width, chunk_size)
+
+
+def write_chunks_band(world_file, band, width, chunk_size):
+    """Function writes one row of chunks into the world file.
+
+    Args:
+        world_file (file): world file opened for binary writing
+        band (list): tiles (bytes) of up to chunk_size map lines
+        width (int): number of map columns
+        chunk_size (int): size of a chunk side
+    """
+
+    band = [line.ljust(width, bytes([VOID])) for line in band]
+    band += [bytes(width)] * (chunk_size - len(band))     # last chunks are filled with VOID tiles
+    for first_column in range(0, width, chunk_size):
+        for line in band:
+            world_file.write(line[first_column:first_column + chunk_size].ljust(chunk_size, bytes([VOID])))
+
+
+def convert_level_file(filename, world_filename, chunk_size=WORLD_CHUNK_SIZE):
+    """Function converts text level file into chunked world file reading it line by line,
+        so only chunk_size lines of the map are kept in memory at a time.
+        The map is found like in environment.split_level.
+
+    Args:
+        filename (str): name of level file
+        world_filename (str): name of the world file
+        chunk_size (int): size of a chunk side
+    """
+
+    codes = {}      # character: tile id (as character of the same code point)
+    temporary_filename = '{}.{}.tmp'.format(world_filename, os.getpid())
+    panel_lines = []
+    height = 0
+    with open(filename, encoding='utf-8') as level_file, open(temporary_filename, 'wb') as chunks_file:
+        first_line = level_file.readline().rstrip('\n')
+        width = len(first_line) - len(first_line.lstrip('X'))
+        band = []
+        line = first_line
+        while line is not None:
+            for char in set(line):
+                if ord(char) not in codes:
+                    codes[ord(char)] = chr(register_tile(char, ITEM_COLORS.get(char, '')))
+            band.append(line[:width].translate(codes).encode('latin-1'))
+            panel_lines.append(line[width:])
+            height += 1
+            if len(band) == chunk_size:
+                write_chunks_band(chunks_file, band, width, chunk_size)
+                band = []
+            if height > 1 and line[:width] == 'X' * width:    # bottom border of the map
+                break
+            line = level_file.readline()
+            line = line.rstrip('\n') if line else None
+        if band:
+            write_chunks_band(chunks_file, band, width, chunk_size)
+        footer_lines = [line.rstrip('\n') for line in level_file]
+    while panel_lines and panel_lines[-1] == '':
+        panel_lines.pop()
+
+    parts = []
+    for lines in [panel_lines, footer_lines]:
+        part = board_from_lines(lines, ITEM_COLORS)
+        parts.append((part['width'], part['height'], bytes(part['tiles'])))
+    palette = [(tile_glyphs[tile], tile_colors[tile], tile_flags[tile]) for tile in range(len(tile_glyphs))]
+    with open(world_filename + '.part', 'wb') as world_file, open(temporary_filename, 'rb') as chunks_file:
+        write_world_header(world_file, width, height, chunk_size, palette, parts)
+        while True:
+            chunks = chunks_file.read(1 << 20)
+            if not chunks:
+                break
+            world_file.write(chunks)
+    os.remove(temporary_filename)
+    os.replace(world_filename + '.part', world_filename)
+
+
+def load_world(world_filename, max_chunks=WORLD_MAX_CHUNKS):
+    """Function opens chunked world file as a tile board. Tiles are decoded only when they are used.
+
+    Args:
+        world_filename (str): name of the world file
+        max_chunks (int): number of decoded chunks kept in memory
+
+    Return:
+        board (dict): tile board (see tiles.create_tile_board) with ChunkedTiles as tiles,
+            side panel ('panel') and text below the map ('footer')
+    """
+
+    world_file = open(world_filename, 'rb')
+    try:
+        if world_file.read(len(WORLD_MAGIC)) != WORLD_MAGIC:
+            raise ValueError('{} is not a world file'.format(world_filename))
+        meta_length, = struct.unpack('<I', world_file.read(4))
+        width, height, chunk_size, palette, parts = marshal.loads(world_file.read(meta_length))
+        # tile ids saved in the file are translated into ids of this game's tile table
+        translation = bytes([register_tile(glyph, color, flags) for glyph, color, flags in palette])
+        translation = translation.ljust(256, bytes([VOID]))
+        tiles = ChunkedTiles(world_file, width, height, chunk_size, len(WORLD_MAGIC) + 4 + meta_length,
+                             translation, max_chunks)
+    except Exception:
+        world_file.close()
+        raise
+    board = {'width': width, 'height': height, 'tiles': tiles, 'labels': {}, 'opened': [], 'barriers': {}}
+    board['panel'], board['footer'] = [create_tile_board(part_width, part_height)
+                                       for part_width, part_height, part_tiles in parts]
+    for part, (part_width, part_height, part_tiles) in zip([board['panel'], board['footer']], parts):
+        part['tiles'][:] = part_tiles.translate(translation)
+    return board
+
+
+def main(arguments=None):
+    """Function converts level files given in the command line into world files (level1.txt -> level1.world)."""
+
+    arguments = sys.argv[1:] if arguments is None else arguments
+    for filename in arguments:
+        world_filename = os.path.splitext(filename)[0] + '.world'
+        convert_level_file(filename, world_filename)
+        print('{} -> {}'.format(filename, world_filename))
+
+
+if __name__ == '__main__':
+    main()